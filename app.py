@@ -1,6 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, RedirectResponse
@@ -9,12 +12,45 @@ from uvicorn import run as app_run
 from typing import Optional
 
 # Importing constants and pipeline modules from the project
+from src.cloud_storage.async_storage import AsyncSimpleStorageService
 from src.constants.constant import APP_HOST, APP_PORT
-from src.pipeline.prediction_pipeline import VehicleData, VehicleDataClassifier
+from src.entity.config_entity import StorageBackendConfig, VehiclePredictorConfig
+from src.logging.logger import logging
+from src.pipeline.prediction_pipeline import ModelRefresher, VehicleData, VehicleDataClassifier
 from src.pipeline.training_pipeline import TrainPipeline
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs the model refresh loop on the event loop for the lifetime of the app. Without aiobotocore or
+    AWS credentials, or with a storage backend other than S3, the app still starts, and requests look
+    the model up themselves.
+    """
+    config = VehiclePredictorConfig()
+    app.state.model_refresher = None
+    if not config.refresh_enabled or StorageBackendConfig().backend != "s3":
+        yield
+        return
+    try:
+        storage = AsyncSimpleStorageService()
+        await storage.__aenter__()
+    except Exception as e:
+        logging.error(f"Model refresh loop not started: {e}")
+        yield
+        return
+    app.state.model_refresher = ModelRefresher(storage, config)
+    refresh_task = asyncio.create_task(app.state.model_refresher.run())
+    try:
+        yield
+    finally:
+        refresh_task.cancel()
+        await asyncio.gather(refresh_task, return_exceptions=True)
+        await storage.__aexit__(None, None, None)
+
+
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount the 'static' directory for serving static files (like CSS)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -90,6 +126,20 @@ async def index(request: Request):
     )
 
 
+# Route to report the state of the serving model
+@app.get("/health")
+async def health():
+    """
+    Health check of the serving model and of its registry, answered from the event loop.
+    """
+    refresher = app.state.model_refresher
+    if refresher is None:
+        return JSONResponse({"healthy": VehicleDataClassifier._model is not None, "s3": "not checked",
+                             "model_version": VehicleDataClassifier._model_version})
+    status = await refresher.health()
+    return JSONResponse(status, status_code=200 if status["healthy"] else 503)
+
+
 # Route to render the training page
 @app.get("/train-view")
 async def train_view(request: Request):
@@ -0,0 +1,105 @@
+"""
+Compares the codecs of pickled model artifacts on a 150-tree, depth-20 forest fitted on the
+transformed insurance data: file size, save time, upload time, and the cold-load time of the
+model from local disk and streamed from S3.
+
+Uploads go to the bucket given with --bucket, or to an in-process moto S3 stand-in when it is
+omitted, which measures client-side cost (compression, hashing, multipart) but no network.
+
+Run from the project root:
+    python -m benchmarks.artifact_codecs --scale 10 --repeats 3
+"""
+import os
+import argparse
+import gc
+import tempfile
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from benchmarks.compact_arrays import DATA_FILE_PATH, transform
+from src.cloud_storage.aws_storage import SimpleStorageService
+from src.entity.estimator import MyModel
+from src.entity.model_registry import file_codec
+from src.utils.compression import CODEC_METADATA_KEY, CODECS
+from src.utils.main_utils import load_features_target, load_object, save_object
+
+
+def timed(func, repeats: int) -> float:
+    """Median seconds of func over repeats calls, garbage collected before each."""
+    seconds = []
+    for _ in range(repeats):
+        gc.collect()
+        start_time = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start_time)
+    return float(np.median(seconds))
+
+
+def benchmark_codec(codec: str, model: MyModel, tmp_dir: str, bucket_name: str, repeats: int) -> dict:
+    file_path = os.path.join(tmp_dir, f"model.{codec}.pkl")
+    s3_key = f"benchmarks/artifact_codecs/model.{codec}.pkl"
+    s3 = SimpleStorageService()
+    save_seconds = timed(lambda: save_object(file_path, model, codec=codec), repeats)
+    upload_seconds = timed(lambda: s3.upload_file(file_path, s3_key, bucket_name, remove=False,
+                                                  extra_args={"Metadata": {CODEC_METADATA_KEY: file_codec(file_path)}}),
+                           repeats)
+    return {
+        "codec": codec,
+        "size_mb": os.path.getsize(file_path) / 1024 ** 2,
+        "save_seconds": save_seconds,
+        "upload_seconds": upload_seconds,
+        "disk_load_seconds": timed(lambda: load_object(file_path), repeats),
+        "s3_load_seconds": timed(lambda: s3.load_model(s3_key, bucket_name), repeats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="number of copies of the dataset to fit the forest on")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per measurement, the median is reported")
+    parser.add_argument("--bucket", default=None, help="S3 bucket to upload to, moto when omitted")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_FILE_PATH)
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    split = int(len(df) * 0.75)
+    mock = nullcontext()
+    if args.bucket is None:
+        import boto3
+        from moto import mock_aws
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        mock = mock_aws()
+
+    with tempfile.TemporaryDirectory() as tmp_dir, mock:
+        bucket_name = args.bucket or "artifact-codecs-benchmark"
+        if args.bucket is None:
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=bucket_name)
+        train_path, test_path = os.path.join(tmp_dir, "train.csv"), os.path.join(tmp_dir, "test.csv")
+        df.iloc[:split].to_csv(train_path, index=False)
+        df.iloc[split:].to_csv(test_path, index=False)
+        artifact = transform(tmp_dir, train_path, test_path, compact_arrays=True)
+        x_train, y_train = load_features_target(artifact.transformed_train_file_path,
+                                                artifact.transformed_train_target_file_path)
+        forest = RandomForestClassifier(n_estimators=150, max_depth=20, random_state=42).fit(x_train, y_train)
+        model = MyModel(preprocessing_object=load_object(artifact.transformed_object_file_path),
+                        trained_model_object=forest)
+        results = []
+        for codec in CODECS:
+            try:
+                results.append(benchmark_codec(codec, model, tmp_dir, bucket_name, args.repeats))
+            except ImportError as e:
+                print(f"skipping {codec}: {e}")
+
+    print(f"{'codec':<8}{'size MB':>10}{'save s':>10}{'upload s':>10}{'disk load s':>13}{'S3 load s':>11}")
+    for result in results:
+        print(f"{result['codec']:<8}{result['size_mb']:>10.2f}{result['save_seconds']:>10.3f}"
+              f"{result['upload_seconds']:>10.3f}{result['disk_load_seconds']:>13.3f}{result['s3_load_seconds']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares the original load of push_data.py, the whole CSV turned into records through a JSON
+round trip and inserted with one ordered insert_many, with the chunked loader: documents built
+column-wise and inserted in unordered batches by parallel workers, and with the upsert mode,
+whose second load of unchanged data writes nothing. Reports docs per second of the conversion
+alone and of the whole load, on the bundled data repeated --scale times, with unique ids.
+
+Loads go to the MongoDB given with --mongodb-url, or to an in-process mongomock stand-in when it
+is omitted, which measures client-side cost only: mongomock inserts are neither networked nor
+concurrent, so the parallel batches only pay off against a real server. mongomock does not use
+indexes either, every upsert scans the collection, so the upsert steps need --mongodb-url.
+
+Run from the project root:
+    python -m benchmarks.bulk_loader --scale 20 --mongodb-url mongodb://localhost:27017
+"""
+import os
+import argparse
+import json
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.compact_arrays import DATA_FILE_PATH
+from push_data import VehicleDataExtract, dataframe_to_documents
+from src.configuration.mongodb_connection import MongoDBClient
+from src.entity.config_entity import DataLoaderConfig
+
+
+def original_load(file_path: str, collection) -> int:
+    data = pd.read_csv(file_path)
+    records = list(json.loads(data.T.to_json()).values())
+    collection.insert_many(records)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10, help="number of copies of the dataset to load")
+    parser.add_argument("--mongodb-url", default=None, help="MongoDB to load into, mongomock when omitted")
+    parser.add_argument("--max-workers", type=int, default=DataLoaderConfig.max_workers)
+    parser.add_argument("--batch-size", type=int, default=DataLoaderConfig.batch_size)
+    args = parser.parse_args()
+
+    if args.mongodb_url is None:
+        import mongomock
+        MongoDBClient.client = mongomock.MongoClient()
+    else:
+        os.environ["MONGODB_URL_KEY"] = args.mongodb_url
+    database = MongoDBClient(database_name="bulk_loader_benchmark").database
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "insurance_data.csv")
+        data = pd.concat([pd.read_csv(DATA_FILE_PATH)] * args.scale, ignore_index=True)
+        data["id"] = range(len(data))
+        data.to_csv(file_path, index=False)
+        rows = sum(1 for _ in open(file_path)) - 1
+        data = pd.read_csv(file_path)
+
+        start_time = time.perf_counter()
+        json.loads(data.T.to_json())
+        json_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        dataframe_to_documents(data)
+        direct_seconds = time.perf_counter() - start_time
+
+        database.drop_collection("original")
+        start_time = time.perf_counter()
+        original_load(file_path, database["original"])
+        original_seconds = time.perf_counter() - start_time
+
+        loads = {}
+        steps = [("load: chunked, parallel", "insert", "chunked")]
+        if args.mongodb_url is not None:
+            steps += [("upsert: first load", "upsert", "upserted"), ("upsert: unchanged rerun", "upsert", "upserted")]
+        for step, mode, collection_name in steps:
+            if step != "upsert: unchanged rerun":
+                database.drop_collection(collection_name)
+            loader = VehicleDataExtract(DataLoaderConfig(file_path=file_path, database_name="bulk_loader_benchmark",
+                                                         collection_name=collection_name, mode=mode,
+                                                         batch_size=args.batch_size, max_workers=args.max_workers,
+                                                         checkpoint_dir=os.path.join(tmp_dir, "checkpoints")))
+            loads[step] = loader.load_csv().seconds
+        for collection_name in ("original", "chunked", "upserted"):
+            database.drop_collection(collection_name)
+
+    print(f"{rows} rows")
+    print(f"{'step':<28}{'seconds':>10}{'docs/s':>12}")
+    for step, seconds in (("convert: JSON round trip", json_seconds), ("convert: column-wise", direct_seconds),
+                          ("load: original", original_seconds), *loads.items()):
+        print(f"{step:<28}{seconds:>10.3f}{rows / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the float64 transformed layout (target as last column) with the compact layout
+(float32 features, uint8 target vector): memory, disk and RandomForest fit time.
+
+Run from the project root:
+    python -m benchmarks.compact_arrays --scale 10 --repeats 3
+"""
+import os
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from src.components.data_transformation import DataTransformation
+from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from src.entity.config_entity import DataTransformationConfig, ModelTrainerConfig
+from src.utils.main_utils import load_features_target
+
+DATA_FILE_PATH = os.path.join("vehicle_data", "insurance_data.csv")
+
+
+def transform(tmp_dir: str, train_path: str, test_path: str, compact_arrays: bool):
+    layout_dir = os.path.join(tmp_dir, "compact" if compact_arrays else "float64")
+    config = DataTransformationConfig(
+        transformed_train_file_path=os.path.join(layout_dir, "train.npy"),
+        transformed_test_file_path=os.path.join(layout_dir, "test.npy"),
+        transformed_object_file_path=os.path.join(layout_dir, "preprocessing.pkl"),
+        transformed_train_target_file_path=os.path.join(layout_dir, "train_target.npy"),
+        transformed_test_target_file_path=os.path.join(layout_dir, "test_target.npy"),
+        compact_arrays=compact_arrays,
+    )
+    return DataTransformation(
+        data_ingestion_artifact=DataIngestionArtifact(trained_file_path=train_path, test_file_path=test_path),
+        data_transformation_config=config,
+        data_validation_artifact=DataValidationArtifact(True, "", ""),
+    ).initiate_data_transformation()
+
+
+def benchmark_layout(artifact, repeats: int) -> dict:
+    x_train, y_train = load_features_target(artifact.transformed_train_file_path,
+                                            artifact.transformed_train_target_file_path)
+    x_test, _ = load_features_target(artifact.transformed_test_file_path,
+                                     artifact.transformed_test_target_file_path)
+    files = [artifact.transformed_train_file_path, artifact.transformed_train_target_file_path]
+    trainer_config = ModelTrainerConfig()
+    fit_seconds = []
+    for _ in range(repeats):
+        model = RandomForestClassifier(
+            n_estimators=trainer_config._n_estimators,
+            min_samples_split=trainer_config._min_samples_split,
+            min_samples_leaf=trainer_config._min_samples_leaf,
+            max_depth=trainer_config._max_depth,
+            criterion=trainer_config._criterion,
+            max_features=trainer_config._max_features,
+            bootstrap=trainer_config._bootstrap,
+            oob_score=trainer_config._oob_score,
+            random_state=trainer_config._random_state,
+        )
+        start_time = time.perf_counter()
+        model.fit(x_train, y_train)
+        fit_seconds.append(time.perf_counter() - start_time)
+    return {
+        "layout": f"{artifact.feature_dtype}/{artifact.target_dtype}",
+        "memory_mb": (x_train.nbytes + y_train.nbytes) / 1024 ** 2,
+        "disk_mb": sum(os.path.getsize(path) for path in files if path) / 1024 ** 2,
+        "fit_seconds": float(np.median(fit_seconds)),
+        "predictions": model.predict(x_test),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="number of copies of the dataset to benchmark on")
+    parser.add_argument("--repeats", type=int, default=3, help="fits per layout, the median is reported")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_FILE_PATH)
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    split = int(len(df) * 0.75)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_path, test_path = os.path.join(tmp_dir, "train.csv"), os.path.join(tmp_dir, "test.csv")
+        df.iloc[:split].to_csv(train_path, index=False)
+        df.iloc[split:].to_csv(test_path, index=False)
+        results = [benchmark_layout(transform(tmp_dir, train_path, test_path, compact_arrays), args.repeats)
+                   for compact_arrays in (False, True)]
+
+    print(f"{'layout':<16}{'memory MB':>12}{'disk MB':>12}{'fit s':>10}")
+    for result in results:
+        print(f"{result['layout']:<16}{result['memory_mb']:>12.2f}{result['disk_mb']:>12.2f}{result['fit_seconds']:>10.3f}")
+    same = np.array_equal(results[0]["predictions"], results[1]["predictions"])
+    print(f"identical test predictions: {same}")
+
+
+if __name__ == "__main__":
+    main()
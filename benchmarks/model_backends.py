@@ -0,0 +1,74 @@
+"""
+Compares the model backends of the trainer on the transformed insurance data: fit time,
+pickled model size, p99 latency of a single row prediction and test F1.
+
+Run from the project root:
+    python -m benchmarks.model_backends --scale 10 --latency-rows 1000
+"""
+import os
+import argparse
+import tempfile
+import time
+
+import dill
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from benchmarks.compact_arrays import DATA_FILE_PATH, transform
+from src.components.model_trainer import ModelTrainer
+from src.entity.config_entity import ModelTrainerConfig
+from src.utils.main_utils import load_features_target, load_object
+from src.utils.model_backend import MODEL_BACKENDS, build_model, fit_model, get_categorical_features
+
+
+def benchmark_backend(backend: str, artifact, latency_rows: int) -> dict:
+    x_train, y_train = load_features_target(artifact.transformed_train_file_path,
+                                            artifact.transformed_train_target_file_path)
+    x_test, y_test = load_features_target(artifact.transformed_test_file_path,
+                                          artifact.transformed_test_target_file_path)
+    config = ModelTrainerConfig(model_backend=backend)
+    model = build_model(backend, ModelTrainer.get_model_params(config),
+                        get_categorical_features(backend, load_object(artifact.transformed_object_file_path)))
+    start_time = time.perf_counter()
+    fit_model(model, x_train, y_train, n_jobs=os.cpu_count() or 1)
+    fit_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    for row in x_test[:latency_rows]:
+        start_time = time.perf_counter()
+        model.predict(row.reshape(1, -1))
+        latencies.append(time.perf_counter() - start_time)
+    return {
+        "backend": backend,
+        "fit_seconds": fit_seconds,
+        "size_mb": len(dill.dumps(model)) / 1024 ** 2,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "f1": f1_score(y_test, model.predict(x_test)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="number of copies of the dataset to benchmark on")
+    parser.add_argument("--latency-rows", type=int, default=500, help="single row predictions timed per backend")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_FILE_PATH)
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    split = int(len(df) * 0.75)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_path, test_path = os.path.join(tmp_dir, "train.csv"), os.path.join(tmp_dir, "test.csv")
+        df.iloc[:split].to_csv(train_path, index=False)
+        df.iloc[split:].to_csv(test_path, index=False)
+        artifact = transform(tmp_dir, train_path, test_path, compact_arrays=True)
+        results = [benchmark_backend(backend, artifact, args.latency_rows) for backend in MODEL_BACKENDS]
+
+    print(f"{'backend':<24}{'fit s':>10}{'size MB':>10}{'p99 ms':>10}{'F1':>8}")
+    for result in results:
+        print(f"{result['backend']:<24}{result['fit_seconds']:>10.3f}{result['size_mb']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['f1']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
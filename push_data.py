@@ -1,20 +1,49 @@
 import os
 import sys
 import json
+import time
+import struct
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
 import pandas as pd
-import pymongo
-import numpy as np
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from src.configuration.mongodb_connection import MongoDBClient
+from src.entity.artifact_entity import DataLoaderArtifact
+from src.entity.config_entity import DataLoaderConfig
 from src.logging.logger import logging
 from src.exception.exception import VehicleInsuranceException
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MONGODB_URL_KEY = os.getenv("MONGODB_URL_KEY")
-print(MONGODB_URL_KEY)  
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+def row_hashes(data: pd.DataFrame) -> List[str]:
+    """Hash of the content of every row, 16 hex digits of the vectorized pandas row hash."""
+    return [format(row_hash, "016x") for row_hash in pd.util.hash_pandas_object(data, index=False).tolist()]
+
+
+def dataframe_to_documents(data: pd.DataFrame) -> List[dict]:
+    """
+    Converts the rows of a DataFrame into MongoDB documents, one dict per row with python scalars and
+    None for missing values, built column-wise without serializing the frame to JSON
+    """
+    columns = data.columns.tolist()
+    values = []
+    for column in columns:
+        series = data[column]
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        values.append(series.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
 
-import certifi
-ca = certifi.where()
 
 class VehicleDataExtract:
     """
@@ -23,19 +52,23 @@ class VehicleDataExtract:
     This class provides methods to:
     - Convert a CSV file into JSON records.
     - Insert JSON records into a specified MongoDB database and collection.
+    - Stream a CSV file into MongoDB in chunks, with unordered batches inserted in parallel over the
+      pooled client of MongoDBClient, and a checkpoint from which a failed load resumes.
+    - In upsert mode, write only the rows that are new or changed since the last load, keyed on the id column.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, data_loader_config: DataLoaderConfig = None) -> None:
         """
         Initializes the VehicleDataExtract class.
 
-        Handles any initialization requirements. Currently, it does not initialize any instance variables.
+        Parameters:
+            data_loader_config (DataLoaderConfig): chunk, batch, concurrency and checkpoint settings.
 
         Raises:
-            MyException: If an error occurs during initialization.
+            VehicleInsuranceException: If an error occurs during initialization.
         """
         try:
-            pass
+            self.data_loader_config = data_loader_config or DataLoaderConfig()
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
@@ -53,9 +86,7 @@ class VehicleDataExtract:
             VehicleInsuranceException: If an error occurs while reading or transforming the CSV file.
         """
         try:
-            data = pd.read_csv(file_path)
-            data.reset_index(drop=True, inplace=True)
-            records = list(json.loads(data.T.to_json()).values())
+            records = dataframe_to_documents(pd.read_csv(file_path))
             logging.info("Successfully converted data from csv to json")
             return records
 
@@ -64,7 +95,7 @@ class VehicleDataExtract:
 
     def insert_data_to_mongodb(self, records, database, collection):
         """
-        Inserts JSON records into a MongoDB database and collection.
+        Inserts JSON records into a MongoDB database and collection, in unordered batches inserted in parallel.
 
         Parameters:
             records (list): The list of JSON records to be inserted.
@@ -78,45 +109,221 @@ class VehicleDataExtract:
             VehicleInsuranceException: If an error occurs while interacting with the MongoDB database.
         """
         try:
-            self.database = database
-            self.collection = collection
-            self.records = records
-
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
-            self.database = self.mongo_client[self.database]
-
-            self.collection = self.database[self.collection]
+            mongo_collection = MongoDBClient(database_name=database).database[collection]
+            batch_size = self.data_loader_config.batch_size
+            batches = ((start, records[start:start + batch_size]) for start in range(0, len(records), batch_size))
             logging.info("Started inserting data into MongoDB")
-            self.collection.insert_many(self.records)
+            inserted, _, _ = self.insert_batches(mongo_collection, batches)
             logging.info("Inserted data into MongoDB")
-            return len(self.records)
+            return inserted
+
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    @staticmethod
+    def insert_batch(collection, documents: List[dict]) -> Tuple[int, int, int]:
+        """
+        Unordered insert_many of one batch. Documents whose _id is already in the collection, inserted
+        by an earlier attempt of the same load, are skipped
+        return: number of documents inserted, updated (always 0) and already in the collection
+        """
+        try:
+            return len(collection.insert_many(documents, ordered=False).inserted_ids), 0, 0
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or any(
+                    error["code"] != DUPLICATE_KEY_ERROR_CODE for error in write_errors):
+                raise
+            return e.details["nInserted"], 0, len(write_errors)
+
+    def upsert_batch(self, collection, documents: List[dict]) -> Tuple[int, int, int]:
+        """
+        Writes the documents of one batch that are new or changed. The row hashes stored for the keys of
+        the batch are read in one query, documents with the same hash are skipped and the others replace
+        the document of their key, or are inserted, in one unordered bulk write
+        return: number of documents inserted, updated and unchanged
+        """
+        key_field, row_hash_field = self.data_loader_config.key_field, self.data_loader_config.row_hash_field
+        stored_hashes = {
+            document[key_field]: document.get(row_hash_field)
+            for document in collection.find({key_field: {"$in": [document[key_field] for document in documents]}},
+                                            projection={key_field: 1, row_hash_field: 1, "_id": 0})
+        }
+        changed = [document for document in documents
+                   if stored_hashes.get(document[key_field], "") != document[row_hash_field]]
+        if not changed:
+            return 0, 0, len(documents)
+        requests = [ReplaceOne({key_field: document[key_field]}, document, upsert=True) for document in changed]
+        try:
+            result = collection.bulk_write(requests, ordered=False)
+            inserted, updated = result.upserted_count, result.modified_count
+        except BulkWriteError as e:
+            # two upserts of a new key racing each other, the loser is retried as an update
+            write_errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or any(
+                    error["code"] != DUPLICATE_KEY_ERROR_CODE for error in write_errors):
+                raise
+            retried = collection.bulk_write([requests[error["index"]] for error in write_errors], ordered=False)
+            inserted = e.details["nUpserted"] + retried.upserted_count
+            updated = e.details["nModified"] + retried.modified_count
+        return inserted, updated, len(documents) - len(changed)
+
+    def insert_batches(self, collection, batches: Iterator[Tuple[int, List[dict]]],
+                       on_progress: Optional[Callable[[int], None]] = None,
+                       write_batch: Optional[Callable[[object, List[dict]], Tuple[int, int, int]]] = None
+                       ) -> Tuple[int, int, int]:
+        """
+        Writes batches concurrently, with at most two per worker in flight. Batches are collected in the
+        order they were read, so once a batch is collected every row before its end is in the collection
+        batches: (first row, documents) of each batch, in row order
+        on_progress: called with the number of rows from the start known to be written
+        write_batch: insert_batch by default, or upsert_batch
+        return: number of documents inserted, updated and already in the collection
+        """
+        write_batch = write_batch or self.insert_batch
+        counts = [0, 0, 0]
+        in_flight = deque()
+
+        def collect_oldest() -> None:
+            end_row, future = in_flight.popleft()
+            for position, count in enumerate(future.result()):
+                counts[position] += count
+            if on_progress is not None:
+                on_progress(end_row)
+
+        with ThreadPoolExecutor(max_workers=self.data_loader_config.max_workers) as executor:
+            for start_row, documents in batches:
+                if len(in_flight) >= 2 * self.data_loader_config.max_workers:
+                    collect_oldest()
+                in_flight.append((start_row + len(documents), executor.submit(write_batch, collection, documents)))
+            while in_flight:
+                collect_oldest()
+        return counts[0], counts[1], counts[2]
+
+    def ensure_key_index(self, collection) -> None:
+        """
+        Unique index on the key field that upserts look documents up by, created when missing
+        On Failure  :   ValueError when the collection already holds duplicate keys, e.g. from loads in insert mode
+        """
+        key_field = self.data_loader_config.key_field
+        try:
+            collection.create_index(key_field, unique=True)
+        except DuplicateKeyError as e:
+            raise ValueError(f"{collection.name} holds documents with the same {key_field}, loaded in insert "
+                             f"mode; remove the duplicates before loading in upsert mode") from e
+
+    def checkpoint_path(self, file_path: str) -> str:
+        """Checkpoint file of the load of one CSV file into the configured collection."""
+        load_key = "|".join([os.path.abspath(file_path), self.data_loader_config.database_name,
+                             self.data_loader_config.collection_name])
+        return os.path.join(self.data_loader_config.checkpoint_dir,
+                            f"{hashlib.sha1(load_key.encode()).hexdigest()}.json")
+
+    def read_checkpoint(self, file_path: str) -> Optional[dict]:
+        """Checkpoint of an unfinished load of the file, None when there is none or the file changed since."""
+        checkpoint_path = self.checkpoint_path(file_path)
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        stat = os.stat(file_path)
+        if (checkpoint["size"], checkpoint["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            logging.info(f"{file_path} changed since the checkpoint of its last load, loading it from the start")
+            return None
+        return checkpoint
+
+    def write_checkpoint(self, file_path: str, checkpoint: dict) -> None:
+        checkpoint_path = self.checkpoint_path(file_path)
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        with open(f"{checkpoint_path}.tmp", "w") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(f"{checkpoint_path}.tmp", checkpoint_path)
+
+    def load_csv(self, file_path: Optional[str] = None) -> DataLoaderArtifact:
+        """
+        Method Name :   load_csv
+        Description :   Streams a CSV file into the configured collection. Chunks of chunk_rows rows are
+                        parsed and converted to documents with the hash of their row, and written in unordered
+                        batches by max_workers threads. In upsert mode only rows whose key is new or whose hash
+                        changed are written, so loading unchanged data again writes nothing. In insert mode
+                        every document gets an _id derived from the load and its row. The rows known to be
+                        written are checkpointed after every batch: a failed load started again skips the
+                        checkpointed rows, and rows it had written past them are not written twice.
+                        The checkpoint is removed once the whole file is loaded
+
+        Output      :   Returns the rows loaded, documents inserted and updated, and docs per second
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            file_path = file_path or self.data_loader_config.file_path
+            checkpoint = self.read_checkpoint(file_path)
+            if checkpoint is None:
+                stat = os.stat(file_path)
+                checkpoint = {"file_path": file_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                              "load_started": int(time.time()), "rows_loaded": 0}
+            resumed_from_row = checkpoint["rows_loaded"]
+            if resumed_from_row:
+                logging.info(f"Resuming the load of {file_path} after row {resumed_from_row}")
+
+            # ObjectId of 4 bytes of load start time, 3 bytes of the file path and 5 bytes of row number
+            id_prefix = (struct.pack(">I", checkpoint["load_started"])
+                         + hashlib.sha1(os.path.abspath(file_path).encode()).digest()[:3])
+            collection = MongoDBClient(database_name=self.data_loader_config.database_name).database[
+                self.data_loader_config.collection_name]
+            upsert = self.data_loader_config.mode == "upsert"
+            if upsert:
+                self.ensure_key_index(collection)
+            elif self.data_loader_config.mode != "insert":
+                raise ValueError(f"Unknown load mode {self.data_loader_config.mode}, expected upsert or insert")
+            batch_size = self.data_loader_config.batch_size
+            start_time = time.perf_counter()
+
+            def iter_batches() -> Iterator[Tuple[int, List[dict]]]:
+                row = resumed_from_row
+                chunks = pd.read_csv(file_path, chunksize=self.data_loader_config.chunk_rows,
+                                     skiprows=range(1, resumed_from_row + 1))
+                for chunk in chunks:
+                    documents = dataframe_to_documents(chunk)
+                    for offset, (document, row_hash) in enumerate(zip(documents, row_hashes(chunk))):
+                        document[self.data_loader_config.row_hash_field] = row_hash
+                        if not upsert:
+                            document["_id"] = ObjectId(id_prefix + (row + offset).to_bytes(5, "big"))
+                    for start in range(0, len(documents), batch_size):
+                        yield row + start, documents[start:start + batch_size]
+                    row += len(documents)
+                    elapsed = time.perf_counter() - start_time
+                    logging.info(f"Parsed {row - resumed_from_row} rows of {file_path}, "
+                                 f"{(row - resumed_from_row) / max(elapsed, 1e-9):.0f} docs/s")
+
+            def save_progress(rows_loaded: int) -> None:
+                checkpoint["rows_loaded"] = rows_loaded
+                self.write_checkpoint(file_path, checkpoint)
+
+            inserted, updated, already_loaded = self.insert_batches(
+                collection, iter_batches(), on_progress=save_progress,
+                write_batch=self.upsert_batch if upsert else self.insert_batch)
+            seconds = time.perf_counter() - start_time
+            if os.path.exists(self.checkpoint_path(file_path)):
+                os.remove(self.checkpoint_path(file_path))
+
+            rows_loaded = checkpoint["rows_loaded"] - resumed_from_row
+            data_loader_artifact = DataLoaderArtifact(rows_loaded=rows_loaded,
+                                                      documents_inserted=inserted,
+                                                      documents_updated=updated,
+                                                      documents_already_loaded=already_loaded,
+                                                      resumed_from_row=resumed_from_row,
+                                                      seconds=seconds,
+                                                      docs_per_second=rows_loaded / max(seconds, 1e-9))
+            logging.info(f"Data loader artifact: {data_loader_artifact}")
+            logging.info(f"MongoDB client stats after the load: {MongoDBClient.get_stats()}")
+            return data_loader_artifact
 
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
 
 if __name__ == "__main__":
-    file_path = "vehicle_data\insurance_data.csv"
-    database = "vehicle"
-    collection = "vehicleInsurance"
-
-    network_obj = VehicleDataExtract()
-    records = network_obj.csv_to_json(file_path=file_path)
-    no_of_records = network_obj.insert_data_to_mongodb(records, database, collection)
-    print(no_of_records)
-    # print(records)
-
-# Below code is for testing the connection with MongoDB
-# from pymongo.mongo_client import MongoClient
-
-# uri = "mongodb+srv://bhaveshdb:<password>@cluster0.q88cz.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
-
-# Create a new client and connect to the server
-# client = MongoClient(uri)
-
-# Send a ping to confirm a successful connection
-# try:
-#    client.admin.command("ping")
-#    print("Pinged your deployment. You successfully connected to MongoDB!")
-# except Exception as e:
-#    print(e)
+    data_loader_artifact = VehicleDataExtract().load_csv()
+    print(f"Loaded {data_loader_artifact.rows_loaded} rows in {data_loader_artifact.seconds:.2f}s "
+          f"({data_loader_artifact.docs_per_second:.0f} docs/s): {data_loader_artifact.documents_inserted} inserted, "
+          f"{data_loader_artifact.documents_updated} updated, {data_loader_artifact.documents_already_loaded} unchanged")
@@ -1,4 +1,5 @@
 from src.pipeline.training_pipeline import TrainPipeline
 
-pipeline = TrainPipeline()
-pipeline.run_pipeline()
+if __name__ == "__main__":
+    pipeline = TrainPipeline()
+    pipeline.run_pipeline()
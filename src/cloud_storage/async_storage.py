@@ -0,0 +1,103 @@
+import sys
+from typing import AsyncIterator, Optional
+
+from botocore.exceptions import ClientError
+
+from src.configuration.aws_connection import AsyncS3Client
+from src.entity.config_entity import S3TransferConfig
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+
+class AsyncSimpleStorageService:
+    """
+    asyncio access to S3 for the serving path: HEAD, streamed GET and conditional GET. Requests run on
+    the event loop of the caller without blocking a thread, with the connection pool and retries of
+    S3TransferConfig. Use it as an async context manager, the client lives as long as the block.
+    """
+
+    def __init__(self, s3_transfer_config: S3TransferConfig = None):
+        self.s3_transfer_config = s3_transfer_config or S3TransferConfig()
+        self.async_s3_client = AsyncS3Client(s3_transfer_config=self.s3_transfer_config)
+
+    async def __aenter__(self):
+        await self.async_s3_client.__aenter__()
+        self.s3_client = self.async_s3_client.s3_client
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.async_s3_client.__aexit__(exc_type, exc_value, traceback)
+
+    async def get_object_metadata(self, bucket_name: str, s3_key: str) -> Optional[dict]:
+        """
+        Returns the ETag, ContentLength, LastModified and user Metadata of an exact key from a HEAD request.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+
+        Returns:
+            Optional[dict]: The metadata, None when there is no object at the key.
+        """
+        try:
+            head = await self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+            return {"ETag": head["ETag"], "ContentLength": head["ContentLength"],
+                    "LastModified": head["LastModified"], "Metadata": head.get("Metadata", {})}
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise VehicleInsuranceException(e, sys) from e
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    async def get_object(self, bucket_name: str, s3_key: str, if_none_match: Optional[str] = None) -> Optional[dict]:
+        """
+        Reads a small object whole, e.g. a manifest. With if_none_match, S3 answers 304 Not Modified
+        without a body while the object still has that ETag.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+            if_none_match (str): ETag of the copy the caller already has.
+
+        Returns:
+            Optional[dict]: {"Body": bytes, "ETag": str}, None when the object has not changed.
+        """
+        try:
+            kwargs = {"IfNoneMatch": if_none_match} if if_none_match else {}
+            try:
+                response = await self.s3_client.get_object(Bucket=bucket_name, Key=s3_key, **kwargs)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("304", "NotModified"):
+                    return None
+                raise
+            async with response["Body"] as body:
+                content = await body.read()
+            return {"Body": content, "ETag": response["ETag"]}
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    async def iter_object_chunks(self, bucket_name: str, s3_key: str, chunk_size: int = 1024 * 1024,
+                                 if_match: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Streams the content of an object in chunks of at most chunk_size bytes.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+            if_match (str): ETag the object must still have, a concurrent overwrite fails the read.
+
+        Yields:
+            bytes: The next chunk.
+        """
+        try:
+            kwargs = {"IfMatch": if_match} if if_match else {}
+            response = await self.s3_client.get_object(Bucket=bucket_name, Key=s3_key, **kwargs)
+            size = 0
+            async with response["Body"] as body:
+                async for chunk in body.iter_chunks(chunk_size):
+                    size += len(chunk)
+                    yield chunk
+            logging.info(f"Streamed {size} bytes of {s3_key} from {bucket_name}")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
@@ -1,35 +1,195 @@
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
 from src.configuration.aws_connection import S3Client
+from src.entity.config_entity import S3TransferConfig
+from src.cloud_storage.s3_stream import S3MultipartWriter, S3ObjectReader
+from src.utils.compression import CODEC_METADATA_KEY, check_codec, compress_stream, decompress_stream
 from io import StringIO
-from typing import Union,List
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union, List
+from concurrent.futures import ThreadPoolExecutor
 import os,sys
+import io
+import posixpath
+import threading
+import time
 
 from src.logging.logger import logging
 from mypy_boto3_s3.service_resource import Bucket
 from src.exception.exception import VehicleInsuranceException
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, HTTPClientError, IncompleteReadError
+from botocore.exceptions import ConnectionError as S3ConnectionError
 from pandas import DataFrame,read_csv
-import pickle
+import dill
+
+# failures of a transfer that are worth retrying: dropped connections, timeouts and truncated bodies.
+# botocore retries the request itself, these can also happen while a response body is being read
+TRANSIENT_ERRORS = (HTTPClientError, S3ConnectionError, IncompleteReadError)
+
+# compressions of streamed CSV objects and the key extension they are inferred from
+STREAM_COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst", None: ""}
+
+
+def import_pyarrow():
+    """pyarrow is an optional dependency, only Parquet streaming needs it."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Streaming Parquet objects needs the optional pyarrow package (pip install pyarrow)") from e
+    return pyarrow
 
 
 class SimpleStorageService:
     """
     A class for interacting with AWS S3 storage, providing methods for file management, 
     data uploads, and data retrieval in S3 buckets.
+
+    Object metadata (ETag, size, last modified) is cached for metadata_ttl_seconds and shared by all
+    instances of the process, so existence checks and model version checks cost at most one HEAD
+    request per key and TTL. Writes through this class invalidate the keys they touch.
     """
 
-    def __init__(self):
+    _metadata_cache: Dict[Tuple[str, str], Tuple[float, Optional[dict]]] = {}
+    _metadata_lock = threading.Lock()
+
+    def __init__(self, s3_transfer_config: S3TransferConfig = None):
         """
         Initializes the SimpleStorageService instance with S3 resource and client
-        from the S3Client class.
+        from the S3Client class, and the multipart settings of uploads and downloads.
         """
-        s3_client = S3Client()
+        self.s3_transfer_config = s3_transfer_config or S3TransferConfig()
+        s3_client = S3Client(s3_transfer_config=self.s3_transfer_config)
         self.s3_resource = s3_client.s3_resource
         self.s3_client = s3_client.s3_client
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.s3_transfer_config.multipart_threshold,
+            multipart_chunksize=self.s3_transfer_config.multipart_chunksize,
+            max_concurrency=self.s3_transfer_config.max_concurrency,
+            use_threads=True,
+        )
+
+    def with_retries(self, func, *args, **kwargs):
+        """
+        Calls func, retrying transient transfer failures with exponential backoff.
+
+        Returns:
+            The result of func.
+        """
+        max_attempts = self.s3_transfer_config.max_attempts
+        for attempt in range(1, max_attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                if attempt == max_attempts:
+                    raise
+                backoff = self.s3_transfer_config.retry_backoff_seconds * 2 ** (attempt - 1)
+                logging.warning(f"Transient S3 error ({e}), retry {attempt}/{max_attempts - 1} in {backoff:.2f}s")
+                time.sleep(backoff)
+
+    def _get_range(self, bucket_name: str, s3_key: str, etag: str, start: int, end: int) -> bytes:
+        """Reads bytes start to end (inclusive) of the object version with the given ETag."""
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_key, IfMatch=etag, Range=f"bytes={start}-{end}")
+        return response["Body"].read()
+
+    def get_object_bytes(self, bucket_name: str, s3_key: str) -> bytes:
+        """
+        Reads the whole content of an object. Objects above ranged_get_threshold are read as
+        ranged GETs of ranged_get_chunksize bytes on max_concurrency threads, each part pinned to
+        the ETag of the first HEAD so a concurrent overwrite cannot mix two versions.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+
+        Returns:
+            bytes: The content of the object.
+        """
+        try:
+            head = self.get_object_metadata(bucket_name, s3_key, use_cache=False)
+            if head is None:
+                raise FileNotFoundError(f"No object at s3://{bucket_name}/{s3_key}")
+            size, etag = head["ContentLength"], head["ETag"]
+            if size <= self.s3_transfer_config.ranged_get_threshold:
+                return self.with_retries(lambda: self.s3_client.get_object(
+                    Bucket=bucket_name, Key=s3_key, IfMatch=etag)["Body"].read())
+
+            chunk_size = self.s3_transfer_config.ranged_get_chunksize
+            ranges = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+            content = bytearray(size)
+            with ThreadPoolExecutor(max_workers=self.s3_transfer_config.max_concurrency) as executor:
+                futures = {executor.submit(self.with_retries, self._get_range, bucket_name, s3_key, etag, start, end): start
+                           for start, end in ranges}
+                for future, start in futures.items():
+                    part = future.result()
+                    content[start:start + len(part)] = part
+            logging.info(f"Read {size} bytes of {s3_key} in {len(ranges)} ranged GETs")
+            return bytes(content)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def download_file(self, bucket_name: str, s3_key: str, to_filename: str) -> None:
+        """
+        Downloads an object to a local file, large objects in parallel ranged parts.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+            to_filename (str): Path of the local file.
+        """
+        try:
+            os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+            self.with_retries(self.s3_client.download_file, bucket_name, s3_key, to_filename,
+                              Config=self.transfer_config)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def _cache_metadata(self, bucket_name: str, s3_key: str, metadata: Optional[dict]) -> None:
+        """Keeps the metadata of a key, None for a missing key, until the TTL runs out."""
+        expires_at = time.monotonic() + self.s3_transfer_config.metadata_ttl_seconds
+        with SimpleStorageService._metadata_lock:
+            SimpleStorageService._metadata_cache[(bucket_name, s3_key)] = (expires_at, metadata)
+
+    def invalidate_metadata(self, bucket_name: str, s3_key: str) -> None:
+        """Drops the cached metadata of a key, e.g. after it was written."""
+        with SimpleStorageService._metadata_lock:
+            SimpleStorageService._metadata_cache.pop((bucket_name, s3_key), None)
+
+    def get_object_metadata(self, bucket_name: str, s3_key: str, use_cache: bool = True) -> Optional[dict]:
+        """
+        Returns the ETag, ContentLength, LastModified and user Metadata of an exact key from a HEAD
+        request, or from the metadata cache while its entry is younger than metadata_ttl_seconds.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+            use_cache (bool): False always sends the HEAD request and refreshes the cache.
+
+        Returns:
+            Optional[dict]: The metadata, None when there is no object at the key.
+        """
+        try:
+            if use_cache:
+                with SimpleStorageService._metadata_lock:
+                    expires_at, metadata = SimpleStorageService._metadata_cache.get((bucket_name, s3_key), (0.0, None))
+                if expires_at > time.monotonic():
+                    return metadata
+            try:
+                head = self.with_retries(self.s3_client.head_object, Bucket=bucket_name, Key=s3_key)
+                metadata = {"ETag": head["ETag"], "ContentLength": head["ContentLength"],
+                            "LastModified": head["LastModified"], "Metadata": head.get("Metadata", {})}
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                    raise
+                metadata = None
+            self._cache_metadata(bucket_name, s3_key, metadata)
+            return metadata
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
 
     def s3_key_path_available(self, bucket_name, s3_key) -> bool:
         """
         Checks if a specified S3 key path (file path) is available in the specified bucket.
+        Only the exact key matches, keys that merely start with it do not.
 
         Args:
             bucket_name (str): Name of the S3 bucket.
@@ -39,12 +199,61 @@ class SimpleStorageService:
             bool: True if the file exists, False otherwise.
         """
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=s3_key)]
-            return len(file_objects) > 0
+            return self.get_object_metadata(bucket_name, s3_key) is not None
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
+    def s3_keys_available(self, bucket_name: str, s3_keys: Iterable[str]) -> Dict[str, bool]:
+        """
+        Checks many keys at once. Keys under a common parent prefix with at least batch_list_min_keys
+        uncached keys are resolved by one paginated listing of that prefix, the others by concurrent
+        HEAD requests. Every answer goes into the metadata cache.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_keys (Iterable[str]): Keys to check.
+
+        Returns:
+            Dict[str, bool]: Whether each key exists.
+        """
+        try:
+            s3_keys = list(dict.fromkeys(s3_keys))
+            now = time.monotonic()
+            with SimpleStorageService._metadata_lock:
+                cached = {key: SimpleStorageService._metadata_cache.get((bucket_name, key)) for key in s3_keys}
+            available = {key: entry[1] is not None for key, entry in cached.items() if entry and entry[0] > now}
+
+            by_prefix: Dict[str, List[str]] = {}
+            for key in s3_keys:
+                if key not in available:
+                    parent = posixpath.dirname(key)
+                    by_prefix.setdefault(f"{parent}/" if parent else "", []).append(key)
+
+            head_keys = []
+            for prefix, keys in by_prefix.items():
+                if len(keys) < self.s3_transfer_config.batch_list_min_keys:
+                    head_keys.extend(keys)
+                    continue
+                listed = {}
+                paginator = self.s3_client.get_paginator("list_objects_v2")
+                for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter="/"):
+                    for obj in page.get("Contents", []):
+                        listed[obj["Key"]] = {"ETag": obj["ETag"], "ContentLength": obj["Size"],
+                                              "LastModified": obj["LastModified"]}
+                for key in keys:
+                    self._cache_metadata(bucket_name, key, listed.get(key))
+                    available[key] = key in listed
+
+            if head_keys:
+                with ThreadPoolExecutor(max_workers=self.s3_transfer_config.max_concurrency) as executor:
+                    results = executor.map(lambda key: self.get_object_metadata(bucket_name, key, use_cache=False),
+                                           head_keys)
+                    for key, metadata in zip(head_keys, results):
+                        available[key] = metadata is not None
+            return {key: available[key] for key in s3_keys}
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
     @staticmethod
     def read_object(object_name: str, decode: bool = True, make_readable: bool = False) -> Union[StringIO, str]:
         """
@@ -112,7 +321,9 @@ class SimpleStorageService:
 
     def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
         """
-        Loads a serialized model from the specified S3 bucket.
+        Loads a serialized model from the specified S3 bucket. The object is decompressed and
+        unpickled while it is streamed, with the codec recorded in its metadata or, for objects
+        uploaded without one, sniffed from its first bytes.
 
         Args:
             model_name (str): Name of the model file in the bucket.
@@ -124,14 +335,38 @@ class SimpleStorageService:
         """
         try:
             model_file = model_dir + "/" + model_name if model_dir else model_name
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            with self.open_object(bucket_name, model_file) as file_obj:
+                codec = file_obj.raw.metadata.get(CODEC_METADATA_KEY)
+                with decompress_stream(file_obj, codec) as stream:
+                    model = dill.load(stream)
             logging.info("Production model loaded from S3 bucket.")
             return model
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
 
+    def save_model(self, obj: object, s3_key: str, bucket_name: str, codec: Optional[str] = "none",
+                   level: Optional[int] = None) -> None:
+        """
+        Pickles an object with dill straight into S3, compressed on the fly and uploaded in parts
+        while it is serialized (see open_writer), without a local file. The codec is recorded in the
+        object metadata for load_model.
+
+        Args:
+            obj (object): Object to save, e.g. a model.
+            s3_key (str): Target key in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            codec (str): One of utils.compression.CODECS.
+            level (int): Compression level, the default of the codec when None.
+        """
+        try:
+            codec = check_codec(codec)
+            with self.open_writer(bucket_name, s3_key, extra_args={"Metadata": {CODEC_METADATA_KEY: codec}}) as writer:
+                with compress_stream(writer, codec, level) as stream:
+                    dill.dump(obj, stream)
+            logging.info(f"Saved {type(obj).__name__} to {s3_key} in {bucket_name} ({codec})")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
     def create_folder(self, folder_name: str, bucket_name: str) -> None:
         """
         Creates a folder in the specified S3 bucket.
@@ -151,7 +386,8 @@ class SimpleStorageService:
                 self.s3_client.put_object(Bucket=bucket_name, Key=folder_obj)
             logging.info("Exited the create_folder method of SimpleStorageService class")
 
-    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True,
+                    extra_args: Optional[dict] = None):
         """
         Uploads a local file to the specified S3 bucket with an optional file deletion.
 
@@ -160,11 +396,14 @@ class SimpleStorageService:
             to_filename (str): Target file path in the bucket.
             bucket_name (str): Name of the S3 bucket.
             remove (bool): If True, deletes the local file after upload.
+            extra_args (dict): Extra arguments of the upload, e.g. Metadata.
         """
         logging.info("Entered the upload_file method of SimpleStorageService class")
         try:
             logging.info(f"Uploading {from_filename} to {to_filename} in {bucket_name}")
-            self.s3_resource.meta.client.upload_file(from_filename, bucket_name, to_filename)
+            self.with_retries(self.s3_resource.meta.client.upload_file, from_filename, bucket_name, to_filename,
+                              ExtraArgs=extra_args, Config=self.transfer_config)
+            self.invalidate_metadata(bucket_name, to_filename)
             logging.info(f"Uploaded {from_filename} to {to_filename} in {bucket_name}")
 
             # Delete the local file if remove is True
@@ -175,28 +414,207 @@ class SimpleStorageService:
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
 
+    def upload_directory(self, from_dir: str, to_prefix: str, bucket_name: str) -> List[str]:
+        """
+        Uploads every file below a local directory concurrently, keeping the relative paths under to_prefix.
+        All files share one transfer manager, so max_concurrency bounds the parts in flight across files
+        and the manager retries failed parts.
+
+        Args:
+            from_dir (str): Path of the local directory.
+            to_prefix (str): Key prefix in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+
+        Returns:
+            List[str]: Keys of the uploaded files.
+        """
+        logging.info("Entered the upload_directory method of SimpleStorageService class")
+        try:
+            uploads = []
+            for root, _, file_names in os.walk(from_dir):
+                for file_name in file_names:
+                    file_path = os.path.join(root, file_name)
+                    relative_path = os.path.relpath(file_path, from_dir).replace(os.sep, "/")
+                    uploads.append((file_path, f"{to_prefix.rstrip('/')}/{relative_path}"))
+
+            start_time = time.perf_counter()
+            with create_transfer_manager(self.s3_client, self.transfer_config) as transfer_manager:
+                futures = [(transfer_manager.upload(file_path, bucket_name, s3_key), file_path, s3_key)
+                           for file_path, s3_key in uploads]
+                for future, file_path, s3_key in futures:
+                    future.result()
+                    self.invalidate_metadata(bucket_name, s3_key)
+            n_bytes = sum(os.path.getsize(file_path) for file_path, _ in uploads)
+            logging.info(f"Uploaded {len(uploads)} files ({n_bytes} bytes) from {from_dir} to {to_prefix} "
+                         f"in {time.perf_counter() - start_time:.3f}s")
+            return [s3_key for _, s3_key in uploads]
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def get_stream_compression(s3_key: str, compression: Optional[str] = "infer") -> Optional[str]:
+        """
+        Resolves the compression of a streamed object, "infer" picks it from the key extension.
+
+        Returns:
+            Optional[str]: One of STREAM_COMPRESSIONS.
+        """
+        if compression == "infer":
+            compression = next((name for name, suffix in STREAM_COMPRESSIONS.items()
+                                if suffix and s3_key.endswith(suffix)), None)
+        if compression not in STREAM_COMPRESSIONS:
+            raise ValueError(f"Unsupported compression {compression}, expected one of {list(STREAM_COMPRESSIONS)}")
+        return compression
+
+    def open_object(self, bucket_name: str, s3_key: str) -> io.BufferedReader:
+        """
+        Opens an object as a seekable binary file, read in ranged GETs of ranged_get_chunksize bytes
+        pinned to the current ETag, see S3ObjectReader. Only one block of the object is held in memory.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+
+        Returns:
+            io.BufferedReader: The file object, to be closed by the caller.
+        """
+        try:
+            head = self.get_object_metadata(bucket_name, s3_key, use_cache=False)
+            if head is None:
+                raise FileNotFoundError(f"No object at s3://{bucket_name}/{s3_key}")
+            reader = S3ObjectReader(self.s3_client, bucket_name, s3_key, etag=head["ETag"],
+                                    size=head["ContentLength"], metadata=head["Metadata"],
+                                    block_size=self.s3_transfer_config.ranged_get_chunksize,
+                                    with_retries=self.with_retries)
+            return io.BufferedReader(reader)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def open_writer(self, bucket_name: str, s3_key: str, extra_args: Optional[dict] = None) -> S3MultipartWriter:
+        """
+        Opens a binary file whose content is uploaded while it is written, in multipart_chunksize parts
+        on max_concurrency threads, see S3MultipartWriter. Use it as a context manager: the object is
+        published on a clean exit and the upload aborted on an exception.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+            extra_args (dict): Extra arguments of the upload request, e.g. ContentType.
+
+        Returns:
+            S3MultipartWriter: The file object.
+        """
+        self.invalidate_metadata(bucket_name, s3_key)
+        return S3MultipartWriter(self.s3_client, bucket_name, s3_key,
+                                 part_size=self.s3_transfer_config.multipart_chunksize,
+                                 max_concurrency=self.s3_transfer_config.max_concurrency,
+                                 with_retries=self.with_retries, extra_args=extra_args)
+
+    def iter_df_chunks(self, filename: str, bucket_name: str, chunksize: Optional[int] = None,
+                       file_format: str = "csv", compression: Optional[str] = "infer",
+                       **read_kwargs) -> Iterator[DataFrame]:
+        """
+        Reads a CSV or Parquet object as DataFrames of at most chunksize rows, parsed while the object
+        is streamed, so memory depends on chunksize and not on the size of the object. Parquet is read
+        one batch at a time from the row groups, it needs the optional pyarrow package.
+
+        Args:
+            filename (str): Key of the object.
+            bucket_name (str): Name of the S3 bucket.
+            chunksize (int): Rows per DataFrame, stream_chunk_rows by default.
+            file_format (str): "csv" or "parquet".
+            compression (str): Compression of a CSV object, "infer" picks it from the extension.
+            read_kwargs: Extra arguments of pandas.read_csv or ParquetFile.iter_batches, e.g. columns.
+
+        Yields:
+            DataFrame: The next chunk of rows.
+        """
+        logging.info(f"Streaming {file_format} chunks of {filename} from {bucket_name}")
+        chunksize = chunksize or self.s3_transfer_config.stream_chunk_rows
+        try:
+            with self.open_object(bucket_name, filename) as file_obj:
+                if file_format == "csv":
+                    with read_csv(file_obj, chunksize=chunksize,
+                                  compression=self.get_stream_compression(filename, compression),
+                                  **read_kwargs) as chunks:
+                        yield from chunks
+                elif file_format == "parquet":
+                    pyarrow = import_pyarrow()
+                    for batch in pyarrow.parquet.ParquetFile(file_obj).iter_batches(batch_size=chunksize, **read_kwargs):
+                        yield batch.to_pandas()
+                else:
+                    raise ValueError(f"Unsupported file format {file_format}, expected csv or parquet")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def upload_df_streaming(self, data_frame: DataFrame, bucket_filename: str, bucket_name: str,
+                            file_format: str = "csv", compression: Optional[str] = "infer",
+                            chunk_rows: Optional[int] = None) -> None:
+        """
+        Uploads a DataFrame as a CSV or Parquet object without a local file. Rows are serialized
+        chunk_rows at a time, compressed on the fly and streamed through a multipart upload, so besides
+        the DataFrame itself memory holds one serialized chunk and the parts in flight. Parquet needs
+        the optional pyarrow package and writes each chunk as a row group.
+
+        Args:
+            data_frame (DataFrame): DataFrame to be uploaded.
+            bucket_filename (str): Target key in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            file_format (str): "csv" or "parquet".
+            compression (str): gzip, zstd or None, "infer" picks it from the extension. For Parquet it is
+                the codec of the column chunks, pyarrow's default when None.
+            chunk_rows (int): Rows serialized at a time, stream_chunk_rows by default.
+        """
+        logging.info("Entered the upload_df_streaming method of SimpleStorageService class")
+        chunk_rows = chunk_rows or self.s3_transfer_config.stream_chunk_rows
+        try:
+            compression = self.get_stream_compression(bucket_filename, compression)
+            # one empty chunk for an empty frame, so the header / schema is still written
+            starts = range(0, max(len(data_frame), 1), chunk_rows)
+            with self.open_writer(bucket_name, bucket_filename) as writer:
+                if file_format == "csv":
+                    with compress_stream(writer, compression) as stream:
+                        for start in starts:
+                            chunk = data_frame.iloc[start:start + chunk_rows]
+                            stream.write(chunk.to_csv(index=False, header=start == 0).encode("utf-8"))
+                elif file_format == "parquet":
+                    pyarrow = import_pyarrow()
+                    parquet_writer = None
+                    for start in starts:
+                        table = pyarrow.Table.from_pandas(data_frame.iloc[start:start + chunk_rows], preserve_index=False)
+                        if parquet_writer is None:
+                            codec = {"compression": compression} if compression else {}
+                            parquet_writer = pyarrow.parquet.ParquetWriter(writer, table.schema, **codec)
+                        parquet_writer.write_table(table)
+                    parquet_writer.close()
+                else:
+                    raise ValueError(f"Unsupported file format {file_format}, expected csv or parquet")
+            logging.info("Exited the upload_df_streaming method of SimpleStorageService class")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
     def upload_df_as_csv(self, data_frame: DataFrame, local_filename: str, bucket_filename: str, bucket_name: str) -> None:
         """
         Uploads a DataFrame as a CSV file to the specified S3 bucket.
 
         Args:
             data_frame (DataFrame): DataFrame to be uploaded.
-            local_filename (str): Temporary local filename for the DataFrame.
+            local_filename (str): Unused, the CSV is streamed from memory (see upload_df_streaming) and
+                no local file is written anymore. Kept for existing callers.
             bucket_filename (str): Target filename in the bucket.
             bucket_name (str): Name of the S3 bucket.
         """
         logging.info("Entered the upload_df_as_csv method of SimpleStorageService class")
         try:
-            # Save DataFrame to CSV locally and then upload it
-            data_frame.to_csv(local_filename, index=None, header=True)
-            self.upload_file(local_filename, bucket_filename, bucket_name)
+            self.upload_df_streaming(data_frame, bucket_filename, bucket_name, file_format="csv")
             logging.info("Exited the upload_df_as_csv method of SimpleStorageService class")
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
 
     def get_df_from_object(self, object_: object) -> DataFrame:
         """
-        Converts an S3 object to a DataFrame.
+        Converts an S3 object to a DataFrame. The body is parsed as it is streamed, without first
+        reading and decoding it into one string.
 
         Args:
             object_ (object): The S3 object.
@@ -206,8 +624,8 @@ class SimpleStorageService:
         """
         logging.info("Entered the get_df_from_object method of SimpleStorageService class")
         try:
-            content = self.read_object(object_, make_readable=True)
-            df = read_csv(content, na_values="na")
+            body = object_.get()["Body"]
+            df = read_csv(body, na_values="na", compression=self.get_stream_compression(object_.key))
             logging.info("Exited the get_df_from_object method of SimpleStorageService class")
             return df
         except Exception as e:
@@ -215,7 +633,8 @@ class SimpleStorageService:
 
     def read_csv(self, filename: str, bucket_name: str) -> DataFrame:
         """
-        Reads a CSV file from the specified S3 bucket and converts it to a DataFrame.
+        Reads a CSV file from the specified S3 bucket and converts it to a DataFrame, parsed from a
+        stream of ranged reads (see open_object) so the raw content is never held in memory.
 
         Args:
             filename (str): The name of the file in the bucket.
@@ -226,8 +645,8 @@ class SimpleStorageService:
         """
         logging.info("Entered the read_csv method of SimpleStorageService class")
         try:
-            csv_obj = self.get_file_object(filename, bucket_name)
-            df = self.get_df_from_object(csv_obj)
+            with self.open_object(bucket_name, filename) as file_obj:
+                df = read_csv(file_obj, na_values="na", compression=self.get_stream_compression(filename))
             logging.info("Exited the read_csv method of SimpleStorageService class")
             return df
         except Exception as e:
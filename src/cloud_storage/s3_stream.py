@@ -0,0 +1,199 @@
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from src.logging.logger import logging
+
+
+class S3ObjectReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over one version of an S3 object.
+
+    Bytes are fetched as ranged GETs of block_size, pinned to the ETag the reader was opened with, and
+    only the current block is held in memory, so parsers can stream an object of any size. Seeking is
+    what lets Parquet readers jump to the footer and to the row groups they need.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, s3_key: str, etag: str, size: int, block_size: int,
+                 with_retries: Callable, metadata: Optional[dict] = None):
+        """
+        :param s3_client: boto3 S3 client
+        :param etag: ETag of the object version to read, a concurrent overwrite fails the read
+        :param size: ContentLength of the object
+        :param metadata: user metadata of the object version
+        :param block_size: bytes fetched per ranged GET
+        :param with_retries: callable(func, *args) retrying transient failures of a GET
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.etag = etag
+        self.size = size
+        self.block_size = block_size
+        self.with_retries = with_retries
+        self.metadata = metadata or {}
+        self.position = 0
+        self.block_start = 0
+        self.block = b""
+        self.requests = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        self.position = max(self.position, 0)
+        return self.position
+
+    def _fetch(self, start: int) -> None:
+        end = min(start + self.block_size, self.size) - 1
+        response = self.with_retries(lambda: self.s3_client.get_object(
+            Bucket=self.bucket_name, Key=self.s3_key, IfMatch=self.etag, Range=f"bytes={start}-{end}")["Body"].read())
+        self.block_start, self.block = start, response
+        self.requests += 1
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        offset = self.position - self.block_start
+        if not 0 <= offset < len(self.block):
+            self._fetch(self.position)
+            offset = 0
+        n_bytes = min(len(buffer), len(self.block) - offset)
+        buffer[:n_bytes] = self.block[offset:offset + n_bytes]
+        self.position += n_bytes
+        return n_bytes
+
+    def close(self) -> None:
+        self.block = b""
+        super().close()
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Write-only file object uploading to S3 as it is written.
+
+    Written bytes are buffered up to part_size and sent as parts of a multipart upload on up to
+    max_concurrency threads, so at most (max_concurrency + 1) parts are in memory whatever the size of
+    the object. Content that never fills a part is sent with a single PUT on close. Leaving a `with`
+    block on an exception aborts the upload, no partial object is ever visible.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, s3_key: str, part_size: int, max_concurrency: int,
+                 with_retries: Callable, extra_args: Optional[dict] = None):
+        """
+        :param s3_client: boto3 S3 client
+        :param part_size: bytes of each part but the last, S3 requires at least 5 MB
+        :param max_concurrency: parts uploaded at the same time
+        :param with_retries: callable(func, *args, **kwargs) retrying transient failures of a request
+        :param extra_args: extra arguments of the PUT / CreateMultipartUpload request, e.g. ContentEncoding
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.with_retries = with_retries
+        self.extra_args = extra_args or {}
+        self.buffer = bytearray()
+        self.upload_id: Optional[str] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.pending = deque()
+        self.parts: List[dict] = []
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to a closed S3MultipartWriter")
+        self.buffer += data
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[:self.part_size])
+            del self.buffer[:self.part_size]
+            self._submit_part(part)
+        return len(data)
+
+    def _upload_part(self, part_number: int, part: bytes) -> dict:
+        response = self.with_retries(self.s3_client.upload_part, Bucket=self.bucket_name, Key=self.s3_key,
+                                     UploadId=self.upload_id, PartNumber=part_number, Body=part)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _submit_part(self, part: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.s3_key, **self.extra_args)["UploadId"]
+            self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        # back pressure: wait for the oldest part before buffering more than max_concurrency of them
+        while len(self.pending) >= self.max_concurrency:
+            self.parts.append(self.pending.popleft().result())
+        part_number = len(self.parts) + len(self.pending) + 1
+        self.pending.append(self.executor.submit(self._upload_part, part_number, part))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.with_retries(self.s3_client.put_object, Bucket=self.bucket_name, Key=self.s3_key,
+                                  Body=bytes(self.buffer), **self.extra_args)
+            else:
+                if self.buffer:
+                    self._submit_part(bytes(self.buffer))
+                while self.pending:
+                    self.parts.append(self.pending.popleft().result())
+                self.s3_client.complete_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key,
+                                                         UploadId=self.upload_id,
+                                                         MultipartUpload={"Parts": self.parts})
+                self.executor.shutdown()
+            logging.info(f"Streamed {self.bytes_written} bytes to {self.s3_key} in {max(len(self.parts), 1)} part(s)")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.buffer = bytearray()
+            super().close()
+
+    def abort(self) -> None:
+        """Drops the buffered content and aborts the multipart upload, if one was started."""
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        if self.upload_id is not None:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key, UploadId=self.upload_id)
+            logging.info(f"Aborted the multipart upload of {self.s3_key}")
+            self.upload_id = None
+        self.buffer = bytearray()
+        if not self.closed:
+            super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self) -> None:
+        # a writer dropped without close must not publish what was written so far
+        if not self.closed:
+            self.abort()
@@ -0,0 +1,446 @@
+import fcntl
+import hashlib
+import io
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+from src.entity.config_entity import StorageBackendConfig
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+STORAGE_BACKENDS = ("s3", "local", "memory")
+
+
+class PreconditionFailed(Exception):
+    """A conditional read or write found another version of the object than the one expected."""
+
+
+class StorageBackend(ABC):
+    """
+    Object storage of one bucket, addressed by "/" separated keys.
+
+    Objects are versioned by an ETag that changes with every write; reads and writes can be made
+    conditional on it, which is what atomic manifest updates are built on. Metadata dicts have the
+    keys ETag, ContentLength, LastModified and Metadata (user metadata) like an S3 HEAD response.
+    """
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+
+    @abstractmethod
+    def head(self, key: str, use_cache: bool = True) -> Optional[dict]:
+        """Metadata of an object, None when there is none at the key."""
+
+    def exists(self, key: str) -> bool:
+        return self.head(key) is not None
+
+    @abstractmethod
+    def read_bytes(self, key: str, if_match: Optional[str] = None) -> bytes:
+        """Whole content of an object, PreconditionFailed when if_match is not its ETag anymore."""
+
+    @abstractmethod
+    def open_read(self, key: str) -> BinaryIO:
+        """Seekable binary file of the content of an object, to be closed by the caller."""
+
+    def iter_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Content of an object in chunks of at most chunk_size bytes."""
+        with self.open_read(key) as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+                yield chunk
+
+    @abstractmethod
+    def write_bytes(self, key: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False,
+                    metadata: Optional[Dict[str, str]] = None, content_type: Optional[str] = None) -> str:
+        """
+        Writes an object whole and returns its new ETag. With if_match the write only happens while the
+        object has that ETag, with if_none_match only while there is no object; PreconditionFailed otherwise
+        """
+
+    @abstractmethod
+    def open_write(self, key: str, metadata: Optional[Dict[str, str]] = None):
+        """Context manager of a binary file whose content becomes the object on a clean exit only."""
+
+    def upload_file(self, from_filename: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        with open(from_filename, "rb") as source, self.open_write(key, metadata) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+    def download_file(self, key: str, to_filename: str) -> None:
+        os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+        with open(to_filename, "wb") as target:
+            for chunk in self.iter_chunks(key):
+                target.write(chunk)
+
+    def upload_directory(self, from_dir: str, to_prefix: str) -> List[str]:
+        """Uploads every file below a local directory under to_prefix, keeping the relative paths."""
+        keys = []
+        for root, _, file_names in os.walk(from_dir):
+            for file_name in file_names:
+                file_path = os.path.join(root, file_name)
+                key = "/".join([to_prefix.rstrip("/"), *os.path.relpath(file_path, from_dir).split(os.sep)])
+                self.upload_file(file_path, key)
+                keys.append(key)
+        return keys
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[dict]:
+        """Metadata, with the Key, of every object whose key starts with prefix."""
+
+    @abstractmethod
+    def delete(self, keys: List[str]) -> None:
+        """Deletes objects, missing keys are ignored."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the object on local disk when the backend keeps it there, otherwise None."""
+        return None
+
+
+class S3StorageBackend(StorageBackend):
+    """StorageBackend of an S3 bucket, through the shared client and metadata cache of SimpleStorageService."""
+
+    def __init__(self, bucket_name: str, s3=None):
+        super().__init__(bucket_name)
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        self.s3 = s3 or SimpleStorageService()
+
+    @staticmethod
+    def _error_code(e: ClientError) -> str:
+        return e.response["Error"]["Code"]
+
+    def head(self, key: str, use_cache: bool = True) -> Optional[dict]:
+        return self.s3.get_object_metadata(self.bucket_name, key, use_cache=use_cache)
+
+    def exists(self, key: str) -> bool:
+        return self.s3.s3_key_path_available(self.bucket_name, key)
+
+    def read_bytes(self, key: str, if_match: Optional[str] = None) -> bytes:
+        if if_match is None:
+            return self.s3.get_object_bytes(self.bucket_name, key)
+        try:
+            return self.s3.with_retries(lambda: self.s3.s3_client.get_object(
+                Bucket=self.bucket_name, Key=key, IfMatch=if_match)["Body"].read())
+        except ClientError as e:
+            if self._error_code(e) in ("412", "PreconditionFailed", "404", "NoSuchKey"):
+                raise PreconditionFailed(f"{key} does not have ETag {if_match} anymore") from e
+            raise
+
+    def open_read(self, key: str) -> BinaryIO:
+        return self.s3.open_object(self.bucket_name, key)
+
+    def iter_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        response = self.s3.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        yield from response["Body"].iter_chunks(chunk_size)
+
+    def write_bytes(self, key: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False,
+                    metadata: Optional[Dict[str, str]] = None, content_type: Optional[str] = None) -> str:
+        extra_args = {"IfMatch": if_match} if if_match is not None else {"IfNoneMatch": "*"} if if_none_match else {}
+        if content_type is not None:
+            extra_args["ContentType"] = content_type
+        try:
+            response = self.s3.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data,
+                                                    Metadata=metadata or {}, **extra_args)
+        except ClientError as e:
+            if self._error_code(e) in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+                raise PreconditionFailed(f"{key} changed concurrently") from e
+            raise
+        finally:
+            self.s3.invalidate_metadata(self.bucket_name, key)
+        return response["ETag"]
+
+    def open_write(self, key: str, metadata: Optional[Dict[str, str]] = None):
+        return self.s3.open_writer(self.bucket_name, key, extra_args={"Metadata": metadata} if metadata else None)
+
+    def upload_file(self, from_filename: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        self.s3.upload_file(from_filename, key, self.bucket_name, remove=False,
+                            extra_args={"Metadata": metadata} if metadata else None)
+
+    def download_file(self, key: str, to_filename: str) -> None:
+        self.s3.download_file(self.bucket_name, key, to_filename)
+
+    def upload_directory(self, from_dir: str, to_prefix: str) -> List[str]:
+        return self.s3.upload_directory(from_dir, to_prefix, bucket_name=self.bucket_name)
+
+    def list(self, prefix: str = "") -> Iterator[dict]:
+        paginator = self.s3.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield {"Key": obj["Key"], "ETag": obj["ETag"], "ContentLength": obj["Size"],
+                       "LastModified": obj["LastModified"]}
+
+    def delete(self, keys: List[str]) -> None:
+        # DeleteObjects takes up to 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            response = self.s3.s3_client.delete_objects(
+                Bucket=self.bucket_name, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True})
+            if response.get("Errors"):
+                raise RuntimeError(f"Failed to delete objects: {response['Errors']}")
+            for key in batch:
+                self.s3.invalidate_metadata(self.bucket_name, key)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    StorageBackend of a directory, e.g. on node-local SSD, one sub-directory per bucket.
+
+    Reads are memory-mapped, so loading a model costs page-cache copies only. Writes go to a temporary
+    file in the target directory that is renamed over the object, readers see the old or the new
+    content and never a partial one. Conditional writes hold an exclusive flock per key. The ETag is
+    derived from inode, modification time and size, all of which a rename changes. User metadata is
+    kept in .metadata/<key>.json next to the objects.
+    """
+
+    METADATA_DIR = ".metadata"
+    LOCKS_DIR = ".locks"
+
+    def __init__(self, bucket_name: str, root_dir: str):
+        super().__init__(bucket_name)
+        self.bucket_dir = os.path.abspath(os.path.join(root_dir, bucket_name))
+        os.makedirs(self.bucket_dir, exist_ok=True)
+
+    def _path(self, key: str, base: Optional[str] = None, suffix: str = "") -> str:
+        base_dir = os.path.join(self.bucket_dir, base) if base else self.bucket_dir
+        path = os.path.normpath(os.path.join(base_dir, *key.split("/"))) + suffix
+        if not path.startswith(base_dir + os.sep):
+            raise ValueError(f"Key {key} points outside of the bucket")
+        return path
+
+    @staticmethod
+    def _etag(stat: os.stat_result) -> str:
+        return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def _tmp_path(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return os.path.join(os.path.dirname(path),
+                            f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        lock_path = os.path.join(self.bucket_dir, self.LOCKS_DIR, hashlib.sha1(key.encode()).hexdigest())
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_metadata(self, key: str, metadata: Optional[Dict[str, str]]) -> None:
+        metadata_path = self._path(key, base=self.METADATA_DIR, suffix=".json")
+        if not metadata:
+            if os.path.exists(metadata_path):
+                os.remove(metadata_path)
+            return
+        tmp_path = self._tmp_path(metadata_path)
+        with open(tmp_path, "w") as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(tmp_path, metadata_path)
+
+    def _publish(self, tmp_path: str, key: str, metadata: Optional[Dict[str, str]]) -> str:
+        """Renames a complete temporary file over the object, returns the new ETag."""
+        path = self._path(key)
+        self._write_metadata(key, metadata)
+        os.replace(tmp_path, path)
+        return self._etag(os.stat(path))
+
+    def head(self, key: str, use_cache: bool = True) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        metadata = {}
+        metadata_path = self._path(key, base=self.METADATA_DIR, suffix=".json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as metadata_file:
+                metadata = json.load(metadata_file)
+        return {"ETag": self._etag(stat), "ContentLength": stat.st_size,
+                "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc), "Metadata": metadata}
+
+    def read_bytes(self, key: str, if_match: Optional[str] = None) -> bytes:
+        with open(self._path(key), "rb") as file_obj:
+            if if_match is not None and self._etag(os.fstat(file_obj.fileno())) != if_match:
+                raise PreconditionFailed(f"{key} does not have ETag {if_match} anymore")
+            return file_obj.read()
+
+    def open_read(self, key: str) -> BinaryIO:
+        with open(self._path(key), "rb") as file_obj:
+            if os.fstat(file_obj.fileno()).st_size == 0:
+                return io.BytesIO(b"")
+            # the mapping stays valid after the file is closed, and after a rename replaced the object
+            return mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        mapped = self.open_read(key)
+        try:
+            for start in range(0, len(mapped) if isinstance(mapped, mmap.mmap) else 0, chunk_size):
+                yield mapped[start:start + chunk_size]
+        finally:
+            mapped.close()
+
+    def write_bytes(self, key: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False,
+                    metadata: Optional[Dict[str, str]] = None, content_type: Optional[str] = None) -> str:
+        tmp_path = self._tmp_path(self._path(key))
+        with open(tmp_path, "wb") as file_obj:
+            file_obj.write(data)
+            file_obj.flush()
+            os.fsync(file_obj.fileno())
+        try:
+            with self._key_lock(key):
+                head = self.head(key)
+                if if_none_match and head is not None or if_match is not None and (head is None or head["ETag"] != if_match):
+                    raise PreconditionFailed(f"{key} changed concurrently")
+                return self._publish(tmp_path, key, metadata)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @contextmanager
+    def open_write(self, key: str, metadata: Optional[Dict[str, str]] = None):
+        tmp_path = self._tmp_path(self._path(key))
+        try:
+            with open(tmp_path, "wb") as file_obj:
+                yield file_obj
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+            with self._key_lock(key):
+                self._publish(tmp_path, key, metadata)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def upload_file(self, from_filename: str, key: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        tmp_path = self._tmp_path(self._path(key))
+        try:
+            shutil.copyfile(from_filename, tmp_path)
+            with self._key_lock(key):
+                self._publish(tmp_path, key, metadata)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def download_file(self, key: str, to_filename: str) -> None:
+        os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+        shutil.copyfile(self._path(key), to_filename)
+
+    def list(self, prefix: str = "") -> Iterator[dict]:
+        for root, dir_names, file_names in os.walk(self.bucket_dir):
+            dir_names[:] = sorted(name for name in dir_names if name not in (self.METADATA_DIR, self.LOCKS_DIR))
+            for file_name in sorted(file_names):
+                if file_name.endswith(".tmp"):
+                    continue
+                key = "/".join(os.path.relpath(os.path.join(root, file_name), self.bucket_dir).split(os.sep))
+                if key.startswith(prefix):
+                    head = self.head(key)
+                    if head is not None:
+                        yield {"Key": key, **head}
+
+    def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            for path in (self._path(key), self._path(key, base=self.METADATA_DIR, suffix=".json")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    StorageBackend held in process memory, shared by every instance of the process for the same bucket,
+    for hermetic tests and benchmarks without any I/O.
+    """
+
+    _buckets: Dict[str, Dict[str, dict]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, bucket_name: str):
+        super().__init__(bucket_name)
+        with InMemoryStorageBackend._lock:
+            self.objects = InMemoryStorageBackend._buckets.setdefault(bucket_name, {})
+
+    def _get(self, key: str) -> dict:
+        with InMemoryStorageBackend._lock:
+            obj = self.objects.get(key)
+        if obj is None:
+            raise FileNotFoundError(f"No object at {self.bucket_name}/{key}")
+        return obj
+
+    def _put(self, key: str, data: bytes, metadata: Optional[Dict[str, str]]) -> dict:
+        return {"Body": bytes(data), "ETag": f'"{hashlib.md5(data).hexdigest()}"', "ContentLength": len(data),
+                "LastModified": datetime.now(timezone.utc), "Metadata": dict(metadata or {})}
+
+    def head(self, key: str, use_cache: bool = True) -> Optional[dict]:
+        with InMemoryStorageBackend._lock:
+            obj = self.objects.get(key)
+        return None if obj is None else {name: value for name, value in obj.items() if name != "Body"}
+
+    def read_bytes(self, key: str, if_match: Optional[str] = None) -> bytes:
+        obj = self._get(key)
+        if if_match is not None and obj["ETag"] != if_match:
+            raise PreconditionFailed(f"{key} does not have ETag {if_match} anymore")
+        return obj["Body"]
+
+    def open_read(self, key: str) -> BinaryIO:
+        return io.BytesIO(self._get(key)["Body"])
+
+    def write_bytes(self, key: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False,
+                    metadata: Optional[Dict[str, str]] = None, content_type: Optional[str] = None) -> str:
+        obj = self._put(key, data, metadata)
+        with InMemoryStorageBackend._lock:
+            current = self.objects.get(key)
+            if if_none_match and current is not None or if_match is not None and (current is None or current["ETag"] != if_match):
+                raise PreconditionFailed(f"{key} changed concurrently")
+            self.objects[key] = obj
+        return obj["ETag"]
+
+    @contextmanager
+    def open_write(self, key: str, metadata: Optional[Dict[str, str]] = None):
+        buffer = io.BytesIO()
+        yield buffer
+        self.write_bytes(key, buffer.getvalue(), metadata=metadata)
+
+    def list(self, prefix: str = "") -> Iterator[dict]:
+        with InMemoryStorageBackend._lock:
+            keys = sorted(key for key in self.objects if key.startswith(prefix))
+        for key in keys:
+            head = self.head(key)
+            if head is not None:
+                yield {"Key": key, **head}
+
+    def delete(self, keys: List[str]) -> None:
+        with InMemoryStorageBackend._lock:
+            for key in keys:
+                self.objects.pop(key, None)
+
+
+def get_storage_backend(bucket_name: str, storage_backend_config: StorageBackendConfig = None) -> StorageBackend:
+    """
+    StorageBackend of a bucket, of the kind selected by storage_backend_config.backend
+    bucket_name: name of the bucket, a sub-directory of local_root_dir for the local backend
+    return: S3StorageBackend, LocalStorageBackend or InMemoryStorageBackend
+    """
+    try:
+        config = storage_backend_config or StorageBackendConfig()
+        logging.info(f"Using the {config.backend} storage backend for bucket {bucket_name}")
+        if config.backend == "s3":
+            return S3StorageBackend(bucket_name)
+        if config.backend == "local":
+            return LocalStorageBackend(bucket_name, root_dir=config.local_root_dir)
+        if config.backend == "memory":
+            return InMemoryStorageBackend(bucket_name)
+        raise ValueError(f"Unknown storage backend {config.backend}, expected one of {STORAGE_BACKENDS}")
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
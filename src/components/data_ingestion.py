@@ -7,18 +7,12 @@ from src.entity.artifact_entity import DataIngestionArtifact
 
 import os
 import sys
-import pymongo
 import numpy as np
 from pandas import DataFrame
 from typing import List
 from sklearn.model_selection import train_test_split
 from src.data_access.fetch_data import FetchData
 
-from dotenv import load_dotenv
-load_dotenv()
-
-MONGO_DB_URL = os.getenv("MONGO_DB_URL")
-
 
 class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig = DataIngestionConfig):
@@ -28,7 +22,6 @@ class DataIngestion:
         """
         try:
             self.data_ingestion_config = data_ingestion_config
-            # self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
@@ -0,0 +1,136 @@
+import sys
+import time
+
+import numpy as np
+from imblearn.combine import SMOTEENN
+from imblearn.over_sampling import SMOTE, RandomOverSampler
+from imblearn.under_sampling import EditedNearestNeighbours, RandomUnderSampler
+from sklearn.neighbors import NearestNeighbors
+
+from src.entity.config_entity import DataResamplingConfig
+from src.entity.artifact_entity import DataTransformationArtifact, DataResamplingArtifact
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+from src.utils.main_utils import load_features_target, save_numpy_array_data
+from src.utils.resource_governor import ResourceGovernor
+
+RESAMPLING_STRATEGIES = ("none", "smote", "smoteenn", "random_under", "random_over")
+
+
+class DataResampling:
+    def __init__(
+        self,
+        data_transformation_artifact: DataTransformationArtifact,
+        data_resampling_config: DataResamplingConfig,
+    ):
+        """
+        :param data_transformation_artifact: Output reference of data transformation artifact stage
+        :param data_resampling_config: Configuration for class-imbalance resampling
+        """
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.data_resampling_config = data_resampling_config
+            if data_resampling_config.strategy not in RESAMPLING_STRATEGIES:
+                raise ValueError(f"Unknown resampling strategy [{data_resampling_config.strategy}], "
+                                 f"expected one of {RESAMPLING_STRATEGIES}")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def get_sampler(self, n_jobs: int) -> object:
+        """
+        Method Name :   get_sampler
+        Description :   This method builds the imblearn sampler of the configured strategy. The nearest
+                        neighbour searches of SMOTE and ENN run on n_jobs workers
+
+        Output      :   Returns the sampler object
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_resampling_config
+            # SMOTE counts the sample itself among its neighbours, hence k_neighbors + 1
+            smote = SMOTE(
+                sampling_strategy=config.sampling_strategy,
+                random_state=config.random_state,
+                k_neighbors=NearestNeighbors(n_neighbors=config.k_neighbors + 1, n_jobs=n_jobs),
+            )
+            if config.strategy == "smote":
+                return smote
+            if config.strategy == "smoteenn":
+                return SMOTEENN(
+                    sampling_strategy=config.sampling_strategy,
+                    random_state=config.random_state,
+                    smote=smote,
+                    enn=EditedNearestNeighbours(sampling_strategy="all", n_jobs=n_jobs),
+                )
+            if config.strategy == "random_under":
+                return RandomUnderSampler(sampling_strategy=config.sampling_strategy, random_state=config.random_state)
+            return RandomOverSampler(sampling_strategy=config.sampling_strategy, random_state=config.random_state)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def class_counts(target: np.ndarray) -> dict:
+        """Counts the rows of each class, keyed by the class label as a string."""
+        labels, counts = np.unique(np.asarray(target), return_counts=True)
+        return {str(label.item()): int(count) for label, count in zip(labels, counts)}
+
+    def initiate_data_resampling(self) -> DataResamplingArtifact:
+        """
+        Method Name :   initiate_data_resampling
+        Description :   This method resamples the transformed training data with the configured strategy.
+                        The test data is never resampled, so evaluation sees the real class balance
+
+        Output      :   Returns data resampling artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            logging.info("Entered initiate_data_resampling method of DataResampling class")
+            config = self.data_resampling_config
+            x_train, y_train = load_features_target(
+                self.data_transformation_artifact.transformed_train_file_path,
+                self.data_transformation_artifact.transformed_train_target_file_path,
+                mmap_mode="r",
+            )
+            class_counts_before = self.class_counts(y_train)
+            logging.info(f"Class balance before resampling: {class_counts_before}")
+
+            if config.strategy == "none":
+                logging.info("Resampling strategy is none, training data passed on unchanged")
+                return DataResamplingArtifact(
+                    strategy=config.strategy,
+                    resampled_train_file_path=self.data_transformation_artifact.transformed_train_file_path,
+                    resampled_train_target_file_path=self.data_transformation_artifact.transformed_train_target_file_path,
+                    class_counts_before=class_counts_before,
+                    class_counts_after=class_counts_before,
+                )
+
+            n_jobs = ResourceGovernor.n_jobs(config.n_jobs)
+            start_time = time.perf_counter()
+            x_resampled, y_resampled = self.get_sampler(n_jobs).fit_resample(x_train, y_train)
+            seconds = time.perf_counter() - start_time
+            class_counts_after = self.class_counts(y_resampled)
+            logging.info(f"{config.strategy} resampled {len(y_train)} rows into {len(y_resampled)} rows "
+                         f"in {seconds:.3f}s (n_jobs={n_jobs})")
+            logging.info(f"Class balance after resampling: {class_counts_after}")
+
+            save_numpy_array_data(
+                config.resampled_train_file_path,
+                array=np.asarray(x_resampled).astype(self.data_transformation_artifact.feature_dtype, copy=False),
+                column_major=config.column_major,
+            )
+            save_numpy_array_data(
+                config.resampled_train_target_file_path,
+                array=np.asarray(y_resampled).astype(self.data_transformation_artifact.target_dtype, copy=False),
+            )
+
+            data_resampling_artifact = DataResamplingArtifact(
+                strategy=config.strategy,
+                resampled_train_file_path=config.resampled_train_file_path,
+                resampled_train_target_file_path=config.resampled_train_target_file_path,
+                class_counts_before=class_counts_before,
+                class_counts_after=class_counts_after,
+            )
+            logging.info(f"Data resampling artifact: {data_resampling_artifact}")
+            return data_resampling_artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
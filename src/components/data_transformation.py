@@ -1,8 +1,8 @@
 import sys, os
 import numpy as np
 import pandas as pd
+from typing import Iterator, List, Optional, Tuple
 
-from imblearn.combine import SMOTEENN
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OrdinalEncoder, OneHotEncoder
 from sklearn.impute import SimpleImputer
@@ -18,7 +18,10 @@ from src.entity.artifact_entity import (
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
 
-from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file
+from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file, load_features_target
+from src.utils.dag_executor import DAGExecutor, Task
+from src.utils.resource_governor import ResourceGovernor
+from src.utils.schema_compiler import SchemaCompiler
 
 
 class DataTransformation:
@@ -36,11 +39,25 @@ class DataTransformation:
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
+    @property
+    def feature_dtype(self) -> np.dtype:
+        """dtype of the transformed feature matrix, float64 unless compact arrays are enabled."""
+        if self.data_transformation_config.compact_arrays:
+            return np.dtype(self.data_transformation_config.feature_dtype)
+        return np.dtype(np.float64)
+
+    @property
+    def target_dtype(self) -> np.dtype:
+        """dtype of the transformed target vector, float64 unless compact arrays are enabled."""
+        if self.data_transformation_config.compact_arrays:
+            return np.dtype(self.data_transformation_config.target_dtype)
+        return np.dtype(np.float64)
+
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         """Reads a CSV file and returns a DataFrame."""
         try:
-            return pd.read_csv(file_path)
+            return SchemaCompiler().read_csv(file_path)
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
@@ -63,9 +80,11 @@ class DataTransformation:
             # define transformers
             imputer = SimpleImputer(strategy="mean")
             
-            ordinal_encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+            # encoders emit the feature dtype directly, so a compact matrix never goes through float64
+            ordinal_encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1,
+                                             dtype=self.feature_dtype)
             
-            onehot_encoder = OneHotEncoder(handle_unknown="ignore", drop="first")
+            onehot_encoder = OneHotEncoder(handle_unknown="ignore", drop="first", dtype=self.feature_dtype)
 
             # creating ColumnTransformer pipeline
             preprocessor = ColumnTransformer(
@@ -128,6 +147,246 @@ class DataTransformation:
             raise VehicleInsuranceException(e, sys)
     
 
+    def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Splits a dataframe into input features and target, and applies the custom transformations
+        in the specified sequence to the input features.
+        """
+        try:
+            input_feature_df = df.drop(columns=[TARGET_COLUMN], axis=1)
+            target_feature_df = df[TARGET_COLUMN]
+
+            input_feature_df = self.drop_column(input_feature_df)
+            input_feature_df = self.convert_credit_score(input_feature_df)
+            logging.info("Custom transformations applied to input features")
+            return input_feature_df, target_feature_df
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def to_feature_array(self, transformed) -> np.ndarray:
+        """
+        Densifies a transformed feature block and casts it to the feature dtype. float32 loses nothing
+        the models can use: sklearn's trees convert their input to float32 before fitting or predicting.
+        """
+        if hasattr(transformed, "toarray"):
+            transformed = transformed.toarray()
+        return np.asarray(transformed).astype(self.feature_dtype, copy=False)
+
+    def to_target_vector(self, target_feature: pd.Series) -> np.ndarray:
+        """Casts the target to the target dtype, refusing labels the narrow dtype cannot hold."""
+        try:
+            target = np.asarray(target_feature)
+            narrow_target = target.astype(self.target_dtype)
+            if not np.array_equal(narrow_target, target):
+                raise ValueError(f"Target values do not fit in {self.target_dtype}")
+            return narrow_target
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def report_array_footprint(self, dataframe_name: str, n_rows: int, n_features: int,
+                               file_paths: List[str]) -> dict:
+        """
+        Logs memory and disk size of a transformed dataset next to the float64 layout with the
+        target as last column, and returns the numbers.
+        """
+        compact_bytes = n_rows * (n_features * self.feature_dtype.itemsize + self.target_dtype.itemsize)
+        float64_bytes = n_rows * (n_features + 1) * np.dtype(np.float64).itemsize
+        disk_bytes = sum(os.path.getsize(file_path) for file_path in file_paths)
+        footprint = {"rows": n_rows, "features": n_features, "feature_dtype": self.feature_dtype.name,
+                     "target_dtype": self.target_dtype.name, "memory_bytes": compact_bytes,
+                     "float64_memory_bytes": float64_bytes, "disk_bytes": disk_bytes}
+        logging.info(f"Transformed {dataframe_name} data: {compact_bytes / 1024 ** 2:.2f} MB in memory "
+                     f"({self.feature_dtype.name}/{self.target_dtype.name}) vs {float64_bytes / 1024 ** 2:.2f} MB "
+                     f"as float64, {float64_bytes / max(compact_bytes, 1):.1f}x smaller; "
+                     f"{disk_bytes / 1024 ** 2:.2f} MB on disk")
+        return footprint
+
+    def get_data_transformation_artifact(self) -> DataTransformationArtifact:
+        """Builds the artifact, pointing at the separate target vectors when compact arrays are enabled."""
+        config = self.data_transformation_config
+        return DataTransformationArtifact(
+            transformed_object_file_path=config.transformed_object_file_path,
+            transformed_train_file_path=config.transformed_train_file_path,
+            transformed_test_file_path=config.transformed_test_file_path,
+            feature_dtype=self.feature_dtype.name,
+            target_dtype=self.target_dtype.name,
+            transformed_train_target_file_path=config.transformed_train_target_file_path if config.compact_arrays else None,
+            transformed_test_target_file_path=config.transformed_test_target_file_path if config.compact_arrays else None,
+        )
+
+    def iter_prepared_chunks(self, file_path: str) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        """
+        Streams a CSV file as (input features, target) chunks with the custom transformations applied.
+        """
+        schema_compiler = SchemaCompiler()
+        for chunk in schema_compiler.iter_csv(file_path, chunksize=self.data_transformation_config.chunk_size):
+            yield self.prepare_features(chunk)
+
+    def compute_fit_statistics(self, file_path: str) -> dict:
+        """
+        Streams the training file once and collects everything the preprocessor learns in fit:
+        the mean of each imputed column and the category set of each encoded column.
+        """
+        try:
+            categorical_features = self._schema_config["ordinal_features"] + self._schema_config["onehot_features"]
+            impute_features = self._schema_config["impute_features"]
+            sums = {name: 0.0 for name in impute_features}
+            counts = {name: 0 for name in impute_features}
+            categories = {name: set() for name in categorical_features}
+            rows = 0
+            template = None
+            for input_feature_df, _ in self.iter_prepared_chunks(file_path):
+                if template is None:
+                    template = input_feature_df.head(0)
+                rows += len(input_feature_df)
+                for name in impute_features:
+                    # accumulate in float64 so float32 columns do not lose precision over many chunks
+                    sums[name] += float(input_feature_df[name].astype(np.float64).sum())
+                    counts[name] += int(input_feature_df[name].count())
+                for name in categorical_features:
+                    categories[name].update(input_feature_df[name].dropna().unique())
+
+            means = {name: (sums[name] / counts[name] if counts[name] else np.nan) for name in impute_features}
+            logging.info(f"Streaming fit statistics computed over {rows} rows: means={means}")
+            return {"rows": rows, "template": template, "means": means,
+                    "categories": {name: sorted(values) for name, values in categories.items()}}
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def fit_from_statistics(self, preprocessor: Pipeline, statistics: dict) -> Pipeline:
+        """
+        Fits the preprocessor on a tiny synthetic frame that reproduces the streamed statistics exactly:
+        every imputed column holds its mean and every encoded column holds each of its categories,
+        so the fitted imputer and encoders equal the ones a full in-memory fit would produce.
+        """
+        try:
+            template = statistics["template"]
+            categories = statistics["categories"]
+            n_rows = max([len(values) for values in categories.values()] + [1])
+            fit_frame = {}
+            for name in template.columns:
+                if name in categories and categories[name]:
+                    values = [categories[name][i % len(categories[name])] for i in range(n_rows)]
+                elif name in statistics["means"]:
+                    values = [statistics["means"][name]] * n_rows
+                else:
+                    values = [0] * n_rows
+                fit_frame[name] = pd.Series(values, dtype=template[name].dtype)
+            preprocessor.fit(pd.DataFrame(fit_frame, columns=template.columns))
+            return preprocessor
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def count_rows(file_path: str, chunk_size: int) -> int:
+        """Counts the data rows of a CSV file by streaming a single column."""
+        rows = 0
+        for chunk in pd.read_csv(file_path, usecols=[TARGET_COLUMN], chunksize=chunk_size):
+            rows += len(chunk)
+        return rows
+
+    def transform_to_memmap(self, preprocessor: Pipeline, file_path: str, output_file_path: str, n_rows: int,
+                            target_file_path: Optional[str] = None) -> str:
+        """
+        Transforms a CSV file chunk by chunk straight into a memory-mapped .npy file, so no full-size
+        array is ever held in memory. The target goes into its own memory-mapped vector when
+        target_file_path is given, otherwise into the last column of the feature file.
+        """
+        try:
+            n_features = len(preprocessor.get_feature_names_out())
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            output = np.lib.format.open_memmap(output_file_path, mode="w+", dtype=self.feature_dtype,
+                                               shape=(n_rows, n_features + (target_file_path is None)),
+                                               fortran_order=self.data_transformation_config.column_major)
+            target_output = None
+            if target_file_path is not None:
+                os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
+                target_output = np.lib.format.open_memmap(target_file_path, mode="w+", dtype=self.target_dtype,
+                                                          shape=(n_rows,))
+            start = 0
+            for input_feature_df, target_feature_df in self.iter_prepared_chunks(file_path):
+                stop = start + len(input_feature_df)
+                output[start:stop, :n_features] = self.to_feature_array(preprocessor.transform(input_feature_df))
+                if target_output is None:
+                    output[start:stop, -1] = target_feature_df.to_numpy()
+                else:
+                    target_output[start:stop] = self.to_target_vector(target_feature_df)
+                start = stop
+            if start != n_rows:
+                raise ValueError(f"Expected {n_rows} rows in {file_path}, transformed {start}")
+            output.flush()
+            del output
+            if target_output is not None:
+                target_output.flush()
+                del target_output
+            logging.info(f"Transformed {n_rows} rows of {file_path} into {output_file_path}")
+            return output_file_path
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def export_memmap_as_csv(self, array_file_path: str, csv_file_path: str, columns: list,
+                             target_file_path: Optional[str] = None) -> None:
+        """Writes a transformed .npy file, and its separate target vector if any, as CSV one chunk at a time."""
+        features, target = load_features_target(array_file_path, target_file_path, mmap_mode="r")
+        chunk_size = self.data_transformation_config.chunk_size
+        for start in range(0, max(len(features), 1), chunk_size):
+            chunk = pd.DataFrame(features[start:start + chunk_size], columns=columns[:-1])
+            chunk[columns[-1]] = target[start:start + chunk_size]
+            chunk.to_csv(csv_file_path, index=False, header=start == 0, mode="w" if start == 0 else "a")
+
+    def initiate_chunked_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Out-of-core variant of initiate_data_transformation for datasets bigger than RAM.
+        A streaming pass computes the fit statistics, then train and test are transformed chunk by chunk
+        into memory-mapped outputs.
+        """
+        try:
+            logging.info("Chunked Data Transformation Started !")
+            preprocessor = self.get_data_transformer_object()
+            config = self.data_transformation_config
+            chunk_size = config.chunk_size
+            train_file_path = self.data_ingestion_artifact.trained_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            artifact = self.get_data_transformation_artifact()
+
+            executor = DAGExecutor(name="chunked_data_transformation", max_workers=ResourceGovernor.n_jobs())
+            results = executor.run([
+                Task(name="fit_statistics", output="statistics",
+                     func=lambda: self.compute_fit_statistics(train_file_path)),
+                Task(name="count_test_rows", output="test_rows",
+                     func=lambda: self.count_rows(test_file_path, chunk_size)),
+                Task(name="fit_preprocessor", output="fitted_preprocessor", inputs=["statistics"],
+                     func=lambda statistics: self.fit_from_statistics(preprocessor, statistics)),
+                Task(name="transform_train", output="train_array_path", inputs=["fitted_preprocessor", "statistics"],
+                     func=lambda fitted_preprocessor, statistics: self.transform_to_memmap(
+                         fitted_preprocessor, train_file_path, config.transformed_train_file_path,
+                         statistics["rows"], artifact.transformed_train_target_file_path)),
+                Task(name="transform_test", output="test_array_path", inputs=["fitted_preprocessor", "test_rows"],
+                     func=lambda fitted_preprocessor, test_rows: self.transform_to_memmap(
+                         fitted_preprocessor, test_file_path, config.transformed_test_file_path,
+                         test_rows, artifact.transformed_test_target_file_path)),
+            ])
+
+            save_object(config.transformed_object_file_path, preprocessor,
+                        codec=config.artifact_codec, level=config.artifact_codec_level)
+
+            feature_names = [name.split("__")[-1] for name in preprocessor.get_feature_names_out()]
+            for dataframe_name, array_path, target_path, n_rows in (
+                    ("train", results["train_array_path"], artifact.transformed_train_target_file_path,
+                     results["statistics"]["rows"]),
+                    ("test", results["test_array_path"], artifact.transformed_test_target_file_path,
+                     results["test_rows"])):
+                self.report_array_footprint(dataframe_name, n_rows, len(feature_names),
+                                            [path for path in (array_path, target_path) if path is not None])
+                csv_path = os.path.join(os.path.dirname(array_path), f"transformed_{dataframe_name}.csv")
+                self.export_memmap_as_csv(array_path, csv_path, feature_names + [TARGET_COLUMN], target_path)
+                logging.info(f"Transformed CSV saved at: {csv_path}")
+
+            logging.info("Chunked data transformation completed successfully")
+            return artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         """
         Initiates the data transformation component for the pipeline.
@@ -137,63 +396,60 @@ class DataTransformation:
             if not self.data_validation_artifact.validation_status:
                 raise Exception(self.data_validation_artifact.message)
 
-            # load train and test data
-            train_df = self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)
-            test_df = self.read_data(file_path=self.data_ingestion_artifact.test_file_path)
-            logging.info("Train-Test data loaded")
-
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
-            target_feature_train_df = train_df[TARGET_COLUMN]
+            if self.data_transformation_config.chunked_mode:
+                return self.initiate_chunked_data_transformation()
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
-            target_feature_test_df = test_df[TARGET_COLUMN]
-            logging.info("Input and Target cols defined for both train and test df.")
-
-            # apply custom transformations in specified sequence
-            input_feature_train_df = self.drop_column(input_feature_train_df)
-            input_feature_train_df = self.convert_credit_score(input_feature_train_df)
-
-            input_feature_test_df = self.drop_column(input_feature_test_df)
-            input_feature_test_df = self.convert_credit_score(input_feature_test_df)
-            logging.info("Custom transformations applied to train and test data")
-
-            logging.info("Starting data transformation")
             preprocessor = self.get_data_transformer_object()
             logging.info("Got the preprocessor object")
 
-            logging.info("Initializing transformation for Training-data")
-            input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
-            logging.info("Initializing transformation for Testing-data")
-            input_feature_test_arr = preprocessor.transform(input_feature_test_df)
+            # train and test branches only meet where the preprocessor fitted on train is applied to test
+            executor = DAGExecutor(name="data_transformation", max_workers=ResourceGovernor.n_jobs())
+            results = executor.run([
+                Task(name="read_train", output="train_df",
+                     func=lambda: self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)),
+                Task(name="read_test", output="test_df",
+                     func=lambda: self.read_data(file_path=self.data_ingestion_artifact.test_file_path)),
+                Task(name="prepare_train", output="train_split", inputs=["train_df"],
+                     func=lambda train_df: self.prepare_features(train_df)),
+                Task(name="prepare_test", output="test_split", inputs=["test_df"],
+                     func=lambda test_df: self.prepare_features(test_df)),
+                Task(name="fit_transform_train", output="input_feature_train_arr", inputs=["train_split"],
+                     func=lambda train_split: preprocessor.fit_transform(train_split[0])),
+                Task(name="transform_test", output="input_feature_test_arr",
+                     inputs=["input_feature_train_arr", "test_split"],
+                     func=lambda input_feature_train_arr, test_split: preprocessor.transform(test_split[0])),
+            ])
             logging.info("Transformation done end to end to train-test df.")
 
-            logging.info("Applying SMOTEENN for handling imbalanced dataset.")
-            smt = SMOTEENN(sampling_strategy="minority")
-            input_feature_train_final, target_feature_train_final = smt.fit_resample(
-                input_feature_train_arr, target_feature_train_df
-            )
-            input_feature_test_final, target_feature_test_final = smt.fit_resample(
-                input_feature_test_arr, target_feature_test_df
-            )
-            logging.info("SMOTEENN applied to train-test df.")
-
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
-            logging.info("feature-target concatenation done for train-test df.")
+            config = self.data_transformation_config
+            artifact = self.get_data_transformation_artifact()
+            input_feature_train_arr = self.to_feature_array(results["input_feature_train_arr"])
+            input_feature_test_arr = self.to_feature_array(results["input_feature_test_arr"])
+            target_train_arr = self.to_target_vector(results["train_split"][1])
+            target_test_arr = self.to_target_vector(results["test_split"][1])
 
             save_object(
-                self.data_transformation_config.transformed_object_file_path,
+                config.transformed_object_file_path,
                 preprocessor,
+                codec=config.artifact_codec,
+                level=config.artifact_codec_level,
             )
-            save_numpy_array_data(
-                self.data_transformation_config.transformed_train_file_path,
-                array=train_arr,
-            )
-            save_numpy_array_data(
-                self.data_transformation_config.transformed_test_file_path,
-                array=test_arr,
-            )
+            if config.compact_arrays:
+                # features and target are stored apart, each in its own narrow dtype
+                train_arrays = ((config.transformed_train_file_path, input_feature_train_arr),
+                                (config.transformed_train_target_file_path, target_train_arr))
+                test_arrays = ((config.transformed_test_file_path, input_feature_test_arr),
+                               (config.transformed_test_target_file_path, target_test_arr))
+            else:
+                train_arrays = ((config.transformed_train_file_path, np.c_[input_feature_train_arr, target_train_arr]),)
+                test_arrays = ((config.transformed_test_file_path, np.c_[input_feature_test_arr, target_test_arr]),)
+                logging.info("feature-target concatenation done for train-test df.")
+            for file_path, array in train_arrays + test_arrays:
+                save_numpy_array_data(file_path, array=array, column_major=config.column_major and array.ndim == 2)
             logging.info("Saving transformation object and transformed files.")
+            n_features = input_feature_train_arr.shape[1]
+            self.report_array_footprint("train", len(target_train_arr), n_features, [path for path, _ in train_arrays])
+            self.report_array_footprint("test", len(target_test_arr), n_features, [path for path, _ in test_arrays])
 
             # Get feature names from the preprocessor
             feature_names = preprocessor.get_feature_names_out()
@@ -201,14 +457,10 @@ class DataTransformation:
             feature_names = [name.split("__")[-1] for name in feature_names]
 
             # convert the transformed NumPy arrays back to DataFrame
-            train_transformed_df = pd.DataFrame(
-                train_arr,
-                columns=feature_names + [TARGET_COLUMN],
-            )
-            test_transformed_df = pd.DataFrame(
-                test_arr,
-                columns=feature_names + [TARGET_COLUMN],
-            )
+            train_transformed_df = pd.DataFrame(input_feature_train_arr, columns=feature_names)
+            train_transformed_df[TARGET_COLUMN] = target_train_arr
+            test_transformed_df = pd.DataFrame(input_feature_test_arr, columns=feature_names)
+            test_transformed_df[TARGET_COLUMN] = target_test_arr
 
             # define paths for CSV files
             transformed_train_csv_path = os.path.join(os.path.dirname(self.data_transformation_config.transformed_train_file_path),
@@ -230,10 +482,6 @@ class DataTransformation:
             logging.info(f"Transformed test CSV saved at: {transformed_test_csv_path}")
 
             logging.info("Data transformation completed successfully")
-            return DataTransformationArtifact(
-                transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
-                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
-            )
+            return artifact
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
@@ -5,11 +5,17 @@ from src.utils.main_utils import read_yaml_file
 from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from src.entity.config_entity import DataValidationConfig
 from src.constants.constant import SCHEMA_FILE_PATH
+from src.utils.dag_executor import DAGExecutor, Task
+from src.utils.resource_governor import ResourceGovernor
+from src.utils.schema_compiler import SchemaCompiler
 import json
+import time
 
 import sys, os
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
+from pandas.api.types import is_numeric_dtype
 
 
 class DataValidation:
@@ -74,10 +80,156 @@ class DataValidation:
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
+    def validate_dataframe(self, dataframe: DataFrame, dataframe_name: str) -> str:
+        """
+        Method Name :   validate_dataframe
+        Description :   This method runs the column count and column existence checks on one dataframe
+
+        Output      :   Returns the validation error message, empty when the dataframe is valid
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            validation_error_message = ""
+            status = self.validate_number_of_columns(dataframe=dataframe)
+            if not status:
+                validation_error_message += f"Columns are missing in {dataframe_name} dataframe. "
+            else:
+                logging.info(f"All required columns present in {dataframe_name} dataframe: {status}")
+
+            status = self.is_column_exist(dataframe=dataframe)
+            if not status:
+                validation_error_message += f"Columns are missing in {dataframe_name} dataframe. "
+            else:
+                logging.info(f"All categorical/numerical columns present in {dataframe_name} dataframe: {status}")
+            return validation_error_message
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return SchemaCompiler().read_csv(file_path)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    def profile_file(self, file_path: str, dataframe_name: str) -> dict:
+        """
+        Method Name :   profile_file
+        Description :   This method streams a CSV file chunk by chunk and checks, for every column of the schema,
+                        dtypes, null counts, categorical domains and numerical ranges, plus duplicate ids.
+                        Every check is a vectorized operation over the whole chunk, so the file is read once
+                        and never has to fit in memory
+
+        Output      :   Returns the per-column profile, the error message and the unique ids of the file
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            declared_types = {name: declared for column in self._schema_config["columns"]
+                              for name, declared in column.items()}
+            column_ranges = self._schema_config.get("column_ranges", {})
+            domains = self._schema_config.get("categorical_domains", {})
+            id_column = self._schema_config.get("id_column")
+            numeric_columns = [name for name, declared in declared_types.items() if declared in ("int", "float")]
+            integer_columns = [name for name in numeric_columns if declared_types[name] == "int"]
+            ranged_columns = [name for name in numeric_columns if name in column_ranges]
+
+            profiles = {name: {"declared_type": declared, "dtype_violations": 0, "null_count": 0,
+                               "min": None, "max": None, "range_violations": 0, "domain_violations": 0,
+                               "unexpected_values": set()}
+                        for name, declared in declared_types.items()}
+            id_chunks = []
+            rows = 0
+            validation_error_message = None
+            start_time = time.perf_counter()
+
+            reader = pd.read_csv(file_path, chunksize=self.data_validation_config.chunk_size,
+                                 dtype={name: "category" for name in domains})
+            for chunk in reader:
+                if validation_error_message is None:
+                    validation_error_message = self.validate_dataframe(chunk.head(0), dataframe_name)
+                rows += len(chunk)
+
+                # nulls for every column in one call
+                for name, null_count in chunk.isna().sum().items():
+                    if name in profiles:
+                        profiles[name]["null_count"] += int(null_count)
+
+                # numerical columns: coerce once, then dtype, range and min/max checks on the whole block
+                present_numeric = [name for name in numeric_columns if name in chunk.columns]
+                raw = chunk[present_numeric]
+                # only columns the parser could not read as numbers need coercing
+                unparsed = [name for name in present_numeric if not is_numeric_dtype(raw[name])]
+                numeric = raw.assign(**{name: pd.to_numeric(raw[name], errors="coerce") for name in unparsed}) if unparsed else raw
+                not_numeric = (numeric.isna() & raw.notna()).sum()
+                present_integer = [name for name in integer_columns if name in chunk.columns]
+                fractional = (numeric[present_integer].notna() & (numeric[present_integer] % 1 != 0)).sum()
+                present_ranged = [name for name in ranged_columns if name in chunk.columns]
+                lows = np.array([column_ranges[name][0] for name in present_ranged], dtype=np.float64)
+                highs = np.array([column_ranges[name][1] for name in present_ranged], dtype=np.float64)
+                values = numeric[present_ranged].to_numpy(dtype=np.float64, na_value=np.nan)
+                with np.errstate(invalid="ignore"):
+                    out_of_range = ((values < lows) | (values > highs)).sum(axis=0)
+                minimums, maximums = numeric.min(), numeric.max()
+
+                for name in present_numeric:
+                    profile = profiles[name]
+                    profile["dtype_violations"] += int(not_numeric[name]) + int(fractional.get(name, 0))
+                    if not pd.isna(minimums[name]):
+                        profile["min"] = float(minimums[name]) if profile["min"] is None else min(profile["min"], float(minimums[name]))
+                        profile["max"] = float(maximums[name]) if profile["max"] is None else max(profile["max"], float(maximums[name]))
+                for name, violations in zip(present_ranged, out_of_range):
+                    profiles[name]["range_violations"] += int(violations)
+
+                # categorical columns: count values per category, then compare the category set with the domain
+                for name, domain in domains.items():
+                    if name not in chunk.columns:
+                        continue
+                    counts = chunk[name].value_counts()
+                    unexpected = counts[~counts.index.isin(domain) & (counts > 0)]
+                    profiles[name]["domain_violations"] += int(unexpected.sum())
+                    profiles[name]["unexpected_values"].update(str(value) for value in unexpected.index[:10])
+
+                if id_column in chunk.columns:
+                    id_chunks.append(numeric[id_column].dropna().to_numpy(dtype=np.int64))
+
+            seconds = time.perf_counter() - start_time
+            if validation_error_message is None:
+                validation_error_message = f"No rows found in {dataframe_name} dataframe. "
+
+            ids = np.concatenate(id_chunks) if id_chunks else np.empty(0, dtype=np.int64)
+            unique_ids, id_counts = np.unique(ids, return_counts=True)
+            duplicate_ids = int((id_counts - 1).sum())
+            if duplicate_ids > 0:
+                validation_error_message += f"{duplicate_ids} duplicate ids in {dataframe_name} dataframe. "
+
+            impute_features = self._schema_config.get("impute_features", [])
+            for name, profile in profiles.items():
+                profile["null_rate"] = round(profile["null_count"] / rows, 6) if rows else 0.0
+                profile["unexpected_values"] = sorted(profile["unexpected_values"])
+                max_null_rate = self.data_validation_config.max_null_rate if name in impute_features else 0.0
+                if profile["null_rate"] > max_null_rate:
+                    validation_error_message += f"Null rate of [{name}] in {dataframe_name} dataframe is {profile['null_rate']}. "
+                for check in ("dtype_violations", "range_violations", "domain_violations"):
+                    if profile[check] > 0:
+                        validation_error_message += f"{profile[check]} {check.replace('_', ' ')} in [{name}] of {dataframe_name} dataframe. "
+
+            rows_per_second = rows / seconds if seconds > 0 else float(rows)
+            logging.info(f"Validated {rows} rows of {dataframe_name} dataframe in {seconds:.3f}s ({rows_per_second:,.0f} rows/s)")
+            if rows >= self.data_validation_config.chunk_size and rows_per_second < self.data_validation_config.target_rows_per_second:
+                logging.warning(f"Validation throughput below target of {self.data_validation_config.target_rows_per_second:,} rows/s")
+
+            return {
+                "message": validation_error_message,
+                "unique_ids": unique_ids,
+                "report": {
+                    "file_path": file_path,
+                    "rows": rows,
+                    "seconds": round(seconds, 4),
+                    "rows_per_second": round(rows_per_second),
+                    "duplicate_ids": duplicate_ids,
+                    "columns": profiles,
+                },
+            }
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
@@ -91,48 +243,22 @@ class DataValidation:
         """
 
         try:
-            validation_error_message = ""
             logging.info("Starting data validation")
-            train_df, test_df = (
-                DataValidation.read_data(
-                    file_path=self.data_ingestion_artifact.trained_file_path
-                ),
-                DataValidation.read_data(
-                    file_path=self.data_ingestion_artifact.test_file_path
-                ),
-            )
+            executor = DAGExecutor(name="data_validation", max_workers=ResourceGovernor.n_jobs())
+            results = executor.run([
+                Task(name="profile_train", output="train_profile",
+                     func=lambda: self.profile_file(self.data_ingestion_artifact.trained_file_path, "training")),
+                Task(name="profile_test", output="test_profile",
+                     func=lambda: self.profile_file(self.data_ingestion_artifact.test_file_path, "test")),
+            ])
+            train_profile, test_profile = results["train_profile"], results["test_profile"]
+            validation_error_message = train_profile["message"] + test_profile["message"]
 
-            # check length of train and test dataframe
-            status = self.validate_number_of_columns(dataframe=train_df)
-            if not status:
-                validation_error_message += f"Columns are missing in training dataframe."
-            else:
-                logging.info(
-                    f"All required columns present in training dataframe: {status}"
-                )
-
-            status = self.validate_number_of_columns(dataframe=test_df)
-            if not status:
-                validation_error_message += f"Columns are missing in test dataframe. "
-            else:
-                logging.info(f"All required columns present in testing dataframe: {status}")
-
-            # Validating col dtype for train/test df
-            status = self.is_column_exist(dataframe=train_df)
-            if not status:
-                validation_error_message += f"Columns are missing in training dataframe. "
-            else:
-                logging.info(
-                    f"All categorical/int columns present in training dataframe: {status}"
-                )
-
-            status = self.is_column_exist(dataframe=test_df)
-            if not status:
-                validation_error_message += f"Columns are missing in test dataframe."
-            else:
-                logging.info(
-                    f"All categorical/numerical columns present in testing dataframe: {status}"
-                )
+            # the same id on both sides of the split leaks records from train into test
+            shared_ids = int(np.intersect1d(train_profile["unique_ids"], test_profile["unique_ids"],
+                                            assume_unique=True).size)
+            if shared_ids > 0:
+                validation_error_message += f"{shared_ids} ids present in both training and test dataframe. "
 
             validation_status = len(validation_error_message) == 0
 
@@ -150,6 +276,9 @@ class DataValidation:
             validation_report = {
                 "validation_status": validation_status,
                 "message": validation_error_message.strip(),
+                "shared_ids": shared_ids,
+                "train": train_profile["report"],
+                "test": test_profile["report"],
             }
 
             with open(self.data_validation_config.validation_report_file_path, "w") as report_file:
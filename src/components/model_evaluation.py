@@ -4,19 +4,24 @@ from src.entity.artifact_entity import (
     DataTransformationArtifact,
     ModelEvaluationArtifact,
 )
-from sklearn.metrics import f1_score
 
 from src.exception.exception import VehicleInsuranceException
 from src.constants.constant import TARGET_COLUMN
 from src.logging.logger import logging
-from src.utils.main_utils import load_object
+from src.utils.main_utils import load_object, load_features_target
+from src.utils.metrics_engine import MetricsEngine
+from src.utils.model_profiler import profile_model
 
 import sys
+import time
 import pandas as pd
 import numpy as np
-from typing import Optional
-from src.entity.s3_estimator import ModelEstimator
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from joblib import parallel_config
+from src.utils.resource_governor import ResourceGovernor
+from src.entity.model_registry import ModelRegistry
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -25,6 +30,10 @@ class EvaluateModelResponse:
     best_model_f1_score: float
     is_model_accepted: bool
     difference: float
+    trained_model_profile: Optional[dict] = None
+    production_model_profile: Optional[dict] = None
+    budget_violations: List[str] = field(default_factory=list)
+    production_model_version: Optional[str] = None
 
 
 class ModelEvaluation:
@@ -38,77 +47,168 @@ class ModelEvaluation:
             self.model_eval_config = model_eval_config
             self.data_transformation_artifact = data_transformation_artifact
             self.model_trainer_artifact = model_trainer_artifact
+            self.model_registry = ModelRegistry(bucket_name=model_eval_config.bucket_name,
+                                                registry_key=model_eval_config.model_registry_key,
+                                                cache_dir=model_eval_config.model_cache_dir)
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
 
-    def get_best_model(self) -> Optional[ModelEstimator]:
+    def get_best_model(self) -> Optional[str]:
         """
         Method Name :   get_best_model
-        Description :   This function is used to get model from production stage.
+        Description :   This function is used to get the version of the production model from the
+                        manifest of the model registry
 
-        Output      :   Returns model object if available in s3 storage
+        Output      :   Returns the production model version if there is one
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            bucket_name = self.model_eval_config.bucket_name
-            model_path = self.model_eval_config.s3_model_key_path
-            model_estimator = ModelEstimator(
-                bucket_name=bucket_name, model_path=model_path
+            return self.model_registry.get_version(stage="production")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    def score_trained_model(self, x: np.array, y: np.array, n_jobs: int) -> float:
+        """
+        Method Name :   score_trained_model
+        Description :   This function computes the F1 score of the newly trained model, reusing the test
+                        predictions of the model trainer when present
+
+        Output      :   Returns the F1 score
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            start_time = time.perf_counter()
+            # The trainer already predicted the test set, its predictions are reused when present
+            cached_predictions = MetricsEngine.load_predictions(
+                self.model_trainer_artifact.test_predictions_file_path, n_rows=len(y)
             )
+            if cached_predictions is not None:
+                y_hat_trained_model, _ = cached_predictions
+                logging.info("Reusing the test predictions of the model trainer.")
+            else:
+                # Load trained model
+                trained_model = load_object(
+                    file_path=self.model_trainer_artifact.trained_model_file_path
+                )
+                logging.info("Trained model loaded/exists.")
 
-            if model_estimator.is_model_present():
-                return model_estimator
-            return None
+                # Get predictions from new trained model directly from numpy array
+                # This is safe because MyModel.predict uses preprocessing_object.transform
+                # which can handle numpy arrays directly
+                with parallel_config(n_jobs=n_jobs):
+                    y_hat_trained_model, _ = MetricsEngine.predict(trained_model.trained_model_object, x)
+            trained_model_f1_score = MetricsEngine.classification_metrics(y, y_hat_trained_model).f1_score
+            logging.info(f"F1_Score for this model: {trained_model_f1_score} "
+                         f"({time.perf_counter() - start_time:.3f}s)")
+            return trained_model_f1_score
         except Exception as e:
-            raise VehicleInsuranceException(e, sys)
+            raise VehicleInsuranceException(e, sys) from e
+
+    def score_production_model(self, x: np.array, y: np.array, n_jobs: int,
+                               production_model_version: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Method Name :   score_production_model
+        Description :   This function computes the F1 score of the production model. The model is read from
+                        the local model cache of the registry and only downloaded when that version is not
+                        on disk yet
+
+        Output      :   Returns the F1 score and the local model file, or (None, None) when there is no
+                        production model
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            start_time = time.perf_counter()
+            if production_model_version is None:
+                return None, None
+            logging.info(f"Computing F1_Score for production model {production_model_version}..")
+            production_model_file_path = self.model_registry.download_version(production_model_version)
+            production_model = load_object(production_model_file_path)
+            # Use the trained_model_object directly to bypass the preprocessing steps
+            # that are causing column name issues
+            with parallel_config(n_jobs=n_jobs):
+                y_hat_best_model, _ = MetricsEngine.predict(production_model.trained_model_object, x)
+            best_model_f1_score = MetricsEngine.classification_metrics(y, y_hat_best_model).f1_score
+            logging.info(f"F1_Score-Production Model: {best_model_f1_score} "
+                         f"({time.perf_counter() - start_time:.3f}s)")
+            return best_model_f1_score, production_model_file_path
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def profile(self, model_file_path: str, x: np.array) -> dict:
+        """Serving cost of a saved model on the test features, with the sample sizes of the config."""
+        return profile_model(model_file_path, x,
+                             single_row_samples=self.model_eval_config.single_row_samples,
+                             batch_size=self.model_eval_config.batch_size,
+                             batch_repeats=self.model_eval_config.batch_repeats)
+
+    def get_budget_violations(self, trained_model_profile: dict,
+                              production_model_profile: Optional[dict] = None) -> List[str]:
+        """
+        Method Name :   get_budget_violations
+        Description :   This function checks the serving cost of the trained model against the budgets of
+                        the config, the latency ratio only when a production model was profiled
+
+        Output      :   Returns a description of every budget exceeded, empty when all are met
+        """
+        config = self.model_eval_config
+        violations = []
+        budgets = [
+            ("single_row_p99_ms", config.max_single_row_p99_ms),
+            ("batch_ms", config.max_batch_ms),
+            ("model_size_mb", config.max_model_size_mb),
+            ("memory_mb", config.max_memory_mb),
+        ]
+        for name, budget in budgets:
+            if budget is not None and trained_model_profile[name] > budget:
+                violations.append(f"{name} {trained_model_profile[name]} exceeds the budget of {budget}")
+        if config.max_latency_ratio is not None and production_model_profile is not None:
+            # the median, a p99 over a few hundred samples is too noisy to compare two models by
+            ratio = trained_model_profile["single_row_p50_ms"] / max(production_model_profile["single_row_p50_ms"], 1e-9)
+            if ratio > config.max_latency_ratio:
+                violations.append(f"single_row_p50_ms is {ratio:.2f}x the production model, "
+                                  f"more than {config.max_latency_ratio}x")
+        return violations
 
     def evaluate_model(self) -> EvaluateModelResponse:
         """
         Method Name :   evaluate_model
         Description :   This function is used to evaluate trained model
-                        with production model and choose best model
+                        with production model and choose best model. Both models are scored concurrently.
+                        A model with a better F1 score is only accepted within the serving budgets
 
         Output      :   Returns bool value based on validation results
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            # Load transformed test data
-            test_arr = np.load(
-                self.data_transformation_artifact.transformed_test_file_path
+            # Memory-map transformed test data, features and target are views on the file
+            x, y = load_features_target(
+                self.data_transformation_artifact.transformed_test_file_path,
+                self.data_transformation_artifact.transformed_test_target_file_path,
+                mmap_mode="r",
             )
-            x = test_arr[:, :-1]  # All columns except last
-            y = test_arr[:, -1]  # Last column is target
 
             logging.info("Transformed test data loaded and ready for prediction...")
 
-            # Load trained model
-            trained_model = load_object(
-                file_path=self.model_trainer_artifact.trained_model_file_path
-            )
-            logging.info("Trained model loaded/exists.")
-
-            # Get predictions from new trained model directly from numpy array
-            # This is safe because MyModel.predict uses preprocessing_object.transform
-            # which can handle numpy arrays directly
-            y_hat_trained_model = trained_model.trained_model_object.predict(x)
-            trained_model_f1_score = f1_score(y, y_hat_trained_model)
-            logging.info(f"F1_Score for this model: {trained_model_f1_score}")
-
-            best_model_f1_score = None
-            best_model = self.get_best_model()
-            if best_model is not None:
-                logging.info(f"Computing F1_Score for production model..")
-                # Use the trained_model_object directly to bypass the preprocessing steps
-                # that are causing column name issues
-                if best_model.loaded_model is None:
-                    best_model.loaded_model = best_model.load_model()
-                y_hat_best_model = best_model.loaded_model.trained_model_object.predict(
-                    x
-                )
-                best_model_f1_score = f1_score(y, y_hat_best_model)
-                logging.info(
-                    f"F1_Score-Production Model: {best_model_f1_score}, F1_Score-New Trained Model: {trained_model_f1_score}"
-                )
+            # The production model is fetched and scored on a second thread while the new model is
+            # scored, each side predicts on half of the allotted cores
+            start_time = time.perf_counter()
+            production_model_version = self.get_best_model()
+            n_jobs = max(1, ResourceGovernor.allotted_cores() // 2)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                production_future = executor.submit(self.score_production_model, x, y, n_jobs,
+                                                     production_model_version)
+                trained_model_f1_score = self.score_trained_model(x, y, n_jobs)
+                best_model_f1_score, production_model_file_path = production_future.result()
+            logging.info(f"Both models scored in {time.perf_counter() - start_time:.3f}s")
+
+            # Serving cost, profiled one model at a time so the timings do not compete for cores
+            trained_model_profile = self.profile(self.model_trainer_artifact.trained_model_file_path, x)
+            production_model_profile = None
+            if production_model_file_path is not None and self.model_eval_config.max_latency_ratio is not None:
+                production_model_profile = self.profile(production_model_file_path, x)
+            budget_violations = self.get_budget_violations(trained_model_profile, production_model_profile)
+            for violation in budget_violations:
+                logging.info(f"Serving budget exceeded: {violation}")
 
             tmp_best_model_score = (
                 0 if best_model_f1_score is None else best_model_f1_score
@@ -116,8 +216,12 @@ class ModelEvaluation:
             result = EvaluateModelResponse(
                 trained_model_f1_score=trained_model_f1_score,
                 best_model_f1_score=best_model_f1_score,
-                is_model_accepted=trained_model_f1_score > tmp_best_model_score,
+                is_model_accepted=trained_model_f1_score > tmp_best_model_score and not budget_violations,
                 difference=trained_model_f1_score - tmp_best_model_score,
+                trained_model_profile=trained_model_profile,
+                production_model_profile=production_model_profile,
+                budget_violations=budget_violations,
+                production_model_version=production_model_version,
             )
             logging.info(f"Result: {result}")
             return result
@@ -139,13 +243,19 @@ class ModelEvaluation:
             )
             logging.info("Initialized Model Evaluation Component.")
             evaluate_model_response = self.evaluate_model()
-            s3_model_path = self.model_eval_config.s3_model_key_path
+            production_model_version = evaluate_model_response.production_model_version
+            s3_model_path = (self.model_registry.version_key(production_model_version)
+                             if production_model_version is not None else self.model_registry.manifest_key)
 
             model_evaluation_artifact = ModelEvaluationArtifact(
                 is_model_accepted=evaluate_model_response.is_model_accepted,
                 s3_model_path=s3_model_path,
                 trained_model_path=self.model_trainer_artifact.trained_model_file_path,
                 changed_accuracy=evaluate_model_response.difference,
+                trained_model_profile=evaluate_model_response.trained_model_profile,
+                production_model_profile=evaluate_model_response.production_model_profile,
+                budget_violations=evaluate_model_response.budget_violations,
+                production_model_version=production_model_version,
             )
 
             logging.info(f"Model evaluation artifact: {model_evaluation_artifact}")
@@ -1,12 +1,11 @@
 import sys
 
-from src.cloud_storage.aws_storage import SimpleStorageService
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
 
 from src.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact
 from src.entity.config_entity import ModelPusherConfig
-from src.entity.s3_estimator import ModelEstimator
+from src.entity.model_registry import ModelRegistry
 
 
 class ModelPusher:
@@ -16,16 +15,17 @@ class ModelPusher:
         :param model_evaluation_artifact: Output reference of data evaluation artifact stage
         :param model_pusher_config: Configuration for model pusher
         """
-        self.s3 = SimpleStorageService()
         self.model_evaluation_artifact = model_evaluation_artifact
         self.model_pusher_config = model_pusher_config
-        self.model_estimator = ModelEstimator(bucket_name=model_pusher_config.bucket_name,
-                                model_path=model_pusher_config.s3_model_key_path)
+        self.model_registry = ModelRegistry(bucket_name=model_pusher_config.bucket_name,
+                                            registry_key=model_pusher_config.model_registry_key)
 
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         """
         Method Name :   initiate_model_evaluation
-        Description :   This function is used to initiate all steps of the model pusher
+        Description :   This function is used to initiate all steps of the model pusher. The model is
+                        registered as a new version, promoted to production with an atomic manifest
+                        write, and versions no longer needed for rollbacks are garbage collected
         
         Output      :   Returns model evaluation artifact
         On Failure  :   Write an exception log and then raise an exception
@@ -34,14 +34,28 @@ class ModelPusher:
 
         try:
             print("------------------------------------------------------------------------------------------------")
-            logging.info("Uploading artifacts folder to s3 bucket")
-            
-            logging.info("Uploading new model to S3 bucket....")
-            self.model_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
+            logging.info("Registering new model in the model registry....")
+            model_version = self.model_registry.register(
+                self.model_evaluation_artifact.trained_model_path,
+                metadata={"changed_accuracy": self.model_evaluation_artifact.changed_accuracy,
+                          "trained_model_profile": self.model_evaluation_artifact.trained_model_profile},
+            )
+            self.model_registry.promote(model_version, stage="production")
+            self.model_registry.garbage_collect()
+
+            artifacts_s3_key_path = None
+            if self.model_pusher_config.push_artifacts:
+                logging.info("Uploading artifacts folder to the model bucket")
+                self.model_registry.storage.upload_directory(from_dir=self.model_pusher_config.artifact_dir,
+                                                             to_prefix=self.model_pusher_config.artifacts_s3_key_path)
+                artifacts_s3_key_path = self.model_pusher_config.artifacts_s3_key_path
+                logging.info("Uploaded artifacts folder to the model bucket")
+
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
-                                                        s3_model_path=self.model_pusher_config.s3_model_key_path)
+                                                        s3_model_path=self.model_registry.version_key(model_version),
+                                                        model_version=model_version,
+                                                        artifacts_s3_key_path=artifacts_s3_key_path)
 
-            logging.info("Uploaded artifacts folder to s3 bucket")
             logging.info(f"Model pusher artifact: [{model_pusher_artifact}]")
             logging.info("Exited initiate_model_pusher method of ModelTrainer class")
             
@@ -1,20 +1,29 @@
 import sys
-from typing import Tuple
+import copy
+import time
+from typing import Optional, Tuple
 
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
 
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
-from src.utils.main_utils import load_numpy_array_data, load_object, save_object
+from src.utils.main_utils import load_features_target, load_object, save_object
+from src.utils.metrics_engine import MetricsEngine
+from src.utils.model_backend import build_model, fit_model, get_categorical_features
+from src.utils.resource_governor import ResourceGovernor
 from src.entity.config_entity import ModelTrainerConfig
 from src.entity.artifact_entity import (
     DataTransformationArtifact,
+    DataResamplingArtifact,
+    ModelTunerArtifact,
     ModelTrainerArtifact,
     ClassificationMetricArtifact,
 )
 from src.entity.estimator import MyModel
+from src.entity.model_registry import ModelRegistry
+
+ACCURACY_GATES = ("oob", "test", "train")
 
 
 class ModelTrainer:
@@ -22,70 +31,224 @@ class ModelTrainer:
         self,
         data_transformation_artifact: DataTransformationArtifact,
         model_trainer_config: ModelTrainerConfig,
+        data_resampling_artifact: Optional[DataResamplingArtifact] = None,
+        model_tuner_artifact: Optional[ModelTunerArtifact] = None,
     ):
         """
         :param data_transformation_artifact: Output reference of data transformation artifact stage
         :param model_trainer_config: Configuration for model training
+        :param data_resampling_artifact: Output reference of data resampling artifact stage, when given
+                                         the model is trained on the resampled training data
+        :param model_tuner_artifact: Output reference of model tuner artifact stage, when given its best
+                                     parameters override the configured ones
         """
         self.data_transformation_artifact = data_transformation_artifact
         self.model_trainer_config = model_trainer_config
+        self.data_resampling_artifact = data_resampling_artifact
+        self.model_tuner_artifact = model_tuner_artifact
+        self.training_report = {"training_mode": "full", "training_seconds": None,
+                                "estimated_full_refit_seconds": None}
+        # predicted labels and probabilities of the test set, from the last get_model_object_and_report call
+        self.test_predictions: Optional[Tuple[np.ndarray, Optional[np.ndarray]]] = None
+        if model_trainer_config.accuracy_gate not in ACCURACY_GATES:
+            raise VehicleInsuranceException(
+                ValueError(f"Unknown accuracy gate [{model_trainer_config.accuracy_gate}], "
+                           f"expected one of {ACCURACY_GATES}"), sys)
+
+    @staticmethod
+    def get_model_params(model_trainer_config: ModelTrainerConfig, best_params: Optional[dict] = None) -> dict:
+        """
+        Method Name :   get_model_params
+        Description :   This function collects the parameters of the configured model backend,
+                        overridden by the best parameters of the hyperparameter search if any
+
+        Output      :   Returns the model parameters
+        """
+        if model_trainer_config.model_backend == "hist_gradient_boosting":
+            params = {
+                "learning_rate": model_trainer_config._hgb_learning_rate,
+                "max_iter": model_trainer_config._hgb_max_iter,
+                "max_leaf_nodes": model_trainer_config._hgb_max_leaf_nodes,
+                "max_depth": model_trainer_config._hgb_max_depth,
+                "min_samples_leaf": model_trainer_config._hgb_min_samples_leaf,
+                "l2_regularization": model_trainer_config._hgb_l2_regularization,
+                "max_bins": model_trainer_config._hgb_max_bins,
+                "early_stopping": model_trainer_config._hgb_early_stopping,
+                "random_state": model_trainer_config._random_state,
+            }
+            params.update(best_params or {})
+            return params
+        params = {
+            "n_estimators": model_trainer_config._n_estimators,
+            "min_samples_split": model_trainer_config._min_samples_split,
+            "min_samples_leaf": model_trainer_config._min_samples_leaf,
+            "max_depth": model_trainer_config._max_depth,
+            "criterion": model_trainer_config._criterion,
+            "max_features": model_trainer_config._max_features,
+            "bootstrap": model_trainer_config._bootstrap,
+            "oob_score": model_trainer_config._oob_score,
+            "random_state": model_trainer_config._random_state,
+        }
+        params.update(best_params or {})
+        return params
+
+    @property
+    def model_params(self) -> dict:
+        """Parameters of the model to train, including the search results when a tuner artifact is given."""
+        best_params = self.model_tuner_artifact.best_params if self.model_tuner_artifact is not None else None
+        return self.get_model_params(self.model_trainer_config, best_params)
+
+    def get_production_forest(self, preprocessing_obj: object) -> Optional[RandomForestClassifier]:
+        """
+        Method Name :   get_production_forest
+        Description :   This function loads the production model and returns its forest when new trees
+                        can be added to it, i.e. it is a RandomForestClassifier fed the same features
+
+        Output      :   Returns the production forest or None
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.model_trainer_config.model_backend != "random_forest":
+                logging.info(f"Incremental training needs the random_forest backend, "
+                             f"not {self.model_trainer_config.model_backend}")
+                return None
+            model_registry = ModelRegistry(bucket_name=self.model_trainer_config.production_bucket_name,
+                                           registry_key=self.model_trainer_config.production_model_registry_key)
+            production_model_version = model_registry.get_version(stage="production")
+            if production_model_version is None:
+                logging.info("No production model to extend")
+                return None
+            production_model = model_registry.load_version(production_model_version)
+            forest = production_model.trained_model_object
+            if not isinstance(forest, RandomForestClassifier):
+                logging.info(f"Production model is a {type(forest).__name__}, not a RandomForestClassifier")
+                return None
+            production_features = list(production_model.preprocessing_object.get_feature_names_out())
+            if production_features != list(preprocessing_obj.get_feature_names_out()):
+                logging.info("Production model was trained on different features")
+                return None
+            return forest
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def fit_incremental(self, production_forest: RandomForestClassifier, x_train: np.array, y_train: np.array,
+                        n_jobs: int) -> RandomForestClassifier:
+        """
+        Method Name :   fit_incremental
+        Description :   This function adds incremental_n_new_estimators trees to a copy of the production forest
+                        with warm_start, then retires the oldest trees so the forest keeps at most
+                        incremental_max_estimators. The new trees are fitted on the whole current training
+                        set, the ingestion split shuffles the rows so there is no recent slice to pick.
+                        OOB scoring is switched off, the old trees never saw this data so their out-of-bag
+                        estimate would be meaningless. Only the fit is timed, a full refit of the final
+                        forest is estimated from the fit time per new tree
+
+        Output      :   Returns the extended forest
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.model_trainer_config
+            model = copy.deepcopy(production_forest)
+            if not np.array_equal(model.classes_, np.unique(y_train)):
+                raise ValueError(f"Production classes {model.classes_} differ from the training classes")
+            n_previous = len(model.estimators_)
+            model.set_params(warm_start=True, oob_score=False, n_jobs=n_jobs,
+                             n_estimators=n_previous + config.incremental_n_new_estimators)
+            start_time = time.perf_counter()
+            model.fit(x_train, y_train)
+            seconds = time.perf_counter() - start_time
+
+            n_retired = max(0, len(model.estimators_) - config.incremental_max_estimators)
+            if n_retired:
+                model.estimators_ = model.estimators_[n_retired:]
+            model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+            for attribute in ("oob_score_", "oob_decision_function_"):
+                if hasattr(model, attribute):
+                    delattr(model, attribute)
+            logging.info(f"Added {config.incremental_n_new_estimators} trees to the {n_previous} production trees "
+                         f"and retired the {n_retired} oldest, forest has {len(model.estimators_)} trees")
+
+            # an estimate, not a measurement: a full refit costs about the time per new tree for every tree
+            estimated_full_refit_seconds = seconds / config.incremental_n_new_estimators * len(model.estimators_)
+            self.training_report = {"training_mode": "incremental", "training_seconds": round(seconds, 4),
+                                    "estimated_full_refit_seconds": round(estimated_full_refit_seconds, 4)}
+            logging.info(f"Incremental fit took {seconds:.3f}s, a full refit is estimated at "
+                         f"{estimated_full_refit_seconds:.3f}s")
+            return model
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
 
     def get_model_object_and_report(
-        self, train: np.array, test: np.array
+        self, train: Tuple[np.array, np.array], test: Tuple[np.array, np.array],
+        production_forest: Optional[RandomForestClassifier] = None,
+        categorical_features: Optional[np.ndarray] = None,
     ) -> Tuple[object, object]:
         """
         Method Name :   get_model_object_and_report
-        Description :   This function trains a RandomForestClassifier with specified parameters
+        Description :   This function trains a model of the configured backend with specified parameters,
+                        or extends the production forest when one is given. categorical_features marks
+                        the category code columns for backends that split on categories natively.
+                        The test set predictions are kept in test_predictions, nothing is written to disk
 
         Output      :   Returns metric artifact object and trained model object
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            logging.info("Training RandomForestClassifier with specified parameters")
-
-            # Splitting the train and test data into features and target variables
-            x_train, y_train, x_test, y_test = (
-                train[:, :-1],
-                train[:, -1],
-                test[:, :-1],
-                test[:, -1],
-            )
-            logging.info("train-test split done.")
-
-            # Initialize RandomForestClassifier with specified parameters
-            model = RandomForestClassifier(
-                n_estimators=self.model_trainer_config._n_estimators,
-                min_samples_split=self.model_trainer_config._min_samples_split,
-                min_samples_leaf=self.model_trainer_config._min_samples_leaf,
-                max_depth=self.model_trainer_config._max_depth,
-                criterion=self.model_trainer_config._criterion,
-                max_features=self.model_trainer_config._max_features,
-                bootstrap=self.model_trainer_config._bootstrap,
-                oob_score=self.model_trainer_config._oob_score,
-                random_state=self.model_trainer_config._random_state,
-            )
+            x_train, y_train = train
+            x_test, y_test = test
 
-            # Fit the model
+            # models are fitted on the allotted cores
+            n_jobs = ResourceGovernor.n_jobs(self.model_trainer_config._n_jobs)
             logging.info("Model training going on...")
-            model.fit(x_train, y_train)
-            logging.info("Model training done.")
-
-            # Predictions and evaluation metrics
-            y_pred = model.predict(x_test)
-            accuracy = accuracy_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
-
-            # Creating metric artifact
-            metric_artifact = ClassificationMetricArtifact(
-                f1_score=f1, precision_score=precision, recall_score=recall
-            )
+            if production_forest is not None:
+                model = self.fit_incremental(production_forest, x_train, y_train, n_jobs)
+            else:
+                model_params = self.model_params
+                model = build_model(self.model_trainer_config.model_backend, model_params, categorical_features)
+                logging.info(f"Training {type(model).__name__} with parameters: {model_params}")
+                start_time = time.perf_counter()
+                fit_model(model, x_train, y_train, n_jobs)
+                self.training_report = {"training_mode": "full",
+                                        "training_seconds": round(time.perf_counter() - start_time, 4),
+                                        "estimated_full_refit_seconds": None}
+            logging.info(f"Model training done in {self.training_report['training_seconds']}s "
+                         f"on {x_train.dtype} features of shape {x_train.shape} with n_jobs={n_jobs}.")
+
+            # One prediction pass over the test set, kept for model evaluation
+            y_pred, probabilities = MetricsEngine.predict(model, x_test)
+            self.test_predictions = (y_pred, probabilities)
+            metric_artifact = MetricsEngine.classification_metrics(y_test, y_pred)
             return model, metric_artifact
 
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
 
+    def get_gate_accuracy(self, model: object, x_train: np.array, y_train: np.array,
+                          metric_artifact: ClassificationMetricArtifact) -> Tuple[str, float]:
+        """
+        Method Name :   get_gate_accuracy
+        Description :   This function gives the accuracy checked against expected_accuracy. The oob gate uses
+                        the out-of-bag estimate computed while fitting and falls back to the test accuracy
+                        for models without one; only the train gate runs another pass over the training data
+
+        Output      :   Returns (gate used, accuracy)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            accuracy_gate = self.model_trainer_config.accuracy_gate
+            if accuracy_gate == "oob":
+                oob_accuracy = MetricsEngine.oob_accuracy(model, y_train)
+                if oob_accuracy is not None:
+                    return "oob", oob_accuracy
+                logging.info(f"{type(model).__name__} has no out-of-bag estimate, gating on the test accuracy")
+                accuracy_gate = "test"
+            if accuracy_gate == "test":
+                return "test", metric_artifact.accuracy_score
+            y_train_pred, _ = MetricsEngine.predict(model, x_train)
+            return "train", MetricsEngine.classification_metrics(y_train, y_train_pred).accuracy_score
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
     def initiate_model_trainer(self) -> ModelTrainerArtifact:
         logging.info("Entered initiate_model_trainer method of ModelTrainer class")
         """
@@ -100,44 +263,67 @@ class ModelTrainer:
                 "------------------------------------------------------------------------------------------------"
             )
             print("Starting Model Trainer Component")
-            # Load transformed train and test data
-            train_arr = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_train_file_path
-            )
-            test_arr = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_test_file_path
+            # Memory-map transformed train and test data, pages are shared with other readers
+            if self.data_resampling_artifact is not None:
+                x_train, y_train = load_features_target(
+                    self.data_resampling_artifact.resampled_train_file_path,
+                    self.data_resampling_artifact.resampled_train_target_file_path,
+                    mmap_mode="r",
+                )
+            else:
+                x_train, y_train = load_features_target(
+                    self.data_transformation_artifact.transformed_train_file_path,
+                    self.data_transformation_artifact.transformed_train_target_file_path,
+                    mmap_mode="r",
+                )
+            x_test, y_test = load_features_target(
+                self.data_transformation_artifact.transformed_test_file_path,
+                self.data_transformation_artifact.transformed_test_target_file_path,
+                mmap_mode="r",
             )
             logging.info("train-test data loaded")
 
-            # Train model and get metrics
-            trained_model, metric_artifact = self.get_model_object_and_report(
-                train=train_arr, test=test_arr
-            )
-            logging.info("Model object and artifact loaded.")
-
             # Load preprocessing object
             preprocessing_obj = load_object(
                 file_path=self.data_transformation_artifact.transformed_object_file_path
             )
             logging.info("Preprocessing obj loaded.")
 
+            production_forest = None
+            if self.model_trainer_config.incremental_mode:
+                production_forest = self.get_production_forest(preprocessing_obj)
+                if production_forest is None:
+                    logging.info("Incremental mode falls back to a full refit")
+
+            # Train model and get metrics
+            trained_model, metric_artifact = self.get_model_object_and_report(
+                train=(x_train, y_train), test=(x_test, y_test), production_forest=production_forest,
+                categorical_features=get_categorical_features(self.model_trainer_config.model_backend,
+                                                              preprocessing_obj, x_train),
+            )
+            logging.info("Model object and artifact loaded.")
+            MetricsEngine.save_predictions(self.model_trainer_config.test_predictions_file_path,
+                                           *self.test_predictions)
+
             # Check if the model's accuracy meets the expected threshold
-            if (
-                accuracy_score(
-                    train_arr[:, -1], trained_model.predict(train_arr[:, :-1])
-                )
-                < self.model_trainer_config.expected_accuracy
-            ):
+            accuracy_gate, gate_accuracy = self.get_gate_accuracy(trained_model, x_train, y_train, metric_artifact)
+            logging.info(f"Accuracy of the {accuracy_gate} gate: {gate_accuracy}")
+            if gate_accuracy < self.model_trainer_config.expected_accuracy:
                 logging.info("No model found with score above the base score")
                 raise Exception("No model found with score above the base score")
 
-            # Save the final model object that includes both preprocessing and the trained model
+            # Save the final model object that includes both preprocessing and the trained model.
+            # n_jobs is cleared so predictions follow the joblib settings of whoever loads the model
+            if "n_jobs" in trained_model.get_params():
+                trained_model.set_params(n_jobs=None)
             logging.info("Saving new model as performace is better than previous one.")
             my_model = MyModel(
                 preprocessing_object=preprocessing_obj,
                 trained_model_object=trained_model,
             )
-            save_object(self.model_trainer_config.trained_model_file_path, my_model)
+            save_object(self.model_trainer_config.trained_model_file_path, my_model,
+                        codec=self.model_trainer_config.artifact_codec,
+                        level=self.model_trainer_config.artifact_codec_level)
             logging.info(
                 "Saved final model object that includes both preprocessing and the trained model"
             )
@@ -146,6 +332,12 @@ class ModelTrainer:
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
                 metric_artifact=metric_artifact,
+                best_params=self.model_tuner_artifact.best_params if self.model_tuner_artifact is not None else None,
+                model_backend=self.model_trainer_config.model_backend,
+                **self.training_report,
+                test_predictions_file_path=self.model_trainer_config.test_predictions_file_path,
+                accuracy_gate=accuracy_gate,
+                gate_accuracy=gate_accuracy,
             )
             logging.info(f"Model trainer artifact: {model_trainer_artifact}")
             return model_trainer_artifact
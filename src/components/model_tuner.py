@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import math
+import multiprocessing
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterSampler, train_test_split
+from threadpoolctl import threadpool_limits
+
+from src.components.model_trainer import ModelTrainer
+from src.entity.config_entity import ModelTunerConfig, ModelTrainerConfig
+from src.entity.artifact_entity import DataTransformationArtifact, ModelTunerArtifact
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+from src.utils.main_utils import load_features_target, load_object, read_yaml_file
+from src.utils.model_backend import build_model, fit_model, get_categorical_features
+from src.utils.resource_governor import ResourceGovernor
+
+SEARCH_METHODS = ("successive_halving", "random")
+
+# per worker process state, set once by _init_worker so trials only carry their parameters
+_WORKER_DATA: Dict[str, object] = {}
+
+
+def _init_worker(features_file_path: str, target_file_path: Optional[str], validation_split: float,
+                 random_state: int, scoring: str, backend: str, base_params: dict,
+                 categorical_features: Optional[np.ndarray], blas_threads: int) -> None:
+    """
+    Memory-maps the training data in a worker process. Every worker maps the same file, so the data
+    is shared through the page cache instead of being pickled to each process.
+    """
+    threadpool_limits(limits=blas_threads, user_api="blas")
+    x, y = load_features_target(features_file_path, target_file_path, mmap_mode="r")
+    fit_index, validation_index = train_test_split(np.arange(len(y)), test_size=validation_split,
+                                                   stratify=np.asarray(y), random_state=random_state)
+    # shuffled once, so the rows of a smaller rung are always a subset of the rows of a larger one
+    fit_index = np.random.default_rng(random_state).permutation(fit_index)
+    _WORKER_DATA.update(x=x, y=y, fit_index=fit_index, x_validation=x[np.sort(validation_index)],
+                        y_validation=y[np.sort(validation_index)], scorer=get_scorer(scoring),
+                        backend=backend, base_params=base_params, categorical_features=categorical_features,
+                        random_state=random_state)
+
+
+def _run_trial(params: dict, n_rows: int) -> Tuple[float, float]:
+    """Fits one candidate on the first n_rows of the shuffled fit rows and scores it on the validation rows."""
+    start_time = time.perf_counter()
+    rows = np.sort(_WORKER_DATA["fit_index"][:n_rows])
+    model = build_model(_WORKER_DATA["backend"],
+                        {**_WORKER_DATA["base_params"], **params, "random_state": _WORKER_DATA["random_state"]},
+                        _WORKER_DATA["categorical_features"])
+    if "oob_score" in model.get_params():
+        model.set_params(oob_score=False)
+    fit_model(model, _WORKER_DATA["x"][rows], _WORKER_DATA["y"][rows], n_jobs=1)
+    score = float(_WORKER_DATA["scorer"](model, _WORKER_DATA["x_validation"], _WORKER_DATA["y_validation"]))
+    return score, time.perf_counter() - start_time
+
+
+class ModelTuner:
+    def __init__(
+        self,
+        data_transformation_artifact: DataTransformationArtifact,
+        model_tuner_config: ModelTunerConfig,
+        model_trainer_config: ModelTrainerConfig,
+    ):
+        """
+        :param data_transformation_artifact: Output reference of data transformation artifact stage
+        :param model_tuner_config: Configuration for the hyperparameter search
+        :param model_trainer_config: Configuration for model training, gives the parameters not searched
+        """
+        try:
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_tuner_config = model_tuner_config
+            self.model_trainer_config = model_trainer_config
+            self._model_config = read_yaml_file(file_path=model_tuner_config.model_config_file_path)
+            self.search_config = self._model_config.get("search", {})
+            if self.search_config.get("method", "successive_halving") not in SEARCH_METHODS:
+                raise ValueError(f"Unknown search method [{self.search_config.get('method')}], "
+                                 f"expected one of {SEARCH_METHODS}")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def sample_candidates(self) -> List[dict]:
+        """
+        Method Name :   sample_candidates
+        Description :   This method samples n_candidates parameter combinations from the model.yaml search space
+                        of the configured model backend
+
+        Output      :   Returns the list of candidate parameters
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            search_space = self._model_config["search_space"][self.model_trainer_config.model_backend]
+            n_combinations = math.prod(len(values) for values in search_space.values())
+            n_candidates = min(self.search_config.get("n_candidates", 16), n_combinations)
+            return list(ParameterSampler(search_space, n_iter=n_candidates,
+                                         random_state=self.model_tuner_config.random_state))
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def get_rungs(self, n_candidates: int, n_rows: int) -> List[Tuple[int, int]]:
+        """
+        Method Name :   get_rungs
+        Description :   This method plans the successive halving schedule. Every rung keeps the best
+                        1/factor of the candidates and gives them factor times more training rows,
+                        so candidates that cannot win are stopped on a small sample of the data
+
+        Output      :   Returns (number of candidates, training rows) for each rung
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.search_config.get("method", "successive_halving") == "random":
+                return [(n_candidates, n_rows)]
+            factor = self.search_config.get("factor", 3)
+            min_resources = self.search_config.get("min_resources", 500)
+            n_rungs = 1 + max(0, math.ceil(math.log(max(n_candidates, 1), factor)))
+            # fewer rungs when the smallest one would drop below min_resources
+            while n_rungs > 1 and n_rows / factor ** (n_rungs - 1) < min_resources:
+                n_rungs -= 1
+            rungs = []
+            for rung in range(n_rungs):
+                rungs.append((max(1, math.ceil(n_candidates / factor ** rung)),
+                              int(n_rows / factor ** (n_rungs - 1 - rung))))
+            return rungs
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def initiate_model_tuner(self) -> ModelTunerArtifact:
+        """
+        Method Name :   initiate_model_tuner
+        Description :   This method runs the search on a process pool owned by the tuner. The time budget
+                        is a hard limit: when it runs out the pool is terminated, killing the workers of
+                        running trials and dropping the queued ones, and the best finished candidate is kept
+
+        Output      :   Returns model tuner artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            logging.info("Entered initiate_model_tuner method of ModelTuner class")
+            config = self.model_tuner_config
+            if not config.enabled:
+                logging.info("Model tuner disabled, the model trainer keeps its configured parameters")
+                return ModelTunerArtifact(best_params={}, best_score=None, n_trials=0, search_seconds=0.0,
+                                          search_report_file_path=None)
+
+            x, y = load_features_target(self.data_transformation_artifact.transformed_train_file_path,
+                                        self.data_transformation_artifact.transformed_train_target_file_path,
+                                        mmap_mode="r")
+            n_fit_rows = len(y) - math.ceil(len(y) * config.validation_split)
+            candidates = self.sample_candidates()
+            rungs = self.get_rungs(len(candidates), n_fit_rows)
+            max_workers = ResourceGovernor.n_jobs(config.max_workers)
+            logging.info(f"Searching {len(candidates)} candidates in rungs (candidates, rows): {rungs} "
+                         f"on {max_workers} workers with a budget of {config.time_budget_seconds}s")
+
+            backend = self.model_trainer_config.model_backend
+            base_params = ModelTrainer.get_model_params(self.model_trainer_config)
+            categorical_features = None
+            if backend == "hist_gradient_boosting":
+                categorical_features = get_categorical_features(
+                    backend, load_object(self.data_transformation_artifact.transformed_object_file_path), x)
+            start_time = time.perf_counter()
+            deadline = start_time + config.time_budget_seconds
+            trials = []
+            survivors = list(range(len(candidates)))
+            best = None
+            out_of_budget = False
+            finished = False
+            pool = multiprocessing.get_context(config.mp_start_method).Pool(
+                processes=max_workers,
+                initializer=_init_worker,
+                initargs=(self.data_transformation_artifact.transformed_train_file_path,
+                          self.data_transformation_artifact.transformed_train_target_file_path,
+                          config.validation_split, config.random_state,
+                          self.search_config.get("scoring", "f1"), backend, base_params, categorical_features,
+                          ResourceGovernor.blas_threads()),
+            )
+            try:
+                for rung, (n_keep, n_rows) in enumerate(rungs):
+                    survivors = survivors[:n_keep]
+                    results = queue.Queue()
+                    for index in survivors:
+                        pool.apply_async(_run_trial, (candidates[index], n_rows),
+                                         callback=lambda result, index=index: results.put((index, result, None)),
+                                         error_callback=lambda error, index=index: results.put((index, None, error)))
+                    scores = {}
+                    while len(scores) < len(survivors):
+                        try:
+                            index, result, error = results.get(timeout=max(0.0, deadline - time.perf_counter()))
+                        except queue.Empty:
+                            out_of_budget = True
+                            break
+                        if error is not None:
+                            raise error
+                        score, seconds = result
+                        scores[index] = score
+                        trials.append({"rung": rung, "rows": n_rows, "params": candidates[index],
+                                       "score": score, "seconds": round(seconds, 4)})
+                    survivors = sorted(scores, key=scores.get, reverse=True)
+                    if survivors:
+                        best = (survivors[0], scores[survivors[0]], n_rows)
+                    logging.info(f"Rung {rung}: {len(scores)} trials on {n_rows} rows, "
+                                 f"best score {scores[survivors[0]] if survivors else None}")
+                    if out_of_budget:
+                        logging.warning(f"Search time budget of {config.time_budget_seconds}s used up in rung {rung}")
+                        break
+                finished = not out_of_budget
+            finally:
+                # past the budget, or on a failed trial, the running trials are killed instead of awaited
+                if finished:
+                    pool.close()
+                else:
+                    pool.terminate()
+                pool.join()
+            search_seconds = time.perf_counter() - start_time
+
+            best_params = candidates[best[0]] if best is not None else {}
+            best_score = best[1] if best is not None else None
+            logging.info(f"Best parameters {best_params} with score {best_score} after {len(trials)} trials "
+                         f"in {search_seconds:.3f}s")
+
+            os.makedirs(os.path.dirname(config.search_report_file_path), exist_ok=True)
+            with open(config.search_report_file_path, "w") as report_file:
+                json.dump({"method": self.search_config.get("method", "successive_halving"),
+                           "model_backend": backend, "rungs": rungs,
+                           "out_of_budget": out_of_budget, "search_seconds": round(search_seconds, 4),
+                           "best_params": best_params, "best_score": best_score,
+                           "best_rows": best[2] if best is not None else None, "trials": trials},
+                          report_file, indent=4)
+
+            model_tuner_artifact = ModelTunerArtifact(
+                best_params=best_params,
+                best_score=best_score,
+                n_trials=len(trials),
+                search_seconds=round(search_seconds, 4),
+                search_report_file_path=config.search_report_file_path,
+            )
+            logging.info(f"Model tuner artifact: {model_tuner_artifact}")
+            return model_tuner_artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
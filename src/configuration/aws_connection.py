@@ -1,37 +1,103 @@
 import boto3
 import os
+from botocore.config import Config
 from src.constants.constant import AWS_SECRET_ACCESS_KEY_ENV_KEY, AWS_ACCESS_KEY_ID_ENV_KEY, REGION_NAME
+from src.entity.config_entity import S3TransferConfig
 from dotenv import load_dotenv
+from typing import Tuple
 
 load_dotenv()
 
+
+def get_aws_credentials() -> Tuple[str, str]:
+    """
+    Access key id and secret access key from the environment, shared by the sync and async clients
+    and raise exception when environment variable is not set.
+    """
+    access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
+    secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+    if access_key_id is None:
+        raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not not set.")
+    if secret_access_key is None:
+        raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set.")
+    return access_key_id, secret_access_key
+
+
+def get_client_config(s3_transfer_config: S3TransferConfig) -> Config:
+    """botocore settings of the connection pool and the retries, shared by the sync and async clients"""
+    return Config(
+        max_pool_connections=s3_transfer_config.max_pool_connections,
+        retries={"max_attempts": s3_transfer_config.max_attempts, "mode": s3_transfer_config.retry_mode},
+    )
+
+
 class S3Client:
 
     s3_client=None
     s3_resource = None
-    def __init__(self, region_name=REGION_NAME):
-        """ 
-        This Class gets aws credentials from env_variable and creates an connection with s3 bucket 
-        and raise exception when environment variable is not set
+    def __init__(self, region_name=REGION_NAME, s3_transfer_config: S3TransferConfig = None):
+        """
+        This Class gets aws credentials from env_variable and creates an connection with s3 bucket
+        and raise exception when environment variable is not set.
+        The client is shared by the whole process, its connection pool is sized for the concurrent
+        transfers of s3_transfer_config and failed requests are retried with backoff by botocore
         """
 
         if S3Client.s3_resource==None or S3Client.s3_client==None:
-            __access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-            __secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-            if __access_key_id is None:
-                raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not not set.")
-            if __secret_access_key is None:
-                raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set.")
-        
+            __access_key_id, __secret_access_key = get_aws_credentials()
+
+            s3_transfer_config = s3_transfer_config or S3TransferConfig()
+            client_config = get_client_config(s3_transfer_config)
+
             S3Client.s3_resource = boto3.resource('s3',
                                             aws_access_key_id=__access_key_id,
                                             aws_secret_access_key=__secret_access_key,
-                                            region_name=region_name
+                                            region_name=region_name,
+                                            endpoint_url=s3_transfer_config.endpoint_url,
+                                            config=client_config
                                             )
             S3Client.s3_client = boto3.client('s3',
                                         aws_access_key_id=__access_key_id,
                                         aws_secret_access_key=__secret_access_key,
-                                        region_name=region_name
+                                        region_name=region_name,
+                                        endpoint_url=s3_transfer_config.endpoint_url,
+                                        config=client_config
                                         )
         self.s3_resource = S3Client.s3_resource
-        self.s3_client = S3Client.s3_client
\ No newline at end of file
+        self.s3_client = S3Client.s3_client
+
+
+class AsyncS3Client:
+    """
+    asyncio counterpart of S3Client on aiobotocore, with the same credentials, endpoint, connection
+    pool and retry settings. The client is opened and closed with the instance, as an async context
+    manager, e.g. for the lifetime of the serving app. aiobotocore is an optional dependency of the
+    serving path only.
+    """
+
+    def __init__(self, region_name=REGION_NAME, s3_transfer_config: S3TransferConfig = None):
+        self.region_name = region_name
+        self.s3_transfer_config = s3_transfer_config or S3TransferConfig()
+        self.s3_client = None
+        self._client_context = None
+
+    async def __aenter__(self):
+        try:
+            from aiobotocore.session import get_session
+        except ImportError as e:
+            raise ImportError("Async S3 access needs the optional aiobotocore package (pip install aiobotocore)") from e
+        access_key_id, secret_access_key = get_aws_credentials()
+        self._client_context = get_session().create_client(
+            's3',
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=self.region_name,
+            endpoint_url=self.s3_transfer_config.endpoint_url,
+            config=get_client_config(self.s3_transfer_config),
+        )
+        self.s3_client = await self._client_context.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._client_context.__aexit__(exc_type, exc_value, traceback)
+        self.s3_client = None
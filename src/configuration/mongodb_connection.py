@@ -1,17 +1,183 @@
 import os
 import sys
+import threading
+from collections import deque
+from importlib.util import find_spec
+
+import numpy as np
 import pymongo
 import certifi
+from pymongo import ReadPreference, monitoring
 from dotenv import load_dotenv
 load_dotenv()
 
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
 from src.constants.constant import DATABASE_NAME, MONGODB_URL_KEY
+from src.entity.config_entity import MongoDBConfig
 
 # Load the certificate authority file to avoid timeout errors when connecting to MongoDB
 ca = certifi.where()
 
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+# module each wire protocol compressor of pymongo needs, zlib is in the standard library
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def get_read_preference(name: str):
+    """pymongo read preference of a mode name, e.g. secondaryPreferred"""
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference {name}, expected one of {list(READ_PREFERENCES)}")
+    return READ_PREFERENCES[name]
+
+
+def get_available_compressors(compressors: str) -> list:
+    """
+    Compressors of a comma separated list whose library is installed, in the same order
+    compressors: e.g. "zstd,snappy,zlib", the server picks the first one it supports too
+    """
+    available = []
+    for compressor in filter(None, (name.strip() for name in compressors.split(","))):
+        if compressor not in COMPRESSOR_MODULES:
+            raise ValueError(f"Unknown compressor {compressor}, expected one of {list(COMPRESSOR_MODULES)}")
+        if find_spec(COMPRESSOR_MODULES[compressor]) is None:
+            logging.info(f"MongoDB compressor {compressor} skipped, {COMPRESSOR_MODULES[compressor]} is not installed")
+            continue
+        available.append(compressor)
+    return available
+
+
+def get_client_options(mongodb_config: MongoDBConfig) -> dict:
+    """keyword arguments of pymongo.MongoClient for the pool, compression, timeouts, retries and read preference"""
+    options = {
+        "maxPoolSize": mongodb_config.max_pool_size,
+        "minPoolSize": mongodb_config.min_pool_size,
+        "maxIdleTimeMS": mongodb_config.max_idle_time_ms,
+        "waitQueueTimeoutMS": mongodb_config.wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": mongodb_config.server_selection_timeout_ms,
+        "connectTimeoutMS": mongodb_config.connect_timeout_ms,
+        "socketTimeoutMS": mongodb_config.socket_timeout_ms,
+        "retryReads": mongodb_config.retry_reads,
+        "retryWrites": mongodb_config.retry_writes,
+        "read_preference": get_read_preference(mongodb_config.read_preference),
+    }
+    compressors = get_available_compressors(mongodb_config.compressors)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = mongodb_config.zlib_compression_level
+    return options
+
+
+class MongoDBStats(monitoring.ConnectionPoolListener, monitoring.CommandListener):
+    """
+    Connection pool and command statistics of the shared client, gathered from pymongo monitoring
+    events: connections opened and checked out, checkout waits and failures, and command latencies
+    by command name with percentiles over the most recent commands.
+    """
+
+    def __init__(self, latency_samples: int = 1024):
+        self._lock = threading.Lock()
+        self.latency_samples = latency_samples
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.checkout_failures = 0
+            self.checkout_wait_seconds = 0.0
+            self.max_checkout_wait_seconds = 0.0
+            self.commands = {}
+            self.latencies = deque(maxlen=self.latency_samples)
+
+    def snapshot(self) -> dict:
+        """Current statistics, waits and latencies in milliseconds."""
+        with self._lock:
+            latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+            return {
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_checked_out": self.checkouts - self.checkins,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "mean_checkout_wait_ms": 1000 * self.checkout_wait_seconds / max(self.checkouts, 1),
+                "max_checkout_wait_ms": 1000 * self.max_checkout_wait_seconds,
+                "p50_command_ms": float(np.percentile(latencies, 50)),
+                "p99_command_ms": float(np.percentile(latencies, 99)),
+                "commands": {name: {"count": count, "failures": failures, "mean_ms": total_ms / max(count, 1),
+                                    "max_ms": max_ms}
+                             for name, (count, failures, total_ms, max_ms) in self.commands.items()},
+            }
+
+    def _record_command(self, event, failed: bool) -> None:
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            count, failures, total_ms, max_ms = self.commands.get(event.command_name, (0, 0, 0.0, 0.0))
+            self.commands[event.command_name] = (count + 1, failures + failed, total_ms + duration_ms,
+                                                 max(max_ms, duration_ms))
+            self.latencies.append(duration_ms)
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self._record_command(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._record_command(event, failed=True)
+
+    def connection_checked_out(self, event) -> None:
+        # duration, the wait for the connection, is reported from pymongo 4.7 on
+        wait_seconds = getattr(event, "duration", None) or 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds += wait_seconds
+            self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, wait_seconds)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+
 class MongoDBClient:
     """
     MongoDBClient is responsible for establishing a connection to the MongoDB database.
@@ -19,7 +185,9 @@ class MongoDBClient:
     Attributes:
     ----------
     client : MongoClient
-        A shared MongoClient instance for the class.
+        A shared MongoClient instance for the class, whose connection pool every module reuses.
+    stats : MongoDBStats
+        Connection checkout and command latency statistics of the shared client.
     database : Database
         The specific database instance that MongoDBClient connects to.
 
@@ -30,8 +198,10 @@ class MongoDBClient:
     """
 
     client = None  # Shared MongoClient instance across all MongoDBClient instances
+    stats = None  # MongoDBStats of the shared client
+    mongodb_config = None  # MongoDBConfig the shared client was created with
 
-    def __init__(self, database_name: str = DATABASE_NAME) -> None:
+    def __init__(self, database_name: str = DATABASE_NAME, mongodb_config: MongoDBConfig = None) -> None:
         """
         Initializes a connection to the MongoDB database. If no existing connection is found, it establishes a new one.
 
@@ -39,6 +209,9 @@ class MongoDBClient:
         ----------
         database_name : str, optional
             Name of the MongoDB database to connect to. Default is set by DATABASE_NAME constant.
+        mongodb_config : MongoDBConfig, optional
+            Pool, compression, timeout, retry and read preference settings of the shared client, used when
+            the client is created by this call.
 
         Raises:
         ------
@@ -52,8 +225,13 @@ class MongoDBClient:
                 if mongo_db_url is None:
                     raise Exception(f"Environment variable '{MONGODB_URL_KEY}' is not set.")
 
-                # Establish a new MongoDB client connection
-                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca)
+                # Establish a new MongoDB client connection, monitored by the stats listener
+                MongoDBClient.mongodb_config = mongodb_config or MongoDBConfig()
+                MongoDBClient.stats = MongoDBStats(latency_samples=MongoDBClient.mongodb_config.latency_samples)
+                client_options = get_client_options(MongoDBClient.mongodb_config)
+                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca,
+                                                           event_listeners=[MongoDBClient.stats], **client_options)
+                logging.info(f"MongoDB client created with {client_options}")
 
             # Use the shared MongoClient for this instance
             self.client = MongoDBClient.client
@@ -63,3 +241,13 @@ class MongoDBClient:
 
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
+
+    @staticmethod
+    def get_stats() -> dict:
+        """Connection checkout and command latency statistics of the shared client, empty before it exists."""
+        return MongoDBClient.stats.snapshot() if MongoDBClient.stats is not None else {}
+
+    @staticmethod
+    def get_export_read_preference():
+        """Read preference of bulk exports, secondaries when there are any by default."""
+        return get_read_preference((MongoDBClient.mongodb_config or MongoDBConfig()).export_read_preference)
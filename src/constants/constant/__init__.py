@@ -11,6 +11,20 @@ load_dotenv()
 DATABASE_NAME = "vehicle"
 COLLECTION_NAME = "vehicleInsurance"
 MONGODB_URL_KEY = os.getenv("MONGODB_URL_KEY")
+MONGODB_MAX_POOL_SIZE: int = 50
+MONGODB_MIN_POOL_SIZE: int = 0
+MONGODB_MAX_IDLE_TIME_MS: int = 5 * 60 * 1000
+MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 30_000  # wait for a free pooled connection before failing
+MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"  # in order of preference, the ones whose library is missing are skipped
+MONGODB_ZLIB_COMPRESSION_LEVEL: int = 6
+MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30_000
+MONGODB_CONNECT_TIMEOUT_MS: int = 20_000
+MONGODB_SOCKET_TIMEOUT_MS: int = 0  # 0 waits indefinitely for long exports
+MONGODB_RETRY_READS: bool = True
+MONGODB_RETRY_WRITES: bool = True
+MONGODB_READ_PREFERENCE: str = "primary"
+MONGODB_EXPORT_READ_PREFERENCE: str = "secondaryPreferred"  # bulk exports read from secondaries when there are any
+MONGODB_LATENCY_SAMPLES: int = 1024  # recent command latencies kept for the percentiles of the client stats
 
 # Pipeline related constant start with PIPELINE
 TARGET_COLUMN = "outcome"
@@ -23,14 +37,42 @@ TEST_FILE_NAME: str = "test.csv"
 
 # Model related constant start with MODEL
 SCHEMA_FILE_PATH = os.path.join("schema", "schema.yaml")
+SCHEMA_READ_CHUNK_SIZE: int = 500_000
 MODEL_FILE_NAME = "model.pkl"
 SAVED_MODEL_DIR = os.path.join("saved_models")
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
+ARTIFACT_CODEC: str = "zstd"  # compression of pickled models and preprocessing objects: none, zstd, lz4 or gzip
+ARTIFACT_CODEC_LEVEL: int = 3
 
 # AWS related constant start with AWS
 AWS_ACCESS_KEY_ID_ENV_KEY = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY_ENV_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 REGION_NAME = "us-east-1"
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. a local S3 stand-in such as MinIO or moto_server
+S3_MAX_POOL_CONNECTIONS: int = 32
+S3_MAX_ATTEMPTS: int = 5
+S3_RETRY_MODE: str = "standard"
+S3_RETRY_BACKOFF_SECONDS: float = 0.2
+S3_MULTIPART_THRESHOLD_BYTES: int = 8 * 1024 * 1024
+S3_MULTIPART_CHUNK_SIZE_BYTES: int = 8 * 1024 * 1024
+S3_MAX_CONCURRENCY: int = 10
+S3_RANGED_GET_THRESHOLD_BYTES: int = 16 * 1024 * 1024
+S3_RANGED_GET_CHUNK_SIZE_BYTES: int = 8 * 1024 * 1024
+S3_METADATA_TTL_SECONDS: float = 30.0
+S3_BATCH_LIST_MIN_KEYS: int = 20  # keys under one prefix from which a listing is cheaper than HEAD requests
+S3_STREAM_CHUNK_ROWS: int = 100_000  # rows parsed / serialized at a time by the streaming DataFrame reader and writer
+
+"""
+Data Loader related constant start with DATA_LOADER VAR NAME
+"""
+DATA_LOADER_FILE_PATH: str = os.path.join("vehicle_data", "insurance_data.csv")
+DATA_LOADER_CHUNK_ROWS: int = 50_000  # rows parsed from the CSV at a time
+DATA_LOADER_BATCH_SIZE: int = 1_000  # documents per unordered insert_many
+DATA_LOADER_MAX_WORKERS: int = 4  # concurrent insert_many batches over the pooled client
+DATA_LOADER_CHECKPOINT_DIR: str = "load_checkpoints"
+DATA_LOADER_MODE: str = "upsert"  # "upsert" writes new and changed rows only, "insert" appends every row
+DATA_LOADER_KEY_FIELD: str = "id"  # unique key of the rows in upsert mode
+DATA_LOADER_ROW_HASH_FIELD: str = "_row_hash"  # hash of the row content stored with every document
 
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
@@ -47,6 +89,9 @@ Data Validation realted constant start with DATA_VALIDATION VAR NAME
 """
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_CHUNK_SIZE: int = 500_000
+DATA_VALIDATION_MAX_NULL_RATE: float = 0.2
+DATA_VALIDATION_TARGET_ROWS_PER_SECOND: int = 250_000
 
 """
 Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
@@ -54,6 +99,24 @@ Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_CHUNKED_MODE: bool = False
+DATA_TRANSFORMATION_CHUNK_SIZE: int = 500_000
+DATA_TRANSFORMATION_COLUMN_MAJOR: bool = True
+DATA_TRANSFORMATION_COMPACT_ARRAYS: bool = True
+DATA_TRANSFORMATION_FEATURE_DTYPE: str = "float32"
+DATA_TRANSFORMATION_TARGET_DTYPE: str = "uint8"
+DATA_TRANSFORMATION_TARGET_FILE_SUFFIX: str = "_target.npy"
+
+"""
+Data Resampling related constant start with DATA_RESAMPLING VAR NAME
+"""
+DATA_RESAMPLING_DIR_NAME: str = "data_resampling"
+DATA_RESAMPLING_RESAMPLED_DATA_DIR: str = "resampled"
+DATA_RESAMPLING_STRATEGY: str = "smoteenn"  # none, smote, smoteenn, random_under, random_over
+DATA_RESAMPLING_SAMPLING_STRATEGY: str = "auto"
+DATA_RESAMPLING_K_NEIGHBORS: int = 5
+DATA_RESAMPLING_N_JOBS: int = -1
+DATA_RESAMPLING_RANDOM_STATE: int = 42
 
 """
 MODEL TRAINER related constant start with MODEL_TRAINER var name
@@ -72,6 +135,35 @@ MODEL_TRAINER_MAX_FEATURES: str = 'sqrt'
 MODEL_TRAINER_BOOTSTRAP: bool = True
 MODEL_TRAINER_OOB_SCORE: bool = True
 MODEL_TRAINER_RANDOM_STATE: int = 101
+MODEL_TRAINER_N_JOBS: int = -1
+MODEL_TRAINER_INCREMENTAL_MODE: bool = False
+MODEL_TRAINER_INCREMENTAL_N_NEW_ESTIMATORS: int = 50
+MODEL_TRAINER_INCREMENTAL_MAX_ESTIMATORS: int = 150
+MODEL_TRAINER_BACKEND: str = "random_forest"
+MODEL_TRAINER_ACCURACY_GATE: str = "oob"
+MODEL_TRAINER_TEST_PREDICTIONS_FILE_NAME: str = "test_predictions.npz"
+MODEL_TRAINER_HGB_LEARNING_RATE: float = 0.1
+MODEL_TRAINER_HGB_MAX_ITER: int = 200
+MODEL_TRAINER_HGB_MAX_LEAF_NODES: int = 31
+MODEL_TRAINER_HGB_MAX_DEPTH = None
+MODEL_TRAINER_HGB_MIN_SAMPLES_LEAF: int = 20
+MODEL_TRAINER_HGB_L2_REGULARIZATION: float = 0.0
+MODEL_TRAINER_HGB_MAX_BINS: int = 255
+MODEL_TRAINER_HGB_EARLY_STOPPING: str = "auto"
+
+
+"""
+Model Tuner related constant start with MODEL_TUNER VAR NAME
+"""
+MODEL_TUNER_DIR_NAME: str = "model_tuner"
+MODEL_TUNER_REPORT_FILE_NAME: str = "search_report.json"
+MODEL_TUNER_ENABLED: bool = True
+MODEL_TUNER_TIME_BUDGET_SECONDS: float = 300.0  # hard budget, trials still running when it ends are killed
+MODEL_TUNER_MAX_WORKERS: int = max(1, os.cpu_count() or 1)
+MODEL_TUNER_VALIDATION_SPLIT: float = 0.2
+MODEL_TUNER_RANDOM_STATE: int = 101
+# the search runs inside a pipeline worker thread, forking a threaded process can deadlock the children
+MODEL_TUNER_MP_START_METHOD: str = "forkserver"
 
 
 """
@@ -79,11 +171,70 @@ MODEL Evaluation related constants
 """
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = "insurance-claim-prediction"
+MODEL_EVALUATION_MODEL_CACHE_DIR: str = "model_cache"
+MODEL_EVALUATION_MAX_SINGLE_ROW_P99_MS: float = 50.0
+MODEL_EVALUATION_MAX_BATCH_MS: float = 500.0
+MODEL_EVALUATION_MAX_MODEL_SIZE_MB: float = 100.0
+MODEL_EVALUATION_MAX_MEMORY_MB: float = 250.0
+MODEL_EVALUATION_MAX_LATENCY_RATIO: float = 1.5
+MODEL_EVALUATION_SINGLE_ROW_SAMPLES: int = 100
+MODEL_EVALUATION_BATCH_SIZE: int = 1000
+MODEL_EVALUATION_BATCH_REPEATS: int = 5
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_PUSHER_PUSH_ARTIFACTS: bool = True
+MODEL_PUSHER_ARTIFACTS_S3_PREFIX: str = "artifacts"
+
+
+"""
+Model Registry related constant start with MODEL_REGISTRY VAR NAME
+"""
+MODEL_REGISTRY_MANIFEST_FILE_NAME: str = "manifest.json"
+MODEL_REGISTRY_VERSIONS_DIR: str = "versions"
+MODEL_REGISTRY_MANIFEST_MAX_RETRIES: int = 5  # attempts of a manifest update losing the race to a concurrent one
+MODEL_REGISTRY_CACHE_MAX_VERSIONS: int = 5
+MODEL_REGISTRY_CACHE_MAX_SIZE_BYTES: int = 1024 * 1024 * 1024  # 1 GB
+MODEL_REGISTRY_KEEP_VERSIONS: int = 5  # past production versions kept for rollbacks by the garbage collection
+MODEL_REGISTRY_GC_GRACE_SECONDS: float = 3600.0  # age before an object missing from the manifest is collected
+MODEL_REGISTRY_LEGACY_MODEL_KEY: str = MODEL_FILE_NAME  # model object of the releases before the registry
+
+
+"""
+Storage Backend related constant start with STORAGE VAR NAME
+"""
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "s3")  # "s3", "local" (e.g. node-local SSD) or "memory"
+STORAGE_LOCAL_ROOT_DIR: str = os.getenv("STORAGE_LOCAL_ROOT_DIR", "local_storage")  # one sub-directory per bucket
+
+
+"""
+Stage Cache related constant start with STAGE_CACHE VAR NAME
+"""
+STAGE_CACHE_ENABLED: bool = True
+STAGE_CACHE_DIR: str = "artifact_cache"
+STAGE_CACHE_MAX_SIZE_BYTES: int = 2 * 1024 * 1024 * 1024  # 2 GB
+STAGE_CACHE_REPORT_FILE_NAME: str = "stage_cache_report.json"
+
+
+"""
+Pipeline Executor related constant start with PIPELINE_EXECUTOR VAR NAME
+"""
+PIPELINE_EXECUTOR_MAX_WORKERS: int = max(1, min(4, os.cpu_count() or 1))
+PIPELINE_EXECUTOR_TIMINGS_FILE_NAME: str = "task_timings.json"
+
+
+"""
+Resource Governor related constant start with RESOURCE_GOVERNOR VAR NAME
+"""
+RESOURCE_GOVERNOR_TOTAL_CORES: int = os.cpu_count() or 1
+RESOURCE_GOVERNOR_RESERVED_CORES: int = 1  # kept free for the serving app running next to the pipeline
+RESOURCE_GOVERNOR_BLAS_THREADS: int = 1
+RESOURCE_GOVERNOR_REPORT_FILE_NAME: str = "resource_report.json"
 
 
 """
 APP related constants
 """
 APP_HOST = "0.0.0.0"
-APP_PORT = 5000
\ No newline at end of file
+APP_PORT = 5000
+APP_MODEL_REFRESH_ENABLED: bool = True  # follow the production model from the event loop, needs aiobotocore
+APP_MODEL_REFRESH_INTERVAL_SECONDS: float = 30.0
+APP_MODEL_DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
\ No newline at end of file
@@ -2,11 +2,13 @@ import sys
 import pandas as pd
 import numpy as np
 from typing import Optional
+from pymongo.errors import OperationFailure
 
 from src.configuration.mongodb_connection import MongoDBClient
-from src.constants.constant import DATABASE_NAME
+from src.constants.constant import DATABASE_NAME, DATA_LOADER_ROW_HASH_FIELD
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
+from src.utils.schema_compiler import SchemaCompiler
 
 
 class FetchData:
@@ -23,6 +25,57 @@ class FetchData:
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
+    def get_collection_fingerprint(self, collection_name: str, database_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Returns a fingerprint of the contents of a MongoDB collection, used to tell whether it changed since the
+        last export.
+
+        The server side `dbHash` command is used when available. It is not on shared Atlas tiers, there the
+        row hashes push_data.py stores on every document are summed instead, so an in-place update changes
+        the fingerprint too. When some documents carry no row hash the contents cannot be fingerprinted and
+        None is returned. It is read with the read preference of the export, so both see the same member.
+
+        Parameters:
+        ----------
+        collection_name : str
+            The name of the MongoDB collection.
+        database_name : Optional[str]
+            Name of the database (optional). Defaults to DATABASE_NAME.
+
+        Returns:
+        -------
+        Optional[dict]
+            Fingerprint of the collection contents, None when there is none.
+        """
+        try:
+            read_preference = MongoDBClient.get_export_read_preference()
+            if database_name is None:
+                database = self.mongo_client.database
+            else:
+                database = self.mongo_client.client[database_name]
+            database = database.with_options(read_preference=read_preference)
+            collection = database[collection_name]
+
+            try:
+                db_hash = database.command("dbHash", collections=[collection_name], read_preference=read_preference)
+                return {"collection": collection_name, "md5": db_hash["collections"].get(collection_name)}
+            except OperationFailure as e:
+                logging.info(f"dbHash not available ({e}), falling back to the row hashes of the documents")
+
+            # order independent: the sum of the 64 bit row hashes, only the hashes are sent back
+            count, hash_sum = 0, 0
+            for document in collection.find({}, projection={DATA_LOADER_ROW_HASH_FIELD: 1, "_id": 0}):
+                row_hash = document.get(DATA_LOADER_ROW_HASH_FIELD)
+                if row_hash is None:
+                    logging.warning(f"Documents of {collection_name} without {DATA_LOADER_ROW_HASH_FIELD}, "
+                                    f"its contents cannot be fingerprinted")
+                    return None
+                count += 1
+                hash_sum = (hash_sum + int(row_hash, 16)) % 2 ** 64
+            return {"collection": collection_name, "count": count, "row_hash_sum": format(hash_sum, "016x")}
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
     def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
         """
         Exports an entire MongoDB collection as a pandas DataFrame.
@@ -37,22 +90,32 @@ class FetchData:
         Returns:
         -------
         pd.DataFrame
-            DataFrame containing the collection data, with '_id' column removed and 'na' values replaced with NaN.
+            DataFrame containing the collection data, with '_id' column and row hash of push_data.py removed
+            and 'na' values replaced with NaN.
         """
         try:
-            # Access specified collection from the default or specified database
+            # Access specified collection from the default or specified database, on secondaries when configured
             if database_name is None:
                 collection = self.mongo_client.database[collection_name]
             else:
-                collection = self.mongo_client[database_name][collection_name]
+                collection = self.mongo_client.client[database_name][collection_name]
+            collection = collection.with_options(read_preference=MongoDBClient.get_export_read_preference())
 
             # Convert collection data to DataFrame and preprocess
             print("Fetching data from mongoDB")
-            df = pd.DataFrame(list(collection.find()))
+            df = pd.DataFrame(list(collection.find({}, projection={DATA_LOADER_ROW_HASH_FIELD: 0})))
             print(f"Data fetched with len: {len(df)}")
+            logging.info(f"MongoDB client stats after the export: {MongoDBClient.get_stats()}")
             if "_id" in df.columns.to_list():
                 df = df.drop(columns=["_id"], axis=1)
             df.replace({"na": np.nan}, inplace=True)
+
+            # cast to the compact dtypes declared in schema.yaml
+            schema_compiler = SchemaCompiler()
+            inferred_memory = schema_compiler.log_memory_usage(df, "exported collection with inferred dtypes")
+            df = schema_compiler.apply(df)
+            compact_memory = schema_compiler.log_memory_usage(df, "exported collection with schema dtypes")
+            logging.info(f"Schema dtypes reduced memory {inferred_memory / max(compact_memory, 1):.1f}x")
             return df
 
         except Exception as e:
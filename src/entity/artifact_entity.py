@@ -1,4 +1,16 @@
 from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DataLoaderArtifact:
+    rows_loaded: int
+    documents_inserted: int
+    documents_updated: int
+    documents_already_loaded: int
+    resumed_from_row: int
+    seconds: float
+    docs_per_second: float
 
 
 @dataclass
@@ -18,17 +30,49 @@ class DataTransformationArtifact:
     transformed_object_file_path:str 
     transformed_train_file_path:str
     transformed_test_file_path:str
+    # compact layout: features only in the .npy files above, target in its own narrow-dtype vector.
+    # Without target paths the target is the last column of the feature files (float64 layout)
+    feature_dtype:str = "float64"
+    target_dtype:str = "float64"
+    transformed_train_target_file_path:Optional[str] = None
+    transformed_test_target_file_path:Optional[str] = None
+
+@dataclass
+class DataResamplingArtifact:
+    strategy:str
+    resampled_train_file_path:str
+    resampled_train_target_file_path:Optional[str]
+    class_counts_before:dict
+    class_counts_after:dict
 
 @dataclass
 class ClassificationMetricArtifact:
     f1_score:float
     precision_score:float
     recall_score:float
+    accuracy_score:Optional[float] = None
+
+@dataclass
+class ModelTunerArtifact:
+    best_params:dict
+    best_score:Optional[float]
+    n_trials:int
+    search_seconds:float
+    search_report_file_path:Optional[str]
 
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path:str 
     metric_artifact:ClassificationMetricArtifact 
+    best_params:Optional[dict] = None
+    model_backend:str = "random_forest"
+    training_mode:str = "full"
+    training_seconds:Optional[float] = None
+    estimated_full_refit_seconds:Optional[float] = None   # incremental mode only, extrapolated from the new trees
+    # labels and probabilities of the test set, reused by model evaluation
+    test_predictions_file_path:Optional[str] = None
+    accuracy_gate:Optional[str] = None
+    gate_accuracy:Optional[float] = None
 
 
 @dataclass
@@ -37,10 +81,17 @@ class ModelEvaluationArtifact:
     changed_accuracy:float
     s3_model_path:str 
     trained_model_path:str
+    # serving cost of the candidate and production model, see utils.model_profiler
+    trained_model_profile:Optional[dict] = None
+    production_model_profile:Optional[dict] = None
+    budget_violations:Optional[list] = None
+    production_model_version:Optional[str] = None
 
 @dataclass
 class ModelPusherArtifact:
     bucket_name:str
     s3_model_path:str
+    model_version:Optional[str] = None
+    artifacts_s3_key_path:Optional[str] = None
     
 
@@ -3,6 +3,7 @@ import os
 
 from src.constants.constant import *
 from dataclasses import dataclass
+from typing import Optional
 
 
 
@@ -17,6 +18,36 @@ class TrainingPipelineConfig:
 
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
+@dataclass
+class MongoDBConfig:
+    max_pool_size: int = MONGODB_MAX_POOL_SIZE
+    min_pool_size: int = MONGODB_MIN_POOL_SIZE
+    max_idle_time_ms: int = MONGODB_MAX_IDLE_TIME_MS
+    wait_queue_timeout_ms: int = MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    compressors: str = MONGODB_COMPRESSORS
+    zlib_compression_level: int = MONGODB_ZLIB_COMPRESSION_LEVEL
+    server_selection_timeout_ms: int = MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    connect_timeout_ms: int = MONGODB_CONNECT_TIMEOUT_MS
+    socket_timeout_ms: int = MONGODB_SOCKET_TIMEOUT_MS
+    retry_reads: bool = MONGODB_RETRY_READS
+    retry_writes: bool = MONGODB_RETRY_WRITES
+    read_preference: str = MONGODB_READ_PREFERENCE
+    export_read_preference: str = MONGODB_EXPORT_READ_PREFERENCE
+    latency_samples: int = MONGODB_LATENCY_SAMPLES
+
+@dataclass
+class DataLoaderConfig:
+    file_path: str = DATA_LOADER_FILE_PATH
+    database_name: str = DATABASE_NAME
+    collection_name: str = COLLECTION_NAME
+    chunk_rows: int = DATA_LOADER_CHUNK_ROWS
+    batch_size: int = DATA_LOADER_BATCH_SIZE
+    max_workers: int = DATA_LOADER_MAX_WORKERS
+    checkpoint_dir: str = DATA_LOADER_CHECKPOINT_DIR
+    mode: str = DATA_LOADER_MODE
+    key_field: str = DATA_LOADER_KEY_FIELD
+    row_hash_field: str = DATA_LOADER_ROW_HASH_FIELD
+
 @dataclass
 class DataIngestionConfig:
     data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
@@ -31,6 +62,9 @@ class DataIngestionConfig:
 class DataValidationConfig:
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    chunk_size: int = DATA_VALIDATION_CHUNK_SIZE
+    max_null_rate: float = DATA_VALIDATION_MAX_NULL_RATE
+    target_rows_per_second: int = DATA_VALIDATION_TARGET_ROWS_PER_SECOND
 
 
 @dataclass
@@ -42,14 +76,51 @@ class DataTransformationConfig:
                                                    TEST_FILE_NAME.replace("csv", "npy"))
     transformed_object_file_path: str = os.path.join(data_transformation_dir,
                                                      DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,PREPROCSSING_OBJECT_FILE_NAME)
+    artifact_codec: str = ARTIFACT_CODEC
+    artifact_codec_level: int = ARTIFACT_CODEC_LEVEL
+    chunked_mode: bool = DATA_TRANSFORMATION_CHUNKED_MODE
+    chunk_size: int = DATA_TRANSFORMATION_CHUNK_SIZE
+    column_major: bool = DATA_TRANSFORMATION_COLUMN_MAJOR
+    compact_arrays: bool = DATA_TRANSFORMATION_COMPACT_ARRAYS
+    feature_dtype: str = DATA_TRANSFORMATION_FEATURE_DTYPE
+    target_dtype: str = DATA_TRANSFORMATION_TARGET_DTYPE
+    transformed_train_target_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                           TRAIN_FILE_NAME.replace(".csv", DATA_TRANSFORMATION_TARGET_FILE_SUFFIX))
+    transformed_test_target_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                          TEST_FILE_NAME.replace(".csv", DATA_TRANSFORMATION_TARGET_FILE_SUFFIX))
+
+
+@dataclass
+class DataResamplingConfig:
+    data_resampling_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_RESAMPLING_DIR_NAME)
+    resampled_train_file_path: str = os.path.join(data_resampling_dir, DATA_RESAMPLING_RESAMPLED_DATA_DIR,
+                                                  TRAIN_FILE_NAME.replace("csv", "npy"))
+    resampled_train_target_file_path: str = os.path.join(data_resampling_dir, DATA_RESAMPLING_RESAMPLED_DATA_DIR,
+                                                         TRAIN_FILE_NAME.replace(".csv", DATA_TRANSFORMATION_TARGET_FILE_SUFFIX))
+    strategy: str = DATA_RESAMPLING_STRATEGY
+    sampling_strategy: str = DATA_RESAMPLING_SAMPLING_STRATEGY
+    k_neighbors: int = DATA_RESAMPLING_K_NEIGHBORS
+    n_jobs: int = DATA_RESAMPLING_N_JOBS
+    random_state: int = DATA_RESAMPLING_RANDOM_STATE
+    column_major: bool = DATA_TRANSFORMATION_COLUMN_MAJOR
 
 
 @dataclass
 class ModelTrainerConfig:
     model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
     trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    test_predictions_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TEST_PREDICTIONS_FILE_NAME)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
+    accuracy_gate: str = MODEL_TRAINER_ACCURACY_GATE   # oob, test or train
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    incremental_mode: bool = MODEL_TRAINER_INCREMENTAL_MODE
+    incremental_n_new_estimators: int = MODEL_TRAINER_INCREMENTAL_N_NEW_ESTIMATORS
+    incremental_max_estimators: int = MODEL_TRAINER_INCREMENTAL_MAX_ESTIMATORS
+    production_bucket_name: str = MODEL_BUCKET_NAME
+    production_model_registry_key: str = MODEL_PUSHER_S3_KEY
+    model_backend: str = MODEL_TRAINER_BACKEND         # random_forest or hist_gradient_boosting
+    artifact_codec: str = ARTIFACT_CODEC
+    artifact_codec_level: int = ARTIFACT_CODEC_LEVEL
     _n_estimators = MODEL_TRAINER_N_ESTIMATORS         # 500
     _min_samples_split = MODEL_TRAINER_MIN_SAMPLES_SPLIT  # 2
     _min_samples_leaf = MODEL_TRAINER_MIN_SAMPLES_LEAF    # 1
@@ -59,23 +130,114 @@ class ModelTrainerConfig:
     _bootstrap = MODEL_TRAINER_BOOTSTRAP               # True
     _oob_score = MODEL_TRAINER_OOB_SCORE               # True
     _random_state = MODEL_TRAINER_RANDOM_STATE         # 101
+    _n_jobs = MODEL_TRAINER_N_JOBS                     # -1, capped by the resource governor
+    _hgb_learning_rate = MODEL_TRAINER_HGB_LEARNING_RATE
+    _hgb_max_iter = MODEL_TRAINER_HGB_MAX_ITER
+    _hgb_max_leaf_nodes = MODEL_TRAINER_HGB_MAX_LEAF_NODES
+    _hgb_max_depth = MODEL_TRAINER_HGB_MAX_DEPTH
+    _hgb_min_samples_leaf = MODEL_TRAINER_HGB_MIN_SAMPLES_LEAF
+    _hgb_l2_regularization = MODEL_TRAINER_HGB_L2_REGULARIZATION
+    _hgb_max_bins = MODEL_TRAINER_HGB_MAX_BINS
+    _hgb_early_stopping = MODEL_TRAINER_HGB_EARLY_STOPPING
+
+
+@dataclass
+class ModelTunerConfig:
+    model_tuner_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TUNER_DIR_NAME)
+    search_report_file_path: str = os.path.join(model_tuner_dir, MODEL_TUNER_REPORT_FILE_NAME)
+    model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    enabled: bool = MODEL_TUNER_ENABLED
+    time_budget_seconds: float = MODEL_TUNER_TIME_BUDGET_SECONDS
+    max_workers: int = MODEL_TUNER_MAX_WORKERS
+    validation_split: float = MODEL_TUNER_VALIDATION_SPLIT
+    random_state: int = MODEL_TUNER_RANDOM_STATE
+    mp_start_method: str = MODEL_TUNER_MP_START_METHOD
 
 
 @dataclass
 class ModelEvaluationConfig:
     changed_threshold_score: float = MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE
     bucket_name: str = MODEL_BUCKET_NAME
-    s3_model_key_path: str = MODEL_FILE_NAME
+    model_registry_key: str = MODEL_PUSHER_S3_KEY
+    model_cache_dir: str = MODEL_EVALUATION_MODEL_CACHE_DIR   # model versions kept across runs, see ModelRegistry
+    # serving budgets a candidate must stay within to be accepted, None disables a budget
+    max_single_row_p99_ms: Optional[float] = MODEL_EVALUATION_MAX_SINGLE_ROW_P99_MS
+    max_batch_ms: Optional[float] = MODEL_EVALUATION_MAX_BATCH_MS
+    max_model_size_mb: Optional[float] = MODEL_EVALUATION_MAX_MODEL_SIZE_MB
+    max_memory_mb: Optional[float] = MODEL_EVALUATION_MAX_MEMORY_MB
+    # single row median latency of the candidate relative to the production model
+    max_latency_ratio: Optional[float] = MODEL_EVALUATION_MAX_LATENCY_RATIO
+    single_row_samples: int = MODEL_EVALUATION_SINGLE_ROW_SAMPLES
+    batch_size: int = MODEL_EVALUATION_BATCH_SIZE
+    batch_repeats: int = MODEL_EVALUATION_BATCH_REPEATS
 
 @dataclass
 class ModelPusherConfig:
     bucket_name: str = MODEL_BUCKET_NAME
-    s3_model_key_path: str = MODEL_FILE_NAME
+    model_registry_key: str = MODEL_PUSHER_S3_KEY
+    push_artifacts: bool = MODEL_PUSHER_PUSH_ARTIFACTS
+    artifact_dir: str = training_pipeline_config.artifact_dir
+    artifacts_s3_key_path: str = f"{MODEL_PUSHER_ARTIFACTS_S3_PREFIX}/{training_pipeline_config.timestamp}"
     
+@dataclass
+class S3TransferConfig:
+    endpoint_url: Optional[str] = S3_ENDPOINT_URL
+    max_pool_connections: int = S3_MAX_POOL_CONNECTIONS
+    max_attempts: int = S3_MAX_ATTEMPTS
+    retry_mode: str = S3_RETRY_MODE
+    retry_backoff_seconds: float = S3_RETRY_BACKOFF_SECONDS
+    multipart_threshold: int = S3_MULTIPART_THRESHOLD_BYTES
+    multipart_chunksize: int = S3_MULTIPART_CHUNK_SIZE_BYTES
+    max_concurrency: int = S3_MAX_CONCURRENCY
+    ranged_get_threshold: int = S3_RANGED_GET_THRESHOLD_BYTES
+    ranged_get_chunksize: int = S3_RANGED_GET_CHUNK_SIZE_BYTES
+    metadata_ttl_seconds: float = S3_METADATA_TTL_SECONDS
+    batch_list_min_keys: int = S3_BATCH_LIST_MIN_KEYS
+    stream_chunk_rows: int = S3_STREAM_CHUNK_ROWS
+
+@dataclass
+class ModelRegistryConfig:
+    manifest_file_name: str = MODEL_REGISTRY_MANIFEST_FILE_NAME
+    versions_dir: str = MODEL_REGISTRY_VERSIONS_DIR
+    manifest_max_retries: int = MODEL_REGISTRY_MANIFEST_MAX_RETRIES
+    cache_max_versions: int = MODEL_REGISTRY_CACHE_MAX_VERSIONS
+    cache_max_size_bytes: int = MODEL_REGISTRY_CACHE_MAX_SIZE_BYTES
+    keep_versions: int = MODEL_REGISTRY_KEEP_VERSIONS
+    gc_grace_seconds: float = MODEL_REGISTRY_GC_GRACE_SECONDS
+    legacy_model_key: str = MODEL_REGISTRY_LEGACY_MODEL_KEY
+
+@dataclass
+class StorageBackendConfig:
+    backend: str = STORAGE_BACKEND
+    local_root_dir: str = STORAGE_LOCAL_ROOT_DIR
+
+@dataclass
+class StageCacheConfig:
+    enabled: bool = STAGE_CACHE_ENABLED
+    cache_dir: str = STAGE_CACHE_DIR
+    max_size_bytes: int = STAGE_CACHE_MAX_SIZE_BYTES
+    report_file_path: str = os.path.join(training_pipeline_config.artifact_dir, STAGE_CACHE_REPORT_FILE_NAME)
+
+@dataclass
+class PipelineExecutorConfig:
+    max_workers: int = PIPELINE_EXECUTOR_MAX_WORKERS
+    timings_file_path: str = os.path.join(training_pipeline_config.artifact_dir, PIPELINE_EXECUTOR_TIMINGS_FILE_NAME)
+
+@dataclass
+class ResourceGovernorConfig:
+    total_cores: int = RESOURCE_GOVERNOR_TOTAL_CORES
+    reserved_cores: int = RESOURCE_GOVERNOR_RESERVED_CORES
+    blas_threads: int = RESOURCE_GOVERNOR_BLAS_THREADS
+    report_file_path: str = os.path.join(training_pipeline_config.artifact_dir, RESOURCE_GOVERNOR_REPORT_FILE_NAME)
+
 @dataclass
 class VehiclePredictorConfig:
-    model_file_path: str = MODEL_FILE_NAME
+    model_registry_key: str = MODEL_PUSHER_S3_KEY
     model_bucket_name: str = MODEL_BUCKET_NAME
+    model_cache_dir: str = MODEL_EVALUATION_MODEL_CACHE_DIR
+    refresh_enabled: bool = APP_MODEL_REFRESH_ENABLED
+    refresh_interval_seconds: float = APP_MODEL_REFRESH_INTERVAL_SECONDS
+    download_chunk_size: int = APP_MODEL_DOWNLOAD_CHUNK_SIZE
 
 
 
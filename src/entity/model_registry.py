@@ -0,0 +1,394 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.cloud_storage.storage_backend import PreconditionFailed, StorageBackend, get_storage_backend
+from src.constants.constant import MODEL_EVALUATION_MODEL_CACHE_DIR, MODEL_PUSHER_S3_KEY
+from src.entity.config_entity import ModelRegistryConfig
+from src.entity.estimator import MyModel
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+from src.utils.compression import CODEC_METADATA_KEY, sniff_codec
+from src.utils.main_utils import load_object
+
+STAGES = ("production", "candidate")
+
+
+def file_codec(file_path: str) -> str:
+    """Codec of a file saved by save_object, from its first bytes."""
+    with open(file_path, "rb") as file_obj:
+        return sniff_codec(file_obj.read(4))
+
+
+def file_digest(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of a file, read in chunks
+    return: hex digest, the version of a model file in the registry
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class LocalModelCache:
+    """
+    Least recently used copies of model versions on local disk, shared by every process using the same
+    directory. Versions are immutable so a cached file never goes stale; files are renamed into place
+    and the modification time of a file is its last use.
+    """
+
+    def __init__(self, cache_dir: str, max_versions: int, max_size_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_versions = max_versions
+        self.max_size_bytes = max_size_bytes
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.cache_dir, f"{version}.pkl")
+
+    def get(self, version: str) -> Optional[str]:
+        """Path of a cached version, marked as just used, or None."""
+        file_path = self.path(version)
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            return None
+        return file_path
+
+    def put(self, tmp_file_path: str, version: str) -> str:
+        """Moves a complete download into the cache and evicts the least recently used versions."""
+        file_path = self.path(version)
+        os.replace(tmp_file_path, file_path)
+        self.evict(keep=version)
+        return file_path
+
+    def tmp_path(self, version: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return f"{self.path(version)}.{os.getpid()}.{threading.get_ident()}.part"
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Removes versions beyond max_versions or max_size_bytes, least recently used first
+        keep: version never evicted, the one being handed out
+        return: evicted versions
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".pkl"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            entries.append((stat.st_mtime, stat.st_size, file_name[:-len(".pkl")]))
+        entries.sort(reverse=True)
+
+        evicted, kept, kept_bytes = [], 0, 0
+        for _, size, version in entries:
+            if version == keep or (kept < self.max_versions and kept_bytes + size <= self.max_size_bytes):
+                kept, kept_bytes = kept + 1, kept_bytes + size
+                continue
+            try:
+                os.remove(self.path(version))
+                evicted.append(version)
+            except FileNotFoundError:
+                pass
+        if evicted:
+            logging.info(f"Evicted model versions {evicted} from the local model cache")
+        return evicted
+
+
+class ModelRegistry:
+    """
+    Versioned model store in S3, or in any other StorageBackend.
+
+    A model file is stored once, immutable, under <registry_key>/versions/<sha256>.pkl. The manifest
+    <registry_key>/manifest.json names the production and candidate versions and keeps the history of
+    production versions. Every manifest change is a conditional PUT on the ETag it was read at, so a
+    promotion is atomic and concurrent writers retry instead of overwriting each other. Versions are
+    loaded through a local LRU disk cache, a version already on disk never costs an S3 request; a
+    backend keeping its objects on local disk is read in place, without a cached copy. A bucket with
+    no manifest yet adopts the model object of the releases before the registry as production.
+    """
+
+    # parsed manifests by (bucket, key), with the ETag they were read at
+    _manifest_cache: Dict[Tuple[str, str], Tuple[str, dict]] = {}
+    _manifest_lock = threading.Lock()
+
+    def __init__(self, bucket_name: str, registry_key: str = MODEL_PUSHER_S3_KEY,
+                 cache_dir: str = MODEL_EVALUATION_MODEL_CACHE_DIR,
+                 model_registry_config: ModelRegistryConfig = None, storage: StorageBackend = None):
+        """
+        :param bucket_name: Name of your model bucket
+        :param registry_key: Prefix of the registry in the bucket
+        :param cache_dir: Local directory of the model cache
+        :param storage: backend of the bucket, the one of StorageBackendConfig by default
+        """
+        self.bucket_name = bucket_name
+        self.registry_key = registry_key
+        self.config = model_registry_config or ModelRegistryConfig()
+        self.storage = storage or get_storage_backend(bucket_name)
+        self.manifest_key = f"{registry_key}/{self.config.manifest_file_name}"
+        self.cache = LocalModelCache(os.path.join(cache_dir, bucket_name, registry_key.replace("/", "__")),
+                                     max_versions=self.config.cache_max_versions,
+                                     max_size_bytes=self.config.cache_max_size_bytes)
+
+    def version_key(self, version: str) -> str:
+        """Key of the model object of a version."""
+        return f"{self.registry_key}/{self.config.versions_dir}/{version}.pkl"
+
+    @staticmethod
+    def empty_manifest() -> dict:
+        return {"production": None, "candidate": None, "versions": {}, "history": []}
+
+    def get_manifest(self, use_cache: bool = True) -> Tuple[dict, Optional[str]]:
+        """
+        Reads the manifest. Its ETag comes from the metadata cache of the storage backend and the
+        manifest itself is only read again when the ETag changed
+        :param use_cache: False always sends the HEAD request
+        :return: a copy of the manifest and its ETag, an empty manifest and None when there is none yet
+        """
+        try:
+            head = self.storage.head(self.manifest_key, use_cache=use_cache)
+            if head is None:
+                return self.empty_manifest(), None
+            etag = head["ETag"]
+            cache_key = (self.bucket_name, self.manifest_key)
+            with ModelRegistry._manifest_lock:
+                cached = ModelRegistry._manifest_cache.get(cache_key)
+            if cached is not None and cached[0] == etag:
+                return copy.deepcopy(cached[1]), etag
+            try:
+                body = self.storage.read_bytes(self.manifest_key, if_match=etag)
+            except (PreconditionFailed, FileNotFoundError):
+                if use_cache:
+                    return self.get_manifest(use_cache=False)
+                raise
+            manifest = json.loads(body)
+            with ModelRegistry._manifest_lock:
+                ModelRegistry._manifest_cache[cache_key] = (etag, manifest)
+            return copy.deepcopy(manifest), etag
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def update_manifest(self, mutate: Callable[[dict], None]) -> dict:
+        """
+        Read-modify-write of the manifest: mutate changes a fresh copy in place, which is written only if
+        nobody else wrote the manifest in between. A lost race reads the new manifest and applies mutate again
+        :return: the written manifest
+        """
+        try:
+            for attempt in range(1, self.config.manifest_max_retries + 1):
+                manifest, etag = self.get_manifest(use_cache=False)
+                mutate(manifest)
+                manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+                try:
+                    new_etag = self.storage.write_bytes(
+                        self.manifest_key, json.dumps(manifest, indent=2).encode("utf-8"),
+                        if_match=etag, if_none_match=etag is None, content_type="application/json")
+                except PreconditionFailed:
+                    logging.info(f"Manifest changed concurrently, update attempt {attempt} is retried")
+                    continue
+                with ModelRegistry._manifest_lock:
+                    ModelRegistry._manifest_cache[(self.bucket_name, self.manifest_key)] = (
+                        new_etag, copy.deepcopy(manifest))
+                return manifest
+            raise RuntimeError(f"Manifest {self.manifest_key} changed concurrently "
+                               f"{self.config.manifest_max_retries} times in a row")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def register(self, model_file_path: str, metadata: Optional[dict] = None) -> str:
+        """
+        Stores a model file as a new version, uploaded only when its content is not in the registry yet,
+        and makes it the candidate. The file is stored as saved, compressed or not, with its codec in the
+        object metadata and the manifest. It is also copied to the local model cache
+        :param metadata: free-form details kept with the version in the manifest, e.g. scores
+        :return: the version, SHA-256 of the file
+        """
+        try:
+            version = file_digest(model_file_path)
+            s3_key = self.version_key(version)
+            if self.storage.exists(s3_key):
+                logging.info(f"Model version {version} is already in the registry")
+            else:
+                self.storage.upload_file(model_file_path, s3_key,
+                                         metadata={CODEC_METADATA_KEY: file_codec(model_file_path)})
+            if self.storage.local_path(s3_key) is None and self.cache.get(version) is None:
+                tmp_file_path = self.cache.tmp_path(version)
+                shutil.copyfile(model_file_path, tmp_file_path)
+                self.cache.put(tmp_file_path, version)
+
+            def add_candidate(manifest: dict) -> None:
+                manifest["versions"].setdefault(version, {
+                    "key": s3_key,
+                    "size": os.path.getsize(model_file_path),
+                    "codec": file_codec(model_file_path),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "metadata": metadata or {},
+                })
+                manifest["candidate"] = version
+
+            self.update_manifest(add_candidate)
+            logging.info(f"Registered model version {version} as candidate")
+            return version
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def promote(self, version: str, stage: str = "production") -> dict:
+        """
+        Points a stage of the manifest to a registered version in one atomic manifest write. A version
+        promoted to production stops being the candidate and is appended to the production history
+        :return: the written manifest
+        """
+        if stage not in STAGES:
+            raise VehicleInsuranceException(ValueError(f"Unknown stage {stage}, expected one of {STAGES}"), sys)
+
+        def set_stage(manifest: dict) -> None:
+            if version not in manifest["versions"]:
+                raise ValueError(f"Model version {version} is not registered")
+            if stage == "production":
+                if manifest["production"] != version:
+                    manifest["history"].append(version)
+                if manifest["candidate"] == version:
+                    manifest["candidate"] = None
+            manifest[stage] = version
+
+        manifest = self.update_manifest(set_stage)
+        logging.info(f"Promoted model version {version} to {stage}")
+        return manifest
+
+    def rollback(self) -> str:
+        """
+        Makes the previous production version the production version again
+        :return: the version now in production
+        """
+        def restore_previous(manifest: dict) -> None:
+            if len(manifest["history"]) < 2:
+                raise ValueError("No previous production version to roll back to")
+            manifest["history"].pop()
+            manifest["production"] = manifest["history"][-1]
+
+        production = self.update_manifest(restore_previous)["production"]
+        logging.info(f"Rolled production back to model version {production}")
+        return production
+
+    def get_version(self, stage: str = "production", use_cache: bool = True) -> Optional[str]:
+        """
+        Version of a stage, from the cached manifest. Without a manifest the legacy model, if any, is
+        adopted first, so the first run after the upgrade still compares candidates against it
+        :return: the version or None when the stage is empty
+        """
+        manifest, etag = self.get_manifest(use_cache=use_cache)
+        if etag is None and stage == "production":
+            return self.adopt_legacy_model()
+        return manifest.get(stage)
+
+    def adopt_legacy_model(self) -> Optional[str]:
+        """
+        Registers the model object pushed to legacy_model_key by the releases before the registry and makes
+        it production, only while the manifest has no production version, so a concurrent push is never
+        overwritten. The legacy object is left in place
+        :return: the production version, None when there is neither one nor a legacy model
+        """
+        try:
+            legacy_key = self.config.legacy_model_key
+            if not self.storage.exists(legacy_key):
+                return None
+            tmp_file_path = self.cache.tmp_path("legacy")
+            self.storage.download_file(legacy_key, tmp_file_path)
+            version = file_digest(tmp_file_path)
+            s3_key = self.version_key(version)
+            entry = {"key": s3_key, "size": os.path.getsize(tmp_file_path), "codec": file_codec(tmp_file_path),
+                     "created_at": datetime.now(timezone.utc).isoformat(), "metadata": {"legacy_key": legacy_key}}
+            if not self.storage.exists(s3_key):
+                self.storage.upload_file(tmp_file_path, s3_key, metadata={CODEC_METADATA_KEY: entry["codec"]})
+            if self.storage.local_path(s3_key) is None and self.cache.get(version) is None:
+                self.cache.put(tmp_file_path, version)
+            else:
+                os.remove(tmp_file_path)
+
+            def adopt(manifest: dict) -> None:
+                if manifest["production"] is None:
+                    manifest["versions"].setdefault(version, entry)
+                    manifest["production"] = version
+                    manifest["history"].append(version)
+
+            production = self.update_manifest(adopt)["production"]
+            logging.info(f"Legacy model {legacy_key} registered as version {version}, production is {production}")
+            return production
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def download_version(self, version: str) -> str:
+        """
+        Local file of a version, downloaded only when it is not in the local model cache. The download
+        is checked against the version, the SHA-256 of the content, before it is renamed into place.
+        The file of a backend on local disk is used as is, it was checked when it was registered
+        :return: path of the local model file
+        """
+        try:
+            file_path = self.storage.local_path(self.version_key(version))
+            if file_path is not None:
+                return file_path
+            file_path = self.cache.get(version)
+            if file_path is not None:
+                logging.info(f"Model version {version} found in the local model cache")
+                return file_path
+            tmp_file_path = self.cache.tmp_path(version)
+            self.storage.download_file(self.version_key(version), tmp_file_path)
+            digest = file_digest(tmp_file_path)
+            if digest != version:
+                os.remove(tmp_file_path)
+                raise ValueError(f"Downloaded model has SHA-256 {digest}, expected {version}")
+            file_path = self.cache.put(tmp_file_path, version)
+            logging.info(f"Model version {version} downloaded to the local model cache")
+            return file_path
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def load_version(self, version: str) -> MyModel:
+        """Loads a version through the local model cache, see download_version."""
+        return load_object(self.download_version(version))
+
+    def garbage_collect(self, keep_versions: Optional[int] = None) -> List[str]:
+        """
+        Deletes the versions that are neither production, candidate nor one of the last keep_versions
+        production versions, and model objects missing from the manifest for longer than gc_grace_seconds
+        (left by a push that failed before its manifest write). The manifest is updated first, so no
+        reader can be pointed at a deleted version, then objects are deleted in bulk requests
+        :param keep_versions: past production versions to keep, keep_versions of the config by default
+        :return: deleted versions
+        """
+        try:
+            keep_versions = self.config.keep_versions if keep_versions is None else keep_versions
+            removed: List[str] = []
+
+            def drop_old_versions(manifest: dict) -> None:
+                recent = manifest["history"][-keep_versions:] if keep_versions > 0 else []
+                kept = {manifest["production"], manifest["candidate"], *recent}
+                removed[:] = [version for version in manifest["versions"] if version not in kept]
+                for version in removed:
+                    del manifest["versions"][version]
+                manifest["history"] = [version for version in manifest["history"] if version in manifest["versions"]]
+
+            manifest = self.update_manifest(drop_old_versions)
+            deleted = set(removed)
+            oldest_orphan = datetime.now(timezone.utc) - timedelta(seconds=self.config.gc_grace_seconds)
+            versions_prefix = f"{self.registry_key}/{self.config.versions_dir}/"
+            keys = []
+            for obj in self.storage.list(versions_prefix):
+                version = obj["Key"][len(versions_prefix):].split(".", 1)[0]
+                if version in deleted or (version not in manifest["versions"]
+                                          and obj["LastModified"] < oldest_orphan):
+                    deleted.add(version)
+                    keys.append(obj["Key"])
+            self.storage.delete(keys)
+            logging.info(f"Garbage collected {len(keys)} model versions from the registry")
+            return sorted(deleted)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
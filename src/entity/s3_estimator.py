@@ -2,6 +2,7 @@ from src.cloud_storage.aws_storage import SimpleStorageService
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
 from src.entity.estimator import MyModel
+from src.utils.compression import CODEC_METADATA_KEY, sniff_codec
 import sys
 from pandas import DataFrame
 
@@ -48,17 +49,20 @@ class ModelEstimator:
 
     def save_model(self, from_file, remove: bool = False) -> None:
         """
-        Save the model to the model_path
+        Save the model to the model_path, with the codec of the file in the object metadata
         :param from_file: Your local system model path
         :param remove: By default it is false that mean you will have your model locally available in your system folder
         :return:
         """
         try:
+            with open(from_file, "rb") as file_obj:
+                codec = sniff_codec(file_obj.read(4))
             self.s3.upload_file(
                 from_file,
                 to_filename=self.model_path,
                 bucket_name=self.bucket_name,
                 remove=remove,
+                extra_args={"Metadata": {CODEC_METADATA_KEY: codec}},
             )
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
@@ -1,10 +1,19 @@
+import asyncio
+import hashlib
+import json
+import os
 import sys
+import threading
+import time
+from src.cloud_storage.async_storage import AsyncSimpleStorageService
 from src.entity.config_entity import VehiclePredictorConfig
-from src.entity.s3_estimator import ModelEstimator
+from src.entity.estimator import MyModel
+from src.entity.model_registry import ModelRegistry
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
+from src.utils.main_utils import load_object
 from pandas import DataFrame
-from typing import List
+from typing import List, Optional
 
 
 class VehicleData:
@@ -88,6 +97,13 @@ class VehicleData:
 
 
 class VehicleDataClassifier:
+    # production model shared by every request of the serving process, with its registry version
+    _model: Optional[MyModel] = None
+    _model_version: Optional[str] = None
+    _model_lock = threading.Lock()
+    # set while a ModelRefresher keeps _model current, requests then never look the model up themselves
+    _background_refresh: bool = False
+
     def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),) -> None:
         """
         :param prediction_pipeline_config: Configuration for prediction the value
@@ -97,6 +113,36 @@ class VehicleDataClassifier:
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
 
+    def get_model(self) -> MyModel:
+        """
+        This is the method of VehicleDataClassifier
+        Returns: the production model of the registry, reloaded only when the manifest names another
+                 version. The manifest ETag comes from the metadata cache, so at most one HEAD request per
+                 TTL is sent however many requests are served, and a version already in the local model
+                 cache (e.g. after a rollback) is loaded from disk. While a ModelRefresher runs, the model
+                 it keeps current is returned without any lookup
+        """
+        try:
+            if VehicleDataClassifier._background_refresh and VehicleDataClassifier._model is not None:
+                return VehicleDataClassifier._model
+            model_registry = ModelRegistry(
+                bucket_name=self.prediction_pipeline_config.model_bucket_name,
+                registry_key=self.prediction_pipeline_config.model_registry_key,
+                cache_dir=self.prediction_pipeline_config.model_cache_dir,
+            )
+            version = model_registry.get_version(stage="production")
+            if version is None:
+                raise Exception(f"No production model in {model_registry.manifest_key}")
+            if version != VehicleDataClassifier._model_version:
+                with VehicleDataClassifier._model_lock:
+                    if version != VehicleDataClassifier._model_version:
+                        VehicleDataClassifier._model = model_registry.load_version(version)
+                        VehicleDataClassifier._model_version = version
+                        logging.info(f"Serving production model {version}")
+            return VehicleDataClassifier._model
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
     def predict(self, dataframe) -> str:
         """
         This is the method of VehicleDataClassifier
@@ -104,12 +150,106 @@ class VehicleDataClassifier:
         """
         try:
             logging.info("Entered predict method of VehicleDataClassifier class")
-            model = ModelEstimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
-            result = model.predict(dataframe)
+            result = self.get_model().predict(dataframe)
 
             return result
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
+
+
+class ModelRefresher:
+    """
+    Keeps the model shared by VehicleDataClassifier on the production version of the registry, from the
+    event loop of the serving app. The manifest is polled with a conditional GET that costs no body while
+    it is unchanged, a new version is streamed into the local model cache of the registry, and only the
+    unpickling, which is CPU work, leaves the event loop.
+    """
+
+    def __init__(self, storage: AsyncSimpleStorageService,
+                 prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()):
+        """
+        :param storage: open async storage client
+        :param prediction_pipeline_config: registry, local model cache and polling settings
+        """
+        self.storage = storage
+        self.config = prediction_pipeline_config
+        self.model_registry = ModelRegistry(bucket_name=prediction_pipeline_config.model_bucket_name,
+                                            registry_key=prediction_pipeline_config.model_registry_key,
+                                            cache_dir=prediction_pipeline_config.model_cache_dir)
+        self.manifest_etag: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+
+    async def download_version(self, version: str) -> str:
+        """
+        Streams a version into the local model cache, checked against its SHA-256 before it is renamed
+        into place. Returns: path of the local model file
+        """
+        tmp_file_path = self.model_registry.cache.tmp_path(version)
+        sha256 = hashlib.sha256()
+        with open(tmp_file_path, "wb") as file_obj:
+            async for chunk in self.storage.iter_object_chunks(self.config.model_bucket_name,
+                                                               self.model_registry.version_key(version),
+                                                               chunk_size=self.config.download_chunk_size):
+                sha256.update(chunk)
+                file_obj.write(chunk)
+        if sha256.hexdigest() != version:
+            os.remove(tmp_file_path)
+            raise ValueError(f"Downloaded model has SHA-256 {sha256.hexdigest()}, expected {version}")
+        return self.model_registry.cache.put(tmp_file_path, version)
+
+    async def refresh(self) -> bool:
+        """
+        Loads the production version when the manifest names another one than the model being served
+        Returns: True when a new model is served
+        """
+        try:
+            response = await self.storage.get_object(self.config.model_bucket_name, self.model_registry.manifest_key,
+                                                     if_none_match=self.manifest_etag)
+            self.last_refresh = time.monotonic()
+            if response is None:
+                return False
+            version = json.loads(response["Body"]).get("production")
+            if version is None or version == VehicleDataClassifier._model_version:
+                self.manifest_etag = response["ETag"]
+                return False
+            file_path = self.model_registry.cache.get(version) or await self.download_version(version)
+            model = await asyncio.to_thread(load_object, file_path)
+            with VehicleDataClassifier._model_lock:
+                VehicleDataClassifier._model = model
+                VehicleDataClassifier._model_version = version
+            # only remembered once the version is served, a failed load is retried at the next poll
+            self.manifest_etag = response["ETag"]
+            logging.info(f"Serving production model {version}")
+            return True
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    async def run(self) -> None:
+        """Refreshes every refresh_interval_seconds until cancelled, a failed refresh keeps the current model."""
+        VehicleDataClassifier._background_refresh = True
+        try:
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logging.error(f"Model refresh failed, serving {VehicleDataClassifier._model_version}: {e}")
+                await asyncio.sleep(self.config.refresh_interval_seconds)
+        finally:
+            VehicleDataClassifier._background_refresh = False
+
+    async def health(self) -> dict:
+        """
+        State of the serving model and of the registry, checked with a HEAD request on the manifest
+        Returns: dict with "healthy" True when S3 answers and a model is served
+        """
+        try:
+            head = await self.storage.get_object_metadata(self.config.model_bucket_name, self.model_registry.manifest_key)
+            s3_status = "ok" if head is not None else "no manifest"
+        except Exception as e:
+            s3_status = f"error: {e}"
+        return {
+            "healthy": s3_status == "ok" and VehicleDataClassifier._model is not None,
+            "s3": s3_status,
+            "model_version": VehicleDataClassifier._model_version,
+            "seconds_since_refresh": None if self.last_refresh is None else round(time.monotonic() - self.last_refresh, 3),
+        }
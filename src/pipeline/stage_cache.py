@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+from dataclasses import fields, is_dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from src.entity.config_entity import StageCacheConfig, training_pipeline_config
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+MANIFEST_FILE_NAME = "manifest.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Returns the sha256 hex digest of a file, read block by block so large artifacts never sit in memory.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed memoization of TrainPipeline stages.
+
+    A stage is keyed by the hash of its input artifact contents, its config, the source code of the
+    modules implementing it and any extra key parts (e.g. a fingerprint of the Mongo collection).
+    On a hit the cached output files are restored into the current run's artifact directory and the
+    artifact is rebuilt without running the stage. Entries are evicted least-recently-used first
+    once the cache grows beyond max_size_bytes.
+    """
+
+    def __init__(self, stage_cache_config: StageCacheConfig = StageCacheConfig()):
+        try:
+            self.stage_cache_config = stage_cache_config
+            self.artifact_dir = os.path.abspath(training_pipeline_config.artifact_dir)
+            self.report: Dict[str, Dict[str, Any]] = {}
+            os.makedirs(self.stage_cache_config.cache_dir, exist_ok=True)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def _normalize(self, value: Any) -> Any:
+        """Replaces the run specific artifact directory so paths do not change the key between runs."""
+        if isinstance(value, str):
+            return value.replace(training_pipeline_config.artifact_dir, "<artifact_dir>")
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._normalize(item) for key, item in value.items()}
+        return value
+
+    def _config_fingerprint(self, config: object) -> Dict[str, Any]:
+        """Collects every non callable attribute of a config, including class level hyperparameters."""
+        if config is None:
+            return {}
+        fingerprint = {}
+        for name in dir(config):
+            if name.startswith("__"):
+                continue
+            value = getattr(config, name)
+            if callable(value):
+                continue
+            fingerprint[name] = self._normalize(value)
+        return fingerprint
+
+    def _artifact_fingerprint(self, artifact: object) -> Dict[str, Any]:
+        """Hashes the files an artifact points to, and keeps its plain values as they are."""
+        fingerprint = {"type": type(artifact).__name__}
+        values = asdict(artifact) if is_dataclass(artifact) else vars(artifact)
+        for name, value in values.items():
+            if isinstance(value, str) and os.path.isfile(value):
+                fingerprint[name] = hash_file(value)
+            else:
+                fingerprint[name] = self._normalize(value)
+        return fingerprint
+
+    def compute_key(self, stage_name: str, inputs: List[object], config: object,
+                    code_modules: List[object], extra_files: List[str], extra_key: Optional[Dict[str, Any]]) -> str:
+        """
+        Method Name :   compute_key
+        Description :   Builds the content address of a stage from its inputs, config, code and extras
+
+        Output      :   Returns the sha256 hex digest identifying the stage outputs
+        """
+        try:
+            key_parts = {
+                "stage": stage_name,
+                "inputs": [self._artifact_fingerprint(artifact) for artifact in inputs],
+                "config": self._config_fingerprint(config),
+                "code": {module.__name__: hash_file(inspect.getsourcefile(module)) for module in code_modules},
+                "files": {file_path: hash_file(file_path) for file_path in extra_files},
+                "extra": extra_key or {},
+            }
+            payload = json.dumps(key_parts, sort_keys=True, default=str)
+            return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def _entry_dir(self, stage_name: str, key: str) -> str:
+        return os.path.join(self.stage_cache_config.cache_dir, stage_name, key)
+
+    def _read_manifest(self, entry_dir: str) -> Optional[dict]:
+        manifest_path = os.path.join(entry_dir, MANIFEST_FILE_NAME)
+        if not os.path.isfile(manifest_path):
+            return None
+        with open(manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+
+    def _write_manifest(self, entry_dir: str, manifest: dict) -> None:
+        manifest_path = os.path.join(entry_dir, MANIFEST_FILE_NAME)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+        os.replace(tmp_path, manifest_path)
+
+    def _store(self, stage_name: str, key: str, artifact: object) -> None:
+        """Copies the stage outputs into a new cache entry and records how to rebuild the artifact."""
+        entry_dir = self._entry_dir(stage_name, key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        entries = {}
+        size_bytes = 0
+        for field in fields(artifact):
+            value = getattr(artifact, field.name)
+            if isinstance(value, str) and os.path.isfile(value):
+                abs_path = os.path.abspath(value)
+                if abs_path.startswith(self.artifact_dir + os.sep):
+                    entries[field.name] = {"kind": "file", "relpath": os.path.relpath(abs_path, self.artifact_dir)}
+                else:
+                    entries[field.name] = {"kind": "file", "abspath": abs_path}
+                shutil.copy2(value, os.path.join(tmp_dir, field.name))
+                size_bytes += os.path.getsize(value)
+            elif is_dataclass(value):
+                entries[field.name] = {"kind": "dataclass", "value": asdict(value)}
+            else:
+                entries[field.name] = {"kind": "value", "value": value}
+
+        if size_bytes > self.stage_cache_config.max_size_bytes:
+            logging.info(f"Stage [{stage_name}] outputs ({size_bytes} bytes) exceed the cache size limit, not cached")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        now = time.time()
+        self._write_manifest(tmp_dir, {
+            "stage": stage_name,
+            "key": key,
+            "artifact_type": type(artifact).__name__,
+            "fields": entries,
+            "size_bytes": size_bytes,
+            "created_at": now,
+            "last_access": now,
+        })
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        os.replace(tmp_dir, entry_dir)
+        self.evict()
+
+    def _restore(self, entry_dir: str, manifest: dict, artifact_cls: type) -> object:
+        """Copies cached outputs back into the current run and rebuilds the artifact."""
+        field_types = {field.name: field.type for field in fields(artifact_cls)}
+        kwargs = {}
+        for name, entry in manifest["fields"].items():
+            if entry["kind"] == "file":
+                target_path = entry.get("abspath") or os.path.join(training_pipeline_config.artifact_dir, entry["relpath"])
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copy2(os.path.join(entry_dir, name), target_path)
+                kwargs[name] = target_path
+            elif entry["kind"] == "dataclass":
+                kwargs[name] = field_types[name](**entry["value"])
+            else:
+                kwargs[name] = entry["value"]
+
+        manifest["last_access"] = time.time()
+        self._write_manifest(entry_dir, manifest)
+        return artifact_cls(**kwargs)
+
+    def evict(self) -> None:
+        """
+        Method Name :   evict
+        Description :   Removes least recently used entries until the cache fits in max_size_bytes
+        """
+        try:
+            cache_entries = []
+            cache_dir = self.stage_cache_config.cache_dir
+            for stage_name in os.listdir(cache_dir):
+                stage_dir = os.path.join(cache_dir, stage_name)
+                if not os.path.isdir(stage_dir):
+                    continue
+                for key in os.listdir(stage_dir):
+                    entry_dir = os.path.join(stage_dir, key)
+                    manifest = self._read_manifest(entry_dir)
+                    if manifest is not None:
+                        cache_entries.append((manifest["last_access"], manifest["size_bytes"], entry_dir))
+
+            total_size = sum(size for _, size, _ in cache_entries)
+            for _, size, entry_dir in sorted(cache_entries):
+                if total_size <= self.stage_cache_config.max_size_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total_size -= size
+                logging.info(f"Evicted stage cache entry: {entry_dir}")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def run(self, stage_name: str, stage_func: Callable[[], object], artifact_cls: type,
+            inputs: Optional[List[object]] = None, config: object = None,
+            code_modules: Optional[List[object]] = None, extra_files: Optional[List[str]] = None,
+            extra_key: Optional[Dict[str, Any]] = None) -> object:
+        """
+        Method Name :   run
+        Description :   Returns the cached artifact of a stage when its key matches, otherwise runs the stage
+                        and stores its outputs
+
+        Output      :   Returns the stage artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            stage_report = self.report.setdefault(stage_name, {"hits": 0, "misses": 0})
+            start_time = time.time()
+            if not self.stage_cache_config.enabled:
+                artifact = stage_func()
+                stage_report.update({"key": None, "seconds": round(time.time() - start_time, 3)})
+                return artifact
+
+            key = self.compute_key(stage_name, inputs or [], config, code_modules or [], extra_files or [], extra_key)
+            entry_dir = self._entry_dir(stage_name, key)
+            manifest = self._read_manifest(entry_dir)
+            if manifest is not None:
+                artifact = self._restore(entry_dir, manifest, artifact_cls)
+                stage_report["hits"] += 1
+                logging.info(f"Stage cache hit for [{stage_name}] with key {key[:12]}")
+            else:
+                logging.info(f"Stage cache miss for [{stage_name}] with key {key[:12]}")
+                artifact = stage_func()
+                self._store(stage_name, key, artifact)
+                stage_report["misses"] += 1
+
+            stage_report.update({"key": key, "seconds": round(time.time() - start_time, 3)})
+            return artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def save_report(self) -> dict:
+        """
+        Method Name :   save_report
+        Description :   Writes the per-stage hit/miss report next to the run artifacts
+
+        Output      :   Returns the report dictionary
+        """
+        try:
+            report_file_path = self.stage_cache_config.report_file_path
+            os.makedirs(os.path.dirname(report_file_path), exist_ok=True)
+            with open(report_file_path, "w") as report_file:
+                json.dump(self.report, report_file, indent=4)
+            logging.info(f"Stage cache report: {self.report}")
+            return self.report
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
@@ -1,27 +1,48 @@
 import sys
+from typing import Any, Callable, List, Optional
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
-
+from src.constants.constant import SCHEMA_FILE_PATH
+from src.data_access.fetch_data import FetchData
+from src.pipeline.stage_cache import StageCache
+from src.utils.dag_executor import DAGExecutor, Task
+from src.utils.resource_governor import ResourceGovernor
+from src.components import data_ingestion as data_ingestion_module
+from src.components import data_validation as data_validation_module
+from src.components import data_transformation as data_transformation_module
+from src.components import data_resampling as data_resampling_module
+from src.components import model_tuner as model_tuner_module
+from src.components import model_trainer as model_trainer_module
 
 from src.components.data_ingestion import DataIngestion
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
+from src.components.data_resampling import DataResampling
+from src.components.model_tuner import ModelTuner
 from src.components.model_trainer import ModelTrainer
 from src.components.model_evaluation import ModelEvaluation
 from src.components.model_pusher import ModelPusher
+from src.entity.model_registry import ModelRegistry
 
 from src.entity.config_entity import (
     DataIngestionConfig,
     DataValidationConfig,
     DataTransformationConfig,
+    DataResamplingConfig,
+    ModelTunerConfig,
     ModelTrainerConfig,
     ModelEvaluationConfig,
-    ModelPusherConfig)
+    ModelPusherConfig,
+    StageCacheConfig,
+    PipelineExecutorConfig,
+    ResourceGovernorConfig)
                                           
 from src.entity.artifact_entity import (
     DataIngestionArtifact,
     DataValidationArtifact,
     DataTransformationArtifact,
+    DataResamplingArtifact,
+    ModelTunerArtifact,
     ModelTrainerArtifact,
     ModelEvaluationArtifact,
     ModelPusherArtifact)
@@ -33,9 +54,14 @@ class TrainPipeline:
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
+        self.data_resampling_config = DataResamplingConfig()
+        self.model_tuner_config = ModelTunerConfig()
         self.model_trainer_config = ModelTrainerConfig()
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
+        self.stage_cache = StageCache(stage_cache_config=StageCacheConfig())
+        self.pipeline_executor_config = PipelineExecutorConfig()
+        self.resource_governor_config = ResourceGovernorConfig()
 
 
     
@@ -47,7 +73,25 @@ class TrainPipeline:
             logging.info("Entered the start_data_ingestion method of TrainPipeline class")
             logging.info("Getting the data from mongodb")
             data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            collection_fingerprint = None
+            if self.stage_cache.stage_cache_config.enabled:
+                collection_fingerprint = FetchData().get_collection_fingerprint(
+                    collection_name=self.data_ingestion_config.collection_name
+                )
+            if collection_fingerprint is None:
+                # without a fingerprint of the contents a cached export could be stale
+                if self.stage_cache.stage_cache_config.enabled:
+                    logging.warning("Collection has no content fingerprint, data ingestion runs uncached")
+                data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            else:
+                data_ingestion_artifact = self.stage_cache.run(
+                    stage_name="data_ingestion",
+                    stage_func=data_ingestion.initiate_data_ingestion,
+                    artifact_cls=DataIngestionArtifact,
+                    config=self.data_ingestion_config,
+                    code_modules=[data_ingestion_module],
+                    extra_key=collection_fingerprint,
+                )
             logging.info("Got the train_set and test_set from mongodb")
             logging.info("Exited the start_data_ingestion method of TrainPipeline class")
             return data_ingestion_artifact
@@ -65,7 +109,15 @@ class TrainPipeline:
                                              data_validation_config=self.data_validation_config
                                              )
 
-            data_validation_artifact = data_validation.initiate_data_validation()
+            data_validation_artifact = self.stage_cache.run(
+                stage_name="data_validation",
+                stage_func=data_validation.initiate_data_validation,
+                artifact_cls=DataValidationArtifact,
+                inputs=[data_ingestion_artifact],
+                config=self.data_validation_config,
+                code_modules=[data_validation_module],
+                extra_files=[SCHEMA_FILE_PATH],
+            )
 
             logging.info("Performed the data validation operation")
             logging.info("Exited the start_data_validation method of TrainPipeline class")
@@ -82,21 +134,88 @@ class TrainPipeline:
             data_transformation = DataTransformation(data_ingestion_artifact=data_ingestion_artifact,
                                                      data_transformation_config=self.data_transformation_config,
                                                      data_validation_artifact=data_validation_artifact)
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = self.stage_cache.run(
+                stage_name="data_transformation",
+                stage_func=data_transformation.initiate_data_transformation,
+                artifact_cls=DataTransformationArtifact,
+                inputs=[data_ingestion_artifact, data_validation_artifact],
+                config=self.data_transformation_config,
+                code_modules=[data_transformation_module],
+                extra_files=[SCHEMA_FILE_PATH],
+            )
             return data_transformation_artifact
         except Exception as e:
             raise VehicleInsuranceException(e, sys) from e
         
         
-    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+    def start_data_resampling(self, data_transformation_artifact: DataTransformationArtifact) -> DataResamplingArtifact:
+        """
+        This method of TrainPipeline class is responsible for starting class-imbalance resampling
+        """
+        try:
+            data_resampling = DataResampling(data_transformation_artifact=data_transformation_artifact,
+                                             data_resampling_config=self.data_resampling_config)
+            data_resampling_artifact = self.stage_cache.run(
+                stage_name="data_resampling",
+                stage_func=data_resampling.initiate_data_resampling,
+                artifact_cls=DataResamplingArtifact,
+                inputs=[data_transformation_artifact],
+                config=self.data_resampling_config,
+                code_modules=[data_resampling_module],
+            )
+            return data_resampling_artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def start_model_tuner(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTunerArtifact:
+        """
+        This method of TrainPipeline class is responsible for starting the hyperparameter search
+        """
+        try:
+            model_tuner = ModelTuner(data_transformation_artifact=data_transformation_artifact,
+                                     model_tuner_config=self.model_tuner_config,
+                                     model_trainer_config=self.model_trainer_config)
+            model_tuner_artifact = self.stage_cache.run(
+                stage_name="model_tuner",
+                stage_func=model_tuner.initiate_model_tuner,
+                artifact_cls=ModelTunerArtifact,
+                inputs=[data_transformation_artifact],
+                config=self.model_tuner_config,
+                code_modules=[model_tuner_module, model_trainer_module],
+                extra_files=[self.model_tuner_config.model_config_file_path],
+                extra_key={"model_trainer_params": ModelTrainer.get_model_params(self.model_trainer_config)},
+            )
+            return model_tuner_artifact
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact,
+                            data_resampling_artifact: DataResamplingArtifact,
+                            model_tuner_artifact: ModelTunerArtifact) -> ModelTrainerArtifact:
         """
         This method of TrainPipeline class is responsible for starting model training
         """
         try:
             model_trainer = ModelTrainer(data_transformation_artifact=data_transformation_artifact,
-                                         model_trainer_config=self.model_trainer_config
+                                         model_trainer_config=self.model_trainer_config,
+                                         data_resampling_artifact=data_resampling_artifact,
+                                         model_tuner_artifact=model_tuner_artifact
                                          )
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            extra_key = None
+            if self.model_trainer_config.incremental_mode:
+                # an incremental model depends on the production forest it extends
+                extra_key = {"production_model": ModelRegistry(
+                    bucket_name=self.model_trainer_config.production_bucket_name,
+                    registry_key=self.model_trainer_config.production_model_registry_key).get_version()}
+            model_trainer_artifact = self.stage_cache.run(
+                stage_name="model_trainer",
+                stage_func=model_trainer.initiate_model_trainer,
+                artifact_cls=ModelTrainerArtifact,
+                inputs=[data_transformation_artifact, data_resampling_artifact, model_tuner_artifact],
+                config=self.model_trainer_config,
+                code_modules=[model_trainer_module],
+                extra_key=extra_key,
+            )
             return model_trainer_artifact
 
         except Exception as e:
@@ -131,20 +250,61 @@ class TrainPipeline:
             raise VehicleInsuranceException(e, sys)
         
     
+    def start_model_pusher_if_accepted(self, model_evaluation_artifact: ModelEvaluationArtifact) -> Optional[ModelPusherArtifact]:
+        """
+        This method of TrainPipeline class pushes the model only when model evaluation accepted it
+        """
+        if not model_evaluation_artifact.is_model_accepted:
+            logging.info(f"Model not accepted.")
+            return None
+        return self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+
+    @staticmethod
+    def governed(stage_name: str, stage_func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        This method of TrainPipeline class wraps a stage so it runs inside its ResourceGovernor allotment
+        """
+        def run_stage(**kwargs):
+            with ResourceGovernor.stage(stage_name):
+                return stage_func(**kwargs)
+        return run_stage
+
+    def get_pipeline_tasks(self) -> List[Task]:
+        """
+        This method of TrainPipeline class declares the pipeline as a DAG of stages, each task
+        consuming the artifacts named in its inputs and producing the artifact named by its output
+        """
+        return [
+            Task(name="data_ingestion", func=self.governed("data_ingestion", self.start_data_ingestion),
+                 output="data_ingestion_artifact"),
+            Task(name="data_validation", func=self.governed("data_validation", self.start_data_validation),
+                 inputs=["data_ingestion_artifact"], output="data_validation_artifact"),
+            Task(name="data_transformation", func=self.governed("data_transformation", self.start_data_transformation),
+                 inputs=["data_ingestion_artifact", "data_validation_artifact"], output="data_transformation_artifact"),
+            Task(name="data_resampling", func=self.governed("data_resampling", self.start_data_resampling),
+                 inputs=["data_transformation_artifact"], output="data_resampling_artifact"),
+            Task(name="model_tuner", func=self.governed("model_tuner", self.start_model_tuner),
+                 inputs=["data_transformation_artifact"], output="model_tuner_artifact"),
+            Task(name="model_trainer", func=self.governed("model_trainer", self.start_model_trainer),
+                 inputs=["data_transformation_artifact", "data_resampling_artifact", "model_tuner_artifact"],
+                 output="model_trainer_artifact"),
+            Task(name="model_evaluation", func=self.governed("model_evaluation", self.start_model_evaluation),
+                 inputs=["data_transformation_artifact", "model_trainer_artifact"], output="model_evaluation_artifact"),
+            Task(name="model_pusher", func=self.governed("model_pusher", self.start_model_pusher_if_accepted),
+                 inputs=["model_evaluation_artifact"], output="model_pusher_artifact"),
+        ]
+
     def run_pipeline(self, ) -> None:
         """
         This method of TrainPipeline class is responsible for running complete pipeline
         """
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-            model_evaluation_artifact = self.start_model_evaluation(data_transformation_artifact=data_transformation_artifact,
-                                                                    model_trainer_artifact=model_trainer_artifact)
-            if not model_evaluation_artifact.is_model_accepted:
-                logging.info(f"Model not accepted.")
-                return None
-            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+            ResourceGovernor.configure(self.resource_governor_config)
+            executor = DAGExecutor(name="train_pipeline", max_workers=self.pipeline_executor_config.max_workers,
+                                   on_ready=ResourceGovernor.plan)
+            executor.run(self.get_pipeline_tasks())
+            executor.save_report(self.pipeline_executor_config.timings_file_path)
+            self.stage_cache.save_report()
+            ResourceGovernor.save_report(self.resource_governor_config.report_file_path)
         except Exception as e:
             raise VehicleInsuranceException(e, sys)
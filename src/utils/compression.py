@@ -0,0 +1,93 @@
+import gzip
+import io
+from contextlib import contextmanager
+from typing import Optional
+
+CODECS = ("none", "zstd", "lz4", "gzip")
+# leading bytes of a compressed stream; anything else, e.g. a plain pickle, is read uncompressed
+MAGIC_NUMBERS = {"zstd": b"\x28\xb5\x2f\xfd", "lz4": b"\x04\x22\x4d\x18", "gzip": b"\x1f\x8b"}
+# user metadata key of S3 objects recording the codec of their content
+CODEC_METADATA_KEY = "artifact-codec"
+
+
+def check_codec(codec: Optional[str]) -> str:
+    """
+    Validates a codec and imports the optional package it needs
+    codec: one of CODECS, None means none
+    return: the codec name
+    """
+    codec = codec or "none"
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported codec {codec}, expected one of {CODECS}")
+    package = {"zstd": "zstandard", "lz4": "lz4"}.get(codec)
+    if package is not None:
+        try:
+            __import__(package)
+        except ImportError as e:
+            raise ImportError(f"The {codec} codec needs the optional {package} package (pip install {package})") from e
+    return codec
+
+
+def sniff_codec(head: bytes) -> str:
+    """
+    Codec of a stream from its first bytes
+    head: at least the first 4 bytes of the stream
+    return: one of CODECS
+    """
+    for codec, magic in MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return codec
+    return "none"
+
+
+@contextmanager
+def compress_stream(file_obj, codec: Optional[str], level: Optional[int] = None):
+    """
+    Binary stream compressing what is written to it into file_obj, which is left open
+    codec: one of CODECS, None means none
+    level: compression level, the default of the codec when None
+    """
+    codec = check_codec(codec)
+    if codec == "none":
+        yield file_obj
+    elif codec == "zstd":
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        with compressor.stream_writer(file_obj, closefd=False) as stream:
+            yield stream
+    elif codec == "lz4":
+        import lz4.frame
+        with lz4.frame.LZ4FrameFile(file_obj, mode="wb", compression_level=level or 0) as stream:
+            yield stream
+    else:
+        with gzip.GzipFile(fileobj=file_obj, mode="wb", compresslevel=6 if level is None else level) as stream:
+            yield stream
+
+
+@contextmanager
+def decompress_stream(file_obj, codec: Optional[str] = None):
+    """
+    Buffered binary stream of the decompressed content of file_obj, which is left open
+    codec: one of CODECS, sniffed from the first bytes when None. Sniffing needs a file_obj with
+           peek, like files opened in "rb" mode and io.BufferedReader, or a seekable one like an mmap
+    """
+    if codec is None and hasattr(file_obj, "peek"):
+        codec = sniff_codec(file_obj.peek(4)[:4])
+    elif codec is None:
+        position = file_obj.tell()
+        codec = sniff_codec(file_obj.read(4))
+        file_obj.seek(position)
+    codec = check_codec(codec)
+    if codec == "none":
+        yield file_obj
+    elif codec == "zstd":
+        import zstandard
+        with zstandard.ZstdDecompressor().stream_reader(file_obj, closefd=False) as reader:
+            yield io.BufferedReader(reader)
+    elif codec == "lz4":
+        import lz4.frame
+        with lz4.frame.LZ4FrameFile(file_obj, mode="rb") as stream:
+            yield stream
+    else:
+        with gzip.GzipFile(fileobj=file_obj, mode="rb") as stream:
+            yield stream
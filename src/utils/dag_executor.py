@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import threading
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from src.constants.constant import PIPELINE_EXECUTOR_MAX_WORKERS
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+
+@dataclass
+class Task:
+    """
+    A unit of work in a DAG. The task runs `func` with one keyword argument per declared input,
+    and its return value is published under `output` (defaults to the task name).
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: List[str] = field(default_factory=list)
+    output: Optional[str] = None
+
+    def __post_init__(self):
+        if self.output is None:
+            self.output = self.name
+
+
+@dataclass
+class TaskTiming:
+    name: str
+    start: float
+    end: float
+    seconds: float
+    thread: str
+
+
+class DAGExecutor:
+    """
+    Runs a DAG of tasks on a bounded thread pool. A task is submitted as soon as every output it
+    declares as an input is available, so independent tasks overlap. Per-task timings are
+    recorded and the critical path (the longest chain of dependent tasks) is derived from them.
+    `on_ready`, when given, is called with the names of the tasks that became ready together, before
+    they are submitted, e.g. to split resources among them.
+    """
+
+    def __init__(self, name: str, max_workers: int = PIPELINE_EXECUTOR_MAX_WORKERS,
+                 on_ready: Optional[Callable[[List[str]], None]] = None):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.on_ready = on_ready
+        self.timings: Dict[str, TaskTiming] = {}
+        self._tasks: Dict[str, Task] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    @staticmethod
+    def _check_graph(tasks: List[Task], available: set) -> None:
+        """Validates that outputs are unique, every input is produced somewhere and there is no cycle."""
+        producers = {}
+        for task in tasks:
+            if task.output in producers or task.output in available:
+                raise ValueError(f"Output [{task.output}] is produced more than once")
+            producers[task.output] = task
+
+        for task in tasks:
+            for input_name in task.inputs:
+                if input_name not in producers and input_name not in available:
+                    raise ValueError(f"Task [{task.name}] depends on unknown input [{input_name}]")
+
+        resolved = set(available)
+        remaining = list(tasks)
+        while remaining:
+            ready = [task for task in remaining if all(name in resolved for name in task.inputs)]
+            if not ready:
+                raise ValueError(f"Cycle detected between tasks: {[task.name for task in remaining]}")
+            for task in ready:
+                resolved.add(task.output)
+                remaining.remove(task)
+
+    def _run_task(self, task: Task, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return task.func(**kwargs)
+        finally:
+            end = time.perf_counter()
+            self.timings[task.name] = TaskTiming(
+                name=task.name,
+                start=round(start - self._started_at, 4),
+                end=round(end - self._started_at, 4),
+                seconds=round(end - start, 4),
+                thread=threading.current_thread().name,
+            )
+
+    def run(self, tasks: List[Task], initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Method Name :   run
+        Description :   Executes the tasks respecting their declared inputs, running independent tasks concurrently
+
+        Output      :   Returns a dictionary with every task output (plus the initial values)
+        On Failure  :   Cancels the tasks not yet started and raises the first task exception
+        """
+        try:
+            results: Dict[str, Any] = dict(initial or {})
+            self._check_graph(tasks, set(results))
+            self._tasks = {task.name: task for task in tasks}
+            self._started_at = time.perf_counter()
+
+            pending = list(tasks)
+            running = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+                while pending or running:
+                    ready = [task for task in pending if all(name in results for name in task.inputs)]
+                    if ready and self.on_ready is not None:
+                        self.on_ready([task.name for task in ready])
+                    for task in ready:
+                        pending.remove(task)
+                        kwargs = {name: results[name] for name in task.inputs}
+                        running[pool.submit(self._run_task, task, kwargs)] = task
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        error = future.exception()
+                        if error is not None:
+                            for other in running:
+                                other.cancel()
+                            raise error
+                        results[task.output] = future.result()
+
+            self._finished_at = time.perf_counter()
+            self.log_report()
+            return results
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    def critical_path(self) -> List[str]:
+        """
+        Returns the names of the tasks on the longest dependency chain, weighted by measured durations.
+        """
+        producers = {task.output: task.name for task in self._tasks.values()}
+        longest: Dict[str, tuple] = {}
+        previous: Dict[str, Optional[str]] = {}
+
+        def visit(name: str) -> tuple:
+            # (seconds, number of tasks) so that zero-length tasks still extend the chain
+            if name not in longest:
+                parents = [producers[input_name] for input_name in self._tasks[name].inputs if input_name in producers]
+                best_parent = max(parents, key=visit, default=None)
+                previous[name] = best_parent
+                own = self.timings[name].seconds if name in self.timings else 0.0
+                seconds, length = visit(best_parent) if best_parent else (0.0, 0)
+                longest[name] = (seconds + own, length + 1)
+            return longest[name]
+
+        if not self._tasks:
+            return []
+        path = []
+        node = max(self._tasks, key=visit)
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return list(reversed(path))
+
+    def report(self) -> dict:
+        """
+        Returns the task timings, total wall time and critical path of the last run.
+        """
+        wall_time = (self._finished_at or time.perf_counter()) - (self._started_at or time.perf_counter())
+        critical_path = self.critical_path()
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "wall_seconds": round(wall_time, 4),
+            "critical_path": critical_path,
+            "critical_path_seconds": round(sum(self.timings[name].seconds for name in critical_path if name in self.timings), 4),
+            "tasks": {name: asdict(timing) for name, timing in self.timings.items()},
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        logging.info(
+            f"[{self.name}] finished in {report['wall_seconds']}s on {self.max_workers} workers, "
+            f"critical path: {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']}s)"
+        )
+
+    def save_report(self, file_path: str) -> dict:
+        """
+        Writes the report of the last run as JSON to file_path.
+        """
+        try:
+            report = self.report()
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as report_file:
+                json.dump(report, report_file, indent=4)
+            return report
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
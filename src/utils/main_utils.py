@@ -8,8 +8,10 @@ from sklearn.metrics import recall_score
 
 from src.exception.exception import VehicleInsuranceException
 from src.logging.logger import logging
+from src.utils.compression import compress_stream, decompress_stream
 #from src.constants.constant import SCHEMA_FILE_PATH
 import numpy as np
+from typing import Optional, Tuple
 #mport pickle
 
 
@@ -28,34 +30,27 @@ def read_yaml_file(file_path: str) -> dict:
         raise VehicleInsuranceException(e, os)
 
 
-def save_object(file_path: str, obj: object) -> None:
+def save_object(file_path: str, obj: object, codec: Optional[str] = "none", level: Optional[int] = None) -> None:
+    """
+    Save object to file with dill
+    file_path: str location of file to save
+    obj: object to pickle
+    codec: compression of the file, one of utils.compression.CODECS, streamed while pickling
+    level: compression level, the default of the codec when None
+    """
     logging.info("Entered the save_object method of utils")
 
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, "wb") as file_object:
-            dill.dump(obj, file_object)
+            with compress_stream(file_object, codec, level) as stream:
+                dill.dump(obj, stream)
 
         logging.info("Exited the save_object method of utils")
     except Exception as e:
         raise VehicleInsuranceException(e, sys) from e
 
 
-def save_numpy_array_data(file_path: str, array: np.array):
-    """
-    Save numpy array data to file
-    file_path: str location of file to save
-    array: np.array data to save
-    """
-    try:
-        dir_path = os.path.dirname(file_path)
-        os.makedirs(dir_path, exist_ok=True)
-        with open(file_path, "wb") as file_object:
-            np.save(file_object, array)
-    except Exception as e:
-        raise VehicleInsuranceException(e, sys) from e
-
-
 def applysmote(X, y):
         """
         Applies SMOTE to balance the dataset by oversampling the minority class.
@@ -73,44 +68,81 @@ def applysmote(X, y):
 def load_object(file_path: str) -> object:
     """
     Returns model/object from project directory.
-    file_path: str location of file to load
+    file_path: str location of file to load, its codec is sniffed from the first bytes
     return: Model/Obj
     """
     try:
         with open(file_path, "rb") as file_obj:
-            obj = dill.load(file_obj)
+            with decompress_stream(file_obj) as stream:
+                obj = dill.load(stream)
         return obj
     except Exception as e:
         raise VehicleInsuranceException(e, sys)
 
-def save_numpy_array_data(file_path: str, array: np.array):
+def save_numpy_array_data(file_path: str, array: np.array, column_major: bool = False):
     """
     Save numpy array data to file
     file_path: str location of file to save
     array: np.array data to save
+    column_major: store the array in Fortran order, so each column is contiguous on disk
     """
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
+        if column_major:
+            array = np.asfortranarray(array)
         with open(file_path, 'wb') as file_obj:
             np.save(file_obj, array)
     except Exception as e:
         raise VehicleInsuranceException(e, sys) from e
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: None reads the whole file into memory; "r" maps it read-only, so only the pages
+               actually touched are read and every process mapping the file shares the page cache
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
         raise VehicleInsuranceException(e, sys) from e
 
 
+def split_features_target(array: np.array) -> Tuple[np.array, np.array]:
+    """
+    split a transformed array into its feature and target parts
+    array: np.array with the target in the last column
+    return: (features, target) views; slicing never copies, so for a memory-mapped array both stay
+            backed by the file. A column-major array gives a column-major feature view
+    """
+    return array[:, :-1], array[:, -1]
+
+
+def load_features_target(file_path: str, target_file_path: Optional[str] = None,
+                         mmap_mode: Optional[str] = None) -> Tuple[np.array, np.array]:
+    """
+    load the features and target of a transformed dataset
+    file_path: str location of the feature file
+    target_file_path: location of the separate target vector of the compact layout; when None the
+                      target is read from the last column of the feature file
+    mmap_mode: passed on to load_numpy_array_data
+    return: (features, target)
+    """
+    try:
+        array = load_numpy_array_data(file_path, mmap_mode=mmap_mode)
+        if target_file_path is None:
+            return split_features_target(array)
+        return array, load_numpy_array_data(target_file_path, mmap_mode=mmap_mode)
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
+
+
 def evaluate_model(x_train,y_train,x_test, y_test, models, param):
     try:
         report = {}
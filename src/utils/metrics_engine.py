@@ -0,0 +1,127 @@
+import os
+import sys
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.entity.artifact_entity import ClassificationMetricArtifact
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+
+class MetricsEngine:
+    """
+    Shared prediction and metrics code of the trainer and the evaluator.
+
+    A model is run over a dataset once: `predict` takes the class probabilities and derives the labels
+    from them, and `save_predictions` keeps both next to the artifact of the stage that computed them,
+    so later stages reuse them instead of predicting again. Every metric of a binary classifier comes
+    from one confusion matrix, counted in a single bincount pass over the labels.
+    """
+
+    @staticmethod
+    def predict(model: object, x: np.array) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Method Name :   predict
+        Description :   Predicts the labels and, when the model has predict_proba, the class probabilities
+                        in one inference pass. Labels are the classes of highest probability, which is
+                        how RandomForestClassifier and HistGradientBoostingClassifier predict too
+
+        Output      :   Returns (labels, probabilities or None)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if not hasattr(model, "predict_proba"):
+                return np.asarray(model.predict(x)), None
+            probabilities = model.predict_proba(x)
+            return model.classes_[np.argmax(probabilities, axis=1)], probabilities
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def save_predictions(file_path: str, predictions: np.ndarray, probabilities: Optional[np.ndarray]) -> None:
+        """Keeps the labels and probabilities of a prediction pass for later stages."""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            arrays = {"predictions": predictions}
+            if probabilities is not None:
+                arrays["probabilities"] = probabilities
+            with open(file_path, "wb") as file_obj:
+                np.savez(file_obj, **arrays)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def load_predictions(file_path: Optional[str],
+                         n_rows: int) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        Method Name :   load_predictions
+        Description :   Loads the labels and probabilities saved by save_predictions
+
+        Output      :   Returns (labels, probabilities or None), or None when there is no file or it was
+                        computed on a dataset of another length
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if not file_path or not os.path.isfile(file_path):
+                return None
+            with np.load(file_path) as saved:
+                predictions = saved["predictions"]
+                probabilities = saved["probabilities"] if "probabilities" in saved.files else None
+            if len(predictions) != n_rows:
+                logging.info(f"Cached predictions [{file_path}] have {len(predictions)} rows, expected {n_rows}")
+                return None
+            return predictions, probabilities
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @staticmethod
+    def confusion_matrix(y_true: np.array, y_pred: np.array) -> np.ndarray:
+        """
+        Counts [[tn, fp], [fn, tp]] of binary labels in a single bincount pass, each pair of
+        labels is mapped to one of four cells as 2 * true + predicted.
+        """
+        cells = 2 * np.asarray(y_true, dtype=np.intp) + np.asarray(y_pred, dtype=np.intp)
+        return np.bincount(cells, minlength=4).reshape(2, 2)
+
+    @classmethod
+    def classification_metrics(cls, y_true: np.array, y_pred: np.array) -> ClassificationMetricArtifact:
+        """
+        Method Name :   classification_metrics
+        Description :   Derives accuracy, precision, recall and F1 of the positive class from the
+                        confusion matrix. Ratios without a denominator are 0, as in sklearn
+
+        Output      :   Returns the metric artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            (tn, fp), (fn, tp) = cls.confusion_matrix(y_true, y_pred)
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / (tp + fn) if tp + fn else 0.0
+            f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0
+            accuracy = (tp + tn) / (tn + fp + fn + tp) if tn + fp + fn + tp else 0.0
+            return ClassificationMetricArtifact(f1_score=float(f1), precision_score=float(precision),
+                                                recall_score=float(recall), accuracy_score=float(accuracy))
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @classmethod
+    def oob_accuracy(cls, model: object, y_train: np.array) -> Optional[float]:
+        """
+        Method Name :   oob_accuracy
+        Description :   Accuracy of the out-of-bag predictions a bagged model computed while fitting, an
+                        estimate of held-out accuracy that costs no inference pass. Rows no tree left out
+                        are skipped
+
+        Output      :   Returns the accuracy, or None when the model has no out-of-bag predictions
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            oob_decision = getattr(model, "oob_decision_function_", None)
+            if oob_decision is None:
+                return None
+            scored = ~np.isnan(oob_decision).any(axis=1)
+            oob_predictions = model.classes_[np.argmax(oob_decision[scored], axis=1)]
+            return cls.classification_metrics(np.asarray(y_train)[scored], oob_predictions).accuracy_score
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
@@ -0,0 +1,91 @@
+import sys
+from typing import Optional
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from threadpoolctl import threadpool_limits
+
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+# estimator class of every model backend the trainer and the tuner can build
+MODEL_BACKENDS = {
+    "random_forest": RandomForestClassifier,
+    "hist_gradient_boosting": HistGradientBoostingClassifier,
+}
+
+# categories a HistGradientBoostingClassifier column may have, one bin is kept for missing values
+MAX_CATEGORIES = 255
+
+# ColumnTransformer steps of the preprocessor whose output columns are category codes
+CATEGORICAL_TRANSFORMERS = ("ordinal", "onehot")
+
+
+def get_model_class(backend: str) -> type:
+    """
+    Returns the estimator class of a model backend
+    backend: str name of the backend, one of MODEL_BACKENDS
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend [{backend}], expected one of {tuple(MODEL_BACKENDS)}")
+    return MODEL_BACKENDS[backend]
+
+
+def get_categorical_features(backend: str, preprocessing_obj: object,
+                             x: Optional[np.array] = None) -> Optional[np.ndarray]:
+    """
+    Marks the transformed columns holding category codes, for backends that split on categories natively
+    backend: str name of the backend
+    preprocessing_obj: fitted preprocessing pipeline, its feature names are prefixed with the step name
+    x: training features; when given, columns that no longer hold whole codes below MAX_CATEGORIES, e.g. after
+       SMOTE interpolated between rows, are left numerical
+    return: boolean mask over the transformed columns, or None when the backend has no categorical support
+    """
+    try:
+        if backend != "hist_gradient_boosting":
+            return None
+        feature_names = preprocessing_obj.get_feature_names_out()
+        mask = np.array([name.split("__")[0] in CATEGORICAL_TRANSFORMERS for name in feature_names])
+        if x is not None:
+            for column in np.flatnonzero(mask):
+                values = np.asarray(x[:, column])
+                if not np.array_equal(values, np.round(values)) or values.max(initial=0) >= MAX_CATEGORIES:
+                    logging.info(f"Column [{feature_names[column]}] does not hold category codes, "
+                                 f"it is treated as numerical")
+                    mask[column] = False
+        return mask
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
+
+
+def build_model(backend: str, params: dict, categorical_features: Optional[np.ndarray] = None) -> object:
+    """
+    Builds an unfitted model of a backend
+    backend: str name of the backend
+    params: estimator parameters
+    categorical_features: mask from get_categorical_features, ignored by backends without categorical support
+    return: the estimator
+    """
+    try:
+        model_class = get_model_class(backend)
+        if backend == "hist_gradient_boosting" and categorical_features is not None:
+            params = {**params, "categorical_features": categorical_features}
+        return model_class(**params)
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
+
+
+def fit_model(model: object, x: np.array, y: np.array, n_jobs: int) -> object:
+    """
+    Fits a model on n_jobs cores. Estimators with an n_jobs parameter get it set, the others
+    (HistGradientBoostingClassifier) run on OpenMP threads, which are limited for the duration of the fit
+    return: the fitted model
+    """
+    try:
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=n_jobs)
+            return model.fit(x, y)
+        with threadpool_limits(limits=n_jobs, user_api="openmp"):
+            return model.fit(x, y)
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
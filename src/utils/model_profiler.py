@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+from typing import Optional
+
+import numpy as np
+from joblib import parallel_config
+
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+from src.utils.main_utils import load_object
+
+
+def estimate_memory_bytes(obj: object, seen: Optional[dict] = None) -> int:
+    """
+    Bytes held by the numpy arrays reachable from an object, through containers, attributes and the
+    state of extension types. sklearn keeps tree nodes in C buffers only exposed through __getstate__,
+    which allocation tracing does not see, so the footprint is summed from the arrays themselves
+    """
+    # visited objects are kept referenced, so the id of a temporary __getstate__ result is never reused
+    seen = {} if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return 0
+    if isinstance(obj, dict):
+        return sum(estimate_memory_bytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sum(estimate_memory_bytes(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return estimate_memory_bytes(vars(obj), seen)
+    if hasattr(obj, "__getstate__") and type(obj).__module__.startswith("sklearn"):
+        return estimate_memory_bytes(obj.__getstate__(), seen)
+    return 0
+
+
+def profile_model(model_file_path: str, x: np.array, single_row_samples: int = 100, batch_size: int = 1000,
+                  batch_repeats: int = 5) -> dict:
+    """
+    Measures the serving cost of a saved model on transformed features
+    model_file_path: str location of the saved MyModel
+    x: transformed features to predict, rows are taken from the start
+    single_row_samples: one row predictions timed for the single row latency percentiles
+    batch_size: rows of the timed batch prediction, the median of batch_repeats runs is reported
+    return: serialized size and loaded memory in MB, single row p50/p99 and batch latency in ms.
+            Memory is the array footprint of the loaded model, see estimate_memory_bytes. Predictions
+            run on one core, the way a serving worker runs them
+    """
+    try:
+        model = load_object(model_file_path)
+        memory_bytes = estimate_memory_bytes(model)
+        estimator = model.trained_model_object
+
+        with parallel_config(n_jobs=1):
+            rows = np.asarray(x[:single_row_samples])
+            single_row_seconds = []
+            for row in rows:
+                start_time = time.perf_counter()
+                estimator.predict(row.reshape(1, -1))
+                single_row_seconds.append(time.perf_counter() - start_time)
+            batch = np.asarray(x[:batch_size])
+            batch_seconds = []
+            for _ in range(batch_repeats):
+                start_time = time.perf_counter()
+                estimator.predict(batch)
+                batch_seconds.append(time.perf_counter() - start_time)
+
+        profile = {
+            "model_size_mb": round(os.path.getsize(model_file_path) / 1024 ** 2, 4),
+            "memory_mb": round(memory_bytes / 1024 ** 2, 4),
+            "single_row_p50_ms": round(float(np.percentile(single_row_seconds, 50)) * 1000, 4),
+            "single_row_p99_ms": round(float(np.percentile(single_row_seconds, 99)) * 1000, 4),
+            "batch_rows": len(batch),
+            "batch_ms": round(float(np.median(batch_seconds)) * 1000, 4),
+        }
+        logging.info(f"Profile of {type(estimator).__name__} [{model_file_path}]: {profile}")
+        return profile
+    except Exception as e:
+        raise VehicleInsuranceException(e, sys) from e
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
+
+from src.entity.config_entity import ResourceGovernorConfig
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+
+
+class ResourceGovernor:
+    """
+    Pipeline-wide CPU budget shared by every stage of a run.
+
+    The governor is configured once per pipeline run and keeps its state on the class, so components
+    ask it for worker counts without it being threaded through their constructors. Stages that become
+    ready together, e.g. parallel branches of the pipeline DAG, are given even shares of the free cores
+    by `plan()`. A stage entering `stage()` is allotted its share, or every free core when it has none,
+    and waits while no core is free, so the allotments never add up to more cores than exist. Inside
+    the stage `n_jobs()` caps the worker counts of sklearn, imblearn and the tuner's process pool to that
+    allotment. joblib's default `n_jobs` follows the allotment too, for estimators not given one
+    explicitly. BLAS thread pools are process wide, so they are limited once per run; with one BLAS
+    thread per worker, parallel stages never multiply their workers by BLAS threads.
+    """
+
+    _config: ResourceGovernorConfig = ResourceGovernorConfig()
+    _lock = threading.Lock()
+    _released = threading.Condition(_lock)
+    _allocated: Dict[str, int] = {}
+    _shares: Dict[str, int] = {}
+    _report: Dict[str, dict] = {}
+    _blas_limiter: Optional[threadpool_limits] = None
+    _local = threading.local()
+
+    @classmethod
+    def configure(cls, resource_governor_config: ResourceGovernorConfig) -> None:
+        """
+        Method Name :   configure
+        Description :   Sets the CPU budget of a pipeline run, resets the per-stage report and limits the
+                        BLAS thread pools
+
+        Output      :   None
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            with cls._lock:
+                cls._config = resource_governor_config
+                cls._allocated = {}
+                cls._shares = {}
+                cls._report = {}
+                if cls._blas_limiter is not None:
+                    cls._blas_limiter.restore_original_limits()
+                cls._blas_limiter = threadpool_limits(limits=resource_governor_config.blas_threads, user_api="blas")
+            logging.info(f"Resource governor: {cls.total_cores()} cores for the pipeline "
+                         f"({resource_governor_config.reserved_cores} reserved for serving), "
+                         f"{resource_governor_config.blas_threads} BLAS thread(s) per worker")
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
+
+    @classmethod
+    def total_cores(cls) -> int:
+        """Cores the pipeline may use, after the ones reserved for serving."""
+        return max(1, cls._config.total_cores - cls._config.reserved_cores)
+
+    @classmethod
+    def free_cores(cls) -> int:
+        """Cores not allotted to a running stage, the caller holds the lock."""
+        return cls.total_cores() - sum(cls._allocated.values())
+
+    @classmethod
+    def plan(cls, stage_names: List[str]) -> None:
+        """
+        Splits the free cores evenly among stages that became ready together, so the first one to start
+        does not take every core from the others. Used as the on_ready hook of the pipeline DAGExecutor
+        """
+        if not stage_names:
+            return
+        with cls._lock:
+            free = cls.free_cores()
+            share, remainder = divmod(free, len(stage_names))
+            shares = {stage_name: max(1, share + (index < remainder)) for index, stage_name in enumerate(stage_names)}
+            cls._shares.update(shares)
+        logging.info(f"Resource governor: {free} free core(s) split as {shares}")
+
+    @classmethod
+    def blas_threads(cls) -> int:
+        """BLAS threads per worker, for worker processes that have to apply the limit themselves."""
+        return cls._config.blas_threads
+
+    @classmethod
+    def allotted_cores(cls) -> int:
+        """Cores of the stage running in the calling thread, or every pipeline core outside of a stage."""
+        return getattr(cls._local, "cores", None) or cls.total_cores()
+
+    @classmethod
+    def n_jobs(cls, requested: Optional[int] = None) -> int:
+        """
+        Resolves a joblib style worker count (None or -1 for all, -2 for all but one, ...) against the
+        cores allotted to the current stage.
+        """
+        allotted = cls.allotted_cores()
+        if requested is None or requested == -1:
+            return allotted
+        if requested < 0:
+            return max(1, allotted + 1 + requested)
+        return max(1, min(requested, allotted))
+
+    @staticmethod
+    def _cpu_seconds() -> float:
+        """CPU time of this process and its waited-for children, e.g. a shut down process pool."""
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    @classmethod
+    @contextmanager
+    def stage(cls, stage_name: str) -> Iterator[int]:
+        """
+        Method Name :   stage
+        Description :   Allots cores to a stage for its duration and records the cores given and the CPU
+                        utilization reached. The stage gets its planned share of the free cores, all of
+                        them when it was not planned, and waits for a running stage to finish while no
+                        core is free. Stages must not nest while waiting, a stage never gives back cores
+                        before it ends. Utilization is process wide, so stages overlapping in time
+                        share the CPU time measured during the overlap
+
+        Output      :   Yields the number of cores allotted
+        """
+        with cls._released:
+            while cls.free_cores() < 1:
+                cls._released.wait()
+            free = cls.free_cores()
+            cores = min(cls._shares.pop(stage_name, free), free)
+            cls._allocated[stage_name] = cores
+        previous_cores = getattr(cls._local, "cores", None)
+        cls._local.cores = cores
+        start_time, start_cpu = time.perf_counter(), cls._cpu_seconds()
+        try:
+            with parallel_config(n_jobs=cores):
+                yield cores
+        finally:
+            seconds = time.perf_counter() - start_time
+            cpu_seconds = cls._cpu_seconds() - start_cpu
+            utilization = cpu_seconds / (seconds * cores) if seconds > 0 else 0.0
+            cls._local.cores = previous_cores
+            with cls._released:
+                cls._allocated.pop(stage_name, None)
+                cls._released.notify_all()
+                cls._report[stage_name] = {
+                    "cores": cores,
+                    "blas_threads": cls._config.blas_threads,
+                    "seconds": round(seconds, 4),
+                    "cpu_seconds": round(cpu_seconds, 4),
+                    "cpu_utilization": round(utilization, 4),
+                }
+            logging.info(f"Stage [{stage_name}] ran on {cores} core(s) for {seconds:.3f}s "
+                         f"at {utilization:.0%} CPU utilization")
+
+    @classmethod
+    def report(cls) -> Dict[str, dict]:
+        """Returns the cores and CPU utilization recorded for every stage of the run."""
+        with cls._lock:
+            return {stage_name: dict(entry) for stage_name, entry in cls._report.items()}
+
+    @classmethod
+    def save_report(cls, file_path: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Method Name :   save_report
+        Description :   Writes the per-stage cores and CPU utilization next to the run artifacts
+
+        Output      :   Returns the report dictionary
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            file_path = file_path or cls._config.report_file_path
+            report = {"total_cores": cls.total_cores(), "reserved_cores": cls._config.reserved_cores,
+                      "stages": cls.report()}
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as report_file:
+                json.dump(report, report_file, indent=4)
+            return report
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys) from e
@@ -0,0 +1,146 @@
+import sys
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.constants.constant import SCHEMA_FILE_PATH, SCHEMA_READ_CHUNK_SIZE
+from src.exception.exception import VehicleInsuranceException
+from src.logging.logger import logging
+from src.utils.main_utils import read_yaml_file
+
+INTEGER_DTYPES = [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32, np.int64]
+# float32 represents every integer up to 2**24 exactly, beyond that keep float64
+FLOAT32_SAFE_MAGNITUDE = 2 ** 24
+
+
+class SchemaCompiler:
+    """
+    Compiles schema.yaml into explicit, memory-compact pandas dtypes.
+
+    Integer columns get the narrowest integer dtype covering their declared range in `column_ranges`,
+    float columns become float32 when their range is exactly representable, and categorical columns
+    become a `Categorical` with the fixed category set from `categorical_domains`.
+    """
+
+    def __init__(self, schema_file_path: str = SCHEMA_FILE_PATH):
+        try:
+            self._schema_config = read_yaml_file(file_path=schema_file_path)
+            self.dtypes = self.compile()
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    @staticmethod
+    def _narrowest_integer_dtype(low: int, high: int) -> np.dtype:
+        for dtype in INTEGER_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+
+    def compile(self) -> Dict[str, object]:
+        """
+        Method Name :   compile
+        Description :   Turns the column types declared in the schema into pandas dtypes
+
+        Output      :   Returns a dictionary of column name to dtype
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            column_ranges = self._schema_config.get("column_ranges", {})
+            domains = self._schema_config.get("categorical_domains", {})
+            dtypes = {}
+            for column in self._schema_config["columns"]:
+                (name, declared_type), = column.items()
+                value_range = column_ranges.get(name)
+                if declared_type == "int":
+                    dtypes[name] = (self._narrowest_integer_dtype(*value_range)
+                                    if value_range else np.dtype(np.int64))
+                elif declared_type == "float":
+                    safe = value_range is not None and max(abs(v) for v in value_range) <= FLOAT32_SAFE_MAGNITUDE
+                    dtypes[name] = np.dtype(np.float32) if safe else np.dtype(np.float64)
+                elif name in domains:
+                    dtypes[name] = pd.CategoricalDtype(categories=domains[name])
+                else:
+                    dtypes[name] = np.dtype(object)
+            return dtypes
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Method Name :   apply
+        Description :   Casts the schema columns of a dataframe to their compiled dtypes. Integer values are
+                        range checked first, since numpy would silently wrap values that do not fit, and
+                        categorical values outside the declared domain are rejected instead of becoming NaN
+
+        Output      :   Returns the dataframe with compact dtypes
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            casts = {}
+            for name, dtype in self.dtypes.items():
+                if name not in df.columns or df[name].dtype == dtype:
+                    continue
+                if isinstance(dtype, np.dtype) and dtype.kind in "iu":
+                    column = df[name]
+                    if column.isna().any():
+                        raise ValueError(f"Integer column [{name}] contains missing values")
+                    info = np.iinfo(dtype)
+                    if column.min() < info.min or column.max() > info.max:
+                        raise ValueError(f"Column [{name}] has values outside the {dtype} range declared in the schema")
+                casts[name] = dtype
+            if not casts:
+                return df
+            typed = df.astype(casts)
+            for name, dtype in casts.items():
+                if isinstance(dtype, pd.CategoricalDtype) and typed[name].count() != df[name].count():
+                    unseen = sorted(map(str, df[name][typed[name].isna() & df[name].notna()].unique()))
+                    raise ValueError(f"Categorical column [{name}] has values outside the domain declared "
+                                     f"in the schema: {unseen}")
+            return typed
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    def iter_csv(self, file_path: str, chunksize: int = SCHEMA_READ_CHUNK_SIZE, **kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Method Name :   iter_csv
+        Description :   Streams a CSV file as typed chunks. Floats are parsed directly; integers are parsed
+                        as int64 and categoricals with inferred categories, then cast per chunk after the
+                        range and domain checks
+
+        Output      :   Yields dataframes of at most chunksize rows with compact dtypes
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            parse_dtypes = {name: "category" if isinstance(dtype, pd.CategoricalDtype) else dtype
+                            for name, dtype in self.dtypes.items()
+                            if not (isinstance(dtype, np.dtype) and dtype.kind in "iu")}
+            for chunk in pd.read_csv(file_path, dtype=parse_dtypes, chunksize=chunksize, **kwargs):
+                yield self.apply(chunk)
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    def read_csv(self, file_path: str, chunksize: int = SCHEMA_READ_CHUNK_SIZE) -> pd.DataFrame:
+        """
+        Method Name :   read_csv
+        Description :   Reads a CSV file straight into compact dtypes, chunk by chunk so that the wide
+                        int64 parse of integer columns never exists for the whole file
+
+        Output      :   Returns the typed dataframe
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            chunks = list(self.iter_csv(file_path, chunksize=chunksize))
+            if not chunks:
+                return self.apply(pd.read_csv(file_path))
+            return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        except Exception as e:
+            raise VehicleInsuranceException(e, sys)
+
+    @staticmethod
+    def log_memory_usage(df: pd.DataFrame, label: str) -> int:
+        """Logs and returns the deep memory usage of a dataframe."""
+        memory_bytes = int(df.memory_usage(deep=True).sum())
+        logging.info(f"Memory usage of {label}: {memory_bytes / 1024 ** 2:.2f} MB")
+        return memory_bytes
@@ -1,7 +1,23 @@
 import unittest
 import sys
 import os
+import tempfile
 from src.pipeline.training_pipeline import TrainPipeline
+from src.pipeline.stage_cache import StageCache
+from src.utils.dag_executor import DAGExecutor, Task
+from src.utils.schema_compiler import SchemaCompiler
+from src.utils.resource_governor import ResourceGovernor
+from src.utils.metrics_engine import MetricsEngine
+from src.entity.config_entity import StageCacheConfig, DataValidationConfig
+from src.components.data_validation import DataValidation
+from src.components.data_transformation import DataTransformation
+from src.components.data_resampling import DataResampling
+from src.components.model_tuner import ModelTuner
+from src.components.model_trainer import ModelTrainer
+from src.entity.config_entity import DataTransformationConfig, DataResamplingConfig
+from src.entity.config_entity import ModelTunerConfig, ModelTrainerConfig, ResourceGovernorConfig
+from src.entity.artifact_entity import DataIngestionArtifact
+from src.entity.artifact_entity import DataValidationArtifact, DataTransformationArtifact
 from src.exception.exception import VehicleInsuranceException
 
 
@@ -61,5 +77,1097 @@ class TestTrainingPipeline(unittest.TestCase):
             self.fail(f"Pipeline integration test failed: {str(e)}")
 
 
+class TestStageCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a stage cache in a temporary directory.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_config = StageCacheConfig(
+            cache_dir=os.path.join(self.tmp_dir.name, "cache"),
+            report_file_path=os.path.join(self.tmp_dir.name, "report.json"),
+        )
+        self.report_path = os.path.join(self.tmp_dir.name, "report.yaml")
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _stage(self):
+        self.calls += 1
+        with open(self.report_path, "w") as report_file:
+            report_file.write("ok")
+        return DataValidationArtifact(validation_status=True, message="", validation_report_file_path=self.report_path)
+
+    def test_second_run_is_a_hit(self):
+        """
+        Test that an unchanged stage is restored from the cache instead of running again.
+        """
+        for _ in range(2):
+            cache = StageCache(stage_cache_config=self.cache_config)
+            artifact = cache.run(stage_name="validation", stage_func=self._stage,
+                                 artifact_cls=DataValidationArtifact, extra_key={"version": 1})
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.report["validation"]["hits"], 1)
+        self.assertTrue(artifact.validation_status)
+        self.assertTrue(os.path.exists(artifact.validation_report_file_path))
+
+    def test_changed_key_is_a_miss(self):
+        """
+        Test that a change in the key parts runs the stage again.
+        """
+        cache = StageCache(stage_cache_config=self.cache_config)
+        for version in (1, 2):
+            cache.run(stage_name="validation", stage_func=self._stage,
+                      artifact_cls=DataValidationArtifact, extra_key={"version": version})
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(cache.report["validation"]["misses"], 2)
+
+    def test_in_place_update_misses_the_export_cache(self):
+        """
+        Test that without dbHash an upsert changing a row in place, same _id and count, re-runs data ingestion.
+        """
+        import mongomock
+        import pandas as pd
+        from unittest import mock
+        from pymongo.errors import OperationFailure
+        from push_data import VehicleDataExtract
+        from src.components.data_ingestion import DataIngestion
+        from src.configuration.mongodb_connection import MongoDBClient
+        from src.entity.config_entity import DataLoaderConfig
+        previous_client, MongoDBClient.client = MongoDBClient.client, mongomock.MongoClient()
+        pipeline = TrainPipeline()
+        pipeline.stage_cache = StageCache(stage_cache_config=self.cache_config)
+        file_path = os.path.join(self.tmp_dir.name, "data.csv")
+
+        def ingest():
+            self.calls += 1
+            with open(file_path) as data_file, open(self.report_path, "w") as split_file:
+                split_file.write(data_file.read())
+            return DataIngestionArtifact(trained_file_path=self.report_path, test_file_path=self.report_path)
+
+        try:
+            data = pd.DataFrame({"id": range(100), "age": [i % 4 for i in range(100)]})
+            loader = VehicleDataExtract(DataLoaderConfig(
+                file_path=file_path, database_name="vehicle", mode="upsert",
+                collection_name=pipeline.data_ingestion_config.collection_name,
+                checkpoint_dir=os.path.join(self.tmp_dir.name, "ckpt")))
+            with mock.patch.object(mongomock.database.Database, "command",
+                                   side_effect=OperationFailure("dbHash is not allowed in this atlas tier")), \
+                    mock.patch.object(DataIngestion, "initiate_data_ingestion", side_effect=ingest):
+                for age in (0, 0, 9):
+                    data.loc[5, "age"] = age
+                    data.to_csv(file_path, index=False)
+                    loader.load_csv()
+                    pipeline.start_data_ingestion()
+        finally:
+            MongoDBClient.client = previous_client
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(pipeline.stage_cache.report["data_ingestion"], {"hits": 1, "misses": 2,
+                                                                         "key": mock.ANY, "seconds": mock.ANY})
+
+
+class TestDAGExecutor(unittest.TestCase):
+    def test_tasks_receive_declared_inputs(self):
+        """
+        Test that every task gets its inputs and the critical path follows the dependencies.
+        """
+        executor = DAGExecutor(name="test", max_workers=2)
+        results = executor.run([
+            Task(name="a", func=lambda: 1),
+            Task(name="b", func=lambda: 2),
+            Task(name="c", func=lambda a, b: a + b, inputs=["a", "b"]),
+        ])
+        self.assertEqual(results["c"], 3)
+        self.assertEqual(executor.critical_path()[-1], "c")
+        self.assertEqual(set(executor.timings), {"a", "b", "c"})
+
+    def test_critical_path_ties_prefer_the_longer_chain(self):
+        """
+        Test that of two paths with equal measured time, the critical path follows the one with more tasks.
+        """
+        executor = DAGExecutor(name="test", max_workers=2)
+        executor.run([
+            Task(name="short", func=lambda: 1),
+            Task(name="first", func=lambda: 1),
+            Task(name="second", func=lambda first: first, inputs=["first"]),
+            Task(name="third", func=lambda second: second, inputs=["second"]),
+            Task(name="final", func=lambda short, third: short + third, inputs=["short", "third"]),
+        ])
+        for name, seconds in {"short": 1.0, "first": 1.0, "second": 0.0, "third": 0.0, "final": 0.0}.items():
+            executor.timings[name].seconds = seconds
+        self.assertEqual(executor.critical_path(), ["first", "second", "third", "final"])
+
+    def test_cycle_is_rejected(self):
+        """
+        Test that a cyclic graph raises instead of hanging.
+        """
+        executor = DAGExecutor(name="test")
+        with self.assertRaises(VehicleInsuranceException):
+            executor.run([
+                Task(name="a", func=lambda b: b, inputs=["b"]),
+                Task(name="b", func=lambda a: a, inputs=["a"]),
+            ])
+
+
+class TestSchemaCompiler(unittest.TestCase):
+    def test_bundled_data_is_loaded_compact(self):
+        """
+        Test that the bundled CSV is read with narrow integers, float32 and fixed categories.
+        """
+        df = SchemaCompiler().read_csv(os.path.join("vehicle_data", "insurance_data.csv"))
+        self.assertEqual(str(df["age"].dtype), "int8")
+        self.assertEqual(str(df["credit_score"].dtype), "float32")
+        self.assertEqual(list(df["income"].cat.categories),
+                         ["middle class", "poverty", "upper class", "working class"])
+
+    def test_out_of_range_integers_are_rejected(self):
+        """
+        Test that integers outside the declared range raise instead of silently wrapping.
+        """
+        import pandas as pd
+        with self.assertRaises(VehicleInsuranceException):
+            SchemaCompiler().apply(pd.DataFrame({"age": [1, 300]}))
+
+    def test_unseen_categories_are_rejected(self):
+        """
+        Test that categorical values outside the declared domain raise and are named, instead of becoming NaN.
+        """
+        import pandas as pd
+        with self.assertRaises(VehicleInsuranceException) as context:
+            SchemaCompiler().apply(pd.DataFrame({"income": ["poverty", "gentry", None]}))
+        self.assertIn("income", str(context.exception))
+        self.assertIn("gentry", str(context.exception))
+
+
+class TestDataValidationEngine(unittest.TestCase):
+    def test_profile_reports_schema_violations(self):
+        """
+        Test that domain, range, dtype and duplicate id violations are all found in one pass.
+        """
+        import pandas as pd
+        df = pd.read_csv(os.path.join("vehicle_data", "insurance_data.csv"), nrows=100)
+        df["gender"] = df["gender"].astype(float)
+        df.loc[0, "income"] = "rich"
+        df.loc[1, "age"] = 9
+        df.loc[2, "gender"] = 0.5
+        df.loc[3, "id"] = df.loc[4, "id"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "data.csv")
+            df.to_csv(file_path, index=False)
+            data_validation = DataValidation(data_ingestion_artifact=None,
+                                             data_validation_config=DataValidationConfig(chunk_size=30))
+            profile = data_validation.profile_file(file_path, "test")
+
+        columns = profile["report"]["columns"]
+        self.assertEqual(profile["report"]["rows"], 100)
+        self.assertEqual(columns["income"]["unexpected_values"], ["rich"])
+        self.assertEqual(columns["age"]["range_violations"], 1)
+        self.assertEqual(columns["gender"]["dtype_violations"], 1)
+        self.assertEqual(profile["report"]["duplicate_ids"], 1)
+        self.assertNotEqual(profile["message"], "")
+
+
+class TestChunkedDataTransformation(unittest.TestCase):
+    def test_chunked_mode_matches_in_memory_fit(self):
+        """
+        Test that the streamed fit and memory-mapped transform give the same features as fit_transform.
+        """
+        import numpy as np
+        import pandas as pd
+        df = pd.read_csv(os.path.join("vehicle_data", "insurance_data.csv"), nrows=2000)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            train_path, test_path = os.path.join(tmp_dir, "train.csv"), os.path.join(tmp_dir, "test.csv")
+            df.iloc[:1500].to_csv(train_path, index=False)
+            df.iloc[1500:].to_csv(test_path, index=False)
+            config = DataTransformationConfig(
+                transformed_train_file_path=os.path.join(tmp_dir, "transformed", "train.npy"),
+                transformed_test_file_path=os.path.join(tmp_dir, "transformed", "test.npy"),
+                transformed_object_file_path=os.path.join(tmp_dir, "object", "preprocessing.pkl"),
+                transformed_train_target_file_path=os.path.join(tmp_dir, "transformed", "train_target.npy"),
+                transformed_test_target_file_path=os.path.join(tmp_dir, "transformed", "test_target.npy"),
+                chunked_mode=True,
+                chunk_size=400,
+            )
+            data_transformation = DataTransformation(
+                data_ingestion_artifact=DataIngestionArtifact(trained_file_path=train_path, test_file_path=test_path),
+                data_transformation_config=config,
+                data_validation_artifact=DataValidationArtifact(True, "", ""),
+            )
+            artifact = data_transformation.initiate_data_transformation()
+            train_features = np.load(artifact.transformed_train_file_path)
+            train_target = np.load(artifact.transformed_train_target_file_path)
+
+            input_feature_df, target = data_transformation.prepare_features(DataTransformation.read_data(train_path))
+            expected = data_transformation.get_data_transformer_object().fit_transform(input_feature_df)
+
+        self.assertTrue(np.allclose(train_features, expected))
+        self.assertTrue(np.array_equal(train_target, target.to_numpy()))
+        self.assertEqual((train_features.dtype, train_target.dtype), (np.float32, np.uint8))
+        self.assertEqual((artifact.feature_dtype, artifact.target_dtype), ("float32", "uint8"))
+
+
+class TestDataResampling(unittest.TestCase):
+    def test_random_over_sampling_balances_training_data(self):
+        """
+        Test that the resampling stage balances the classes and keeps the compact dtypes.
+        """
+        import numpy as np
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            features_path, target_path = os.path.join(tmp_dir, "train.npy"), os.path.join(tmp_dir, "train_target.npy")
+            np.save(features_path, rng.random((100, 4), dtype=np.float32))
+            np.save(target_path, np.r_[np.zeros(80), np.ones(20)].astype(np.uint8))
+            transformation_artifact = DataTransformationArtifact(
+                transformed_object_file_path="", transformed_train_file_path=features_path,
+                transformed_test_file_path="", feature_dtype="float32", target_dtype="uint8",
+                transformed_train_target_file_path=target_path,
+            )
+            config = DataResamplingConfig(
+                resampled_train_file_path=os.path.join(tmp_dir, "resampled", "train.npy"),
+                resampled_train_target_file_path=os.path.join(tmp_dir, "resampled", "train_target.npy"),
+                strategy="random_over",
+            )
+            artifact = DataResampling(transformation_artifact, config).initiate_data_resampling()
+            features = np.load(artifact.resampled_train_file_path)
+            target = np.load(artifact.resampled_train_target_file_path)
+
+        self.assertEqual(artifact.class_counts_before, {"0": 80, "1": 20})
+        self.assertEqual(artifact.class_counts_after, {"0": 80, "1": 80})
+        self.assertEqual((features.shape, features.dtype, target.dtype), ((160, 4), np.float32, np.uint8))
+
+    def test_unknown_strategy_is_rejected(self):
+        """
+        Test that an unknown resampling strategy fails when the stage is created.
+        """
+        with self.assertRaises(VehicleInsuranceException):
+            DataResampling(None, DataResamplingConfig(strategy="tomek"))
+
+
+class TestModelTuner(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a small separable dataset and search space in a temporary directory.
+        """
+        import numpy as np
+        import yaml
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        features = rng.random((1200, 4), dtype=np.float32)
+        self.features_path = os.path.join(self.tmp_dir, "train.npy")
+        self.target_path = os.path.join(self.tmp_dir, "train_target.npy")
+        np.save(self.features_path, features)
+        np.save(self.target_path, (features[:, 0] > 0.5).astype(np.uint8))
+        self.model_config_path = os.path.join(self.tmp_dir, "model.yaml")
+        with open(self.model_config_path, "w") as model_config_file:
+            yaml.safe_dump({"search": {"method": "successive_halving", "n_candidates": 4, "factor": 2,
+                                       "min_resources": 200, "scoring": "f1"},
+                            "search_space": {"random_forest": {"n_estimators": [5, 10], "max_depth": [2, None]}}},
+                           model_config_file)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def get_model_tuner(self) -> ModelTuner:
+        return ModelTuner(
+            data_transformation_artifact=DataTransformationArtifact(
+                transformed_object_file_path="", transformed_train_file_path=self.features_path,
+                transformed_test_file_path="", transformed_train_target_file_path=self.target_path,
+            ),
+            model_tuner_config=ModelTunerConfig(
+                search_report_file_path=os.path.join(self.tmp_dir, "search_report.json"),
+                model_config_file_path=self.model_config_path,
+                max_workers=2,
+            ),
+            model_trainer_config=ModelTrainerConfig(),
+        )
+
+    def test_successive_halving_schedule(self):
+        """
+        Test that each rung halves the candidates and doubles the training rows.
+        """
+        self.assertEqual(self.get_model_tuner().get_rungs(n_candidates=4, n_rows=960),
+                         [(4, 240), (2, 480), (1, 960)])
+
+    def test_search_returns_best_candidate(self):
+        """
+        Test that the search runs every rung on the process pool and reports a sampled candidate.
+        """
+        model_tuner = self.get_model_tuner()
+        artifact = model_tuner.initiate_model_tuner()
+        self.assertIn(artifact.best_params, model_tuner.sample_candidates())
+        self.assertEqual(artifact.n_trials, 4 + 2 + 1)
+        self.assertTrue(os.path.isfile(artifact.search_report_file_path))
+
+    def test_budget_expiry_kills_running_trials(self):
+        """
+        Test that trials still running when the budget runs out mid-rung are killed, not waited for.
+        """
+        import json
+        import multiprocessing
+        import time
+        import yaml
+        from unittest import mock
+        with open(self.model_config_path, "w") as model_config_file:
+            yaml.safe_dump({"search": {"method": "random", "n_candidates": 2, "scoring": "f1"},
+                            "search_space": {"random_forest": {"n_estimators": [4000, 5000]}}}, model_config_file)
+        processes = []
+        context = multiprocessing.get_context("forkserver")
+        create_pool = context.Pool
+
+        def recording_pool(*args, **kwargs):
+            pool = create_pool(*args, **kwargs)
+            processes.extend(pool._pool)
+            return pool
+
+        model_tuner = self.get_model_tuner()
+        model_tuner.model_tuner_config.time_budget_seconds = 1.0
+        start_time = time.perf_counter()
+        with mock.patch.object(context, "Pool", side_effect=recording_pool):
+            artifact = model_tuner.initiate_model_tuner()
+        self.assertLess(time.perf_counter() - start_time, 10.0)
+        self.assertEqual(artifact.n_trials, 0)
+        self.assertIsNone(artifact.best_score)
+        with open(artifact.search_report_file_path) as report_file:
+            self.assertTrue(json.load(report_file)["out_of_budget"])
+        self.assertTrue(processes)
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+
+class TestMemoryMappedArrays(unittest.TestCase):
+    def test_mmap_load_round_trips_as_memmap(self):
+        """
+        Test that an array saved and loaded with mmap_mode="r" comes back equal, read-only and file backed.
+        """
+        import numpy as np
+        from src.utils.main_utils import save_numpy_array_data, load_numpy_array_data
+        array = np.random.default_rng(0).random((50, 3), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "array.npy")
+            save_numpy_array_data(file_path, array, column_major=True)
+            loaded = load_numpy_array_data(file_path, mmap_mode="r")
+            self.assertIsInstance(loaded, np.memmap)
+            self.assertTrue(np.array_equal(loaded, array))
+            self.assertFalse(loaded.flags.writeable)
+            del loaded
+
+    def test_trainer_and_evaluator_outputs_match_in_memory_arrays(self):
+        """
+        Test that training and scoring on memory-mapped arrays give the same results as in-memory arrays.
+        """
+        import numpy as np
+        from src.components.model_evaluation import ModelEvaluation
+        from src.entity.artifact_entity import ModelTrainerArtifact
+        from src.entity.config_entity import ModelEvaluationConfig
+        from src.entity.estimator import MyModel
+        from src.utils.main_utils import save_numpy_array_data, load_features_target, save_object
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        rng = np.random.default_rng(0)
+        x = rng.random((300, 4), dtype=np.float32)
+        y = (x[:, 0] + 0.3 * rng.random(300) > 0.6).astype(np.uint8)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_numpy_array_data(os.path.join(tmp_dir, "x.npy"), x, column_major=True)
+            save_numpy_array_data(os.path.join(tmp_dir, "y.npy"), y)
+            x_mmap, y_mmap = load_features_target(os.path.join(tmp_dir, "x.npy"), os.path.join(tmp_dir, "y.npy"),
+                                                  mmap_mode="r")
+            self.assertIsInstance(x_mmap, np.memmap)
+            model_trainer_config = ModelTrainerConfig(
+                model_trainer_dir=tmp_dir, trained_model_file_path=os.path.join(tmp_dir, "model.pkl"),
+                test_predictions_file_path=os.path.join(tmp_dir, "test_predictions.npz"))
+            results = []
+            for train in ((x, y), (x_mmap, y_mmap)):
+                model_trainer = ModelTrainer(data_transformation_artifact=None, model_trainer_config=model_trainer_config)
+                model, metric_artifact = model_trainer.get_model_object_and_report(train=train, test=train)
+                results.append((model, metric_artifact, model_trainer.test_predictions))
+            self.assertEqual(results[0][1], results[1][1])
+            self.assertTrue(np.array_equal(results[0][2][0], results[1][2][0]))
+            self.assertTrue(np.array_equal(results[0][2][1], results[1][2][1]))
+
+            save_object(model_trainer_config.trained_model_file_path,
+                        MyModel(preprocessing_object=None, trained_model_object=results[0][0]))
+            model_evaluation = ModelEvaluation(
+                model_eval_config=ModelEvaluationConfig(model_cache_dir=os.path.join(tmp_dir, "model_cache")),
+                data_transformation_artifact=None,
+                model_trainer_artifact=ModelTrainerArtifact(
+                    trained_model_file_path=model_trainer_config.trained_model_file_path,
+                    metric_artifact=results[0][1]),
+            )
+            self.assertEqual(model_evaluation.score_trained_model(x, y, n_jobs=1),
+                             model_evaluation.score_trained_model(x_mmap, y_mmap, n_jobs=1))
+            del x_mmap, y_mmap
+
+
+class TestIncrementalTraining(unittest.TestCase):
+    def test_warm_start_adds_new_trees_and_retires_oldest(self):
+        """
+        Test that incremental training extends a copy of the production forest and bounds its size.
+        """
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        rng = np.random.default_rng(0)
+        x = rng.random((300, 4), dtype=np.float32)
+        y = (x[:, 0] > 0.5).astype(np.uint8)
+        production_forest = RandomForestClassifier(n_estimators=20, oob_score=True, random_state=1).fit(x, y)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_trainer = ModelTrainer(
+                data_transformation_artifact=None,
+                model_trainer_config=ModelTrainerConfig(
+                    model_trainer_dir=tmp_dir, trained_model_file_path=os.path.join(tmp_dir, "model.pkl"),
+                    test_predictions_file_path=os.path.join(tmp_dir, "test_predictions.npz"),
+                    incremental_n_new_estimators=5, incremental_max_estimators=22),
+            )
+            model = model_trainer.fit_incremental(production_forest, x, y, n_jobs=1)
+
+        self.assertEqual(len(production_forest.estimators_), 20)
+        self.assertEqual((len(model.estimators_), model.n_estimators), (22, 22))
+        # the three oldest trees are retired, the remaining production trees come first
+        self.assertTrue(np.array_equal(model.estimators_[0].tree_.threshold,
+                                       production_forest.estimators_[3].tree_.threshold))
+        self.assertFalse(hasattr(model, "oob_score_"))
+        self.assertGreater(model.score(x, y), 0.9)
+        self.assertEqual(model_trainer.training_report["training_mode"], "incremental")
+        self.assertGreater(model_trainer.training_report["estimated_full_refit_seconds"],
+                           model_trainer.training_report["training_seconds"])
+
+
+class TestModelBackend(unittest.TestCase):
+    def test_hist_gradient_boosting_backend_uses_categorical_codes(self):
+        """
+        Test that the gradient boosting backend trains with the category code columns marked categorical.
+        """
+        import numpy as np
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        rng = np.random.default_rng(0)
+        x = np.column_stack([rng.integers(0, 4, 400), rng.random(400)]).astype(np.float32)
+        y = (x[:, 0] >= 2).astype(np.uint8)
+        categorical_features = np.array([True, False])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_trainer_config = ModelTrainerConfig(
+                model_trainer_dir=tmp_dir, trained_model_file_path=os.path.join(tmp_dir, "model.pkl"),
+                test_predictions_file_path=os.path.join(tmp_dir, "test_predictions.npz"),
+                model_backend="hist_gradient_boosting")
+            model_trainer = ModelTrainer(data_transformation_artifact=None, model_trainer_config=model_trainer_config)
+            model, metric_artifact = model_trainer.get_model_object_and_report(
+                train=(x, y), test=(x, y), categorical_features=categorical_features)
+            # predictions are only written by initiate_model_trainer
+            self.assertFalse(os.path.exists(model_trainer_config.test_predictions_file_path))
+
+        self.assertEqual(len(model_trainer.test_predictions[0]), len(y))
+        self.assertIsInstance(model, HistGradientBoostingClassifier)
+        self.assertTrue(np.array_equal(model.is_categorical_, categorical_features))
+        self.assertEqual(metric_artifact.f1_score, 1.0)
+
+
+class TestMetricsEngine(unittest.TestCase):
+    def test_metrics_match_sklearn(self):
+        """
+        Test that the bincount confusion matrix gives the sklearn metrics, including empty denominators.
+        """
+        import numpy as np
+        from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+        rng = np.random.default_rng(0)
+        y_true = rng.integers(0, 2, 500).astype(np.uint8)
+        y_pred = np.where(rng.random(500) < 0.8, y_true, 1 - y_true).astype(np.float32)
+        metrics = MetricsEngine.classification_metrics(y_true, y_pred)
+
+        self.assertAlmostEqual(metrics.f1_score, f1_score(y_true, y_pred))
+        self.assertAlmostEqual(metrics.precision_score, precision_score(y_true, y_pred))
+        self.assertAlmostEqual(metrics.recall_score, recall_score(y_true, y_pred))
+        self.assertAlmostEqual(metrics.accuracy_score, accuracy_score(y_true, y_pred))
+        self.assertEqual(MetricsEngine.classification_metrics(y_true, np.zeros(500)).precision_score, 0.0)
+
+    def test_oob_accuracy_needs_no_inference_pass(self):
+        """
+        Test that the out-of-bag accuracy equals the forest's oob_score_ and that labels come from probabilities.
+        """
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        rng = np.random.default_rng(0)
+        x = rng.random((300, 4), dtype=np.float32)
+        y = (x[:, 0] > 0.5).astype(np.uint8)
+        forest = RandomForestClassifier(n_estimators=30, oob_score=True, random_state=1).fit(x, y)
+
+        self.assertAlmostEqual(MetricsEngine.oob_accuracy(forest, y), forest.oob_score_)
+        predictions, probabilities = MetricsEngine.predict(forest, x)
+        self.assertTrue(np.array_equal(predictions, forest.predict(x)))
+        self.assertEqual(probabilities.shape, (300, 2))
+
+
+class TestS3Transfers(unittest.TestCase):
+    def setUp(self):
+        """
+        Start a local S3 stand-in with a fresh client and a bucket.
+        """
+        import boto3
+        from moto import mock_aws
+        from src.configuration.aws_connection import S3Client
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        self.mock = mock_aws()
+        self.mock.start()
+        S3Client.s3_client = S3Client.s3_resource = None
+        SimpleStorageService._metadata_cache.clear()
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="artifacts")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        from src.configuration.aws_connection import S3Client
+        S3Client.s3_client = S3Client.s3_resource = None
+        self.mock.stop()
+        self.tmp_dir.cleanup()
+
+    def test_directory_upload_and_ranged_read(self):
+        """
+        Test that a directory is uploaded under a prefix and a large object is read back in ranged parts.
+        """
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        from src.entity.config_entity import S3TransferConfig
+        content = os.urandom(10_000)
+        os.makedirs(os.path.join(self.tmp_dir.name, "model_trainer"))
+        with open(os.path.join(self.tmp_dir.name, "model_trainer", "model.pkl"), "wb") as model_file:
+            model_file.write(content)
+        with open(os.path.join(self.tmp_dir.name, "report.json"), "w") as report_file:
+            report_file.write("{}")
+
+        s3 = SimpleStorageService(S3TransferConfig(ranged_get_threshold=4096, ranged_get_chunksize=3000))
+        keys = s3.upload_directory(self.tmp_dir.name, "runs/1", bucket_name="artifacts")
+
+        self.assertEqual(sorted(keys), ["runs/1/model_trainer/model.pkl", "runs/1/report.json"])
+        self.assertEqual(s3.get_object_bytes("artifacts", "runs/1/model_trainer/model.pkl"), content)
+        self.assertEqual(s3.get_object_bytes("artifacts", "runs/1/report.json"), b"{}")
+
+    def test_transient_errors_are_retried(self):
+        """
+        Test that a truncated body is retried with backoff and other errors are not.
+        """
+        from botocore.exceptions import IncompleteReadError
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        from src.entity.config_entity import S3TransferConfig
+        s3 = SimpleStorageService(S3TransferConfig(max_attempts=3, retry_backoff_seconds=0.0))
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise IncompleteReadError(actual_bytes=1, expected_bytes=2)
+            return "ok"
+
+        def broken():
+            calls.append(1)
+            raise ValueError("not transient")
+
+        self.assertEqual(s3.with_retries(flaky), "ok")
+        self.assertEqual(len(calls), 3)
+        with self.assertRaises(ValueError):
+            s3.with_retries(broken)
+        self.assertEqual(len(calls), 4)
+
+    def test_existence_checks_match_exact_keys_and_are_cached(self):
+        """
+        Test that a key sharing a prefix does not count, metadata is cached per TTL and writes invalidate it.
+        """
+        import boto3
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        from src.entity.config_entity import S3TransferConfig
+        client = boto3.client("s3", region_name="us-east-1")
+        for key in ("model.pkl.bak", "runs/a", "runs/b", "runs/c", "other/d"):
+            client.put_object(Bucket="artifacts", Key=key, Body=b"x")
+        s3 = SimpleStorageService(S3TransferConfig(metadata_ttl_seconds=60, batch_list_min_keys=3))
+        head_requests = []
+        s3.s3_client.meta.events.register("before-call.s3.HeadObject", lambda **kwargs: head_requests.append(1))
+
+        self.assertFalse(s3.s3_key_path_available("artifacts", "model.pkl"))
+        self.assertFalse(s3.s3_key_path_available("artifacts", "model.pkl"))
+        self.assertEqual(len(head_requests), 1)
+
+        model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        with open(model_path, "wb") as model_file:
+            model_file.write(b"model")
+        s3.upload_file(model_path, "model.pkl", bucket_name="artifacts", remove=False)
+        self.assertEqual(s3.get_object_metadata("artifacts", "model.pkl")["ContentLength"], 5)
+
+        head_requests.clear()
+        available = s3.s3_keys_available("artifacts", ["runs/a", "runs/b", "runs/x", "other/d", "other/y"])
+        self.assertEqual(available, {"runs/a": True, "runs/b": True, "runs/x": False,
+                                     "other/d": True, "other/y": False})
+        # runs/ was listed once, the two keys under other/ were checked with HEAD requests
+        self.assertEqual(len(head_requests), 2)
+        self.assertTrue(s3.s3_key_path_available("artifacts", "runs/a"))
+        self.assertEqual(len(head_requests), 2)
+
+    def test_dataframe_is_streamed_in_parts_and_chunks(self):
+        """
+        Test that a compressed CSV is written as a multipart upload, read back in chunks and that a failed write publishes nothing.
+        """
+        import boto3
+        import pandas as pd
+        from unittest import mock
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        from src.entity.config_entity import S3TransferConfig
+        df = pd.DataFrame({"id": range(2000), "Gender": ["Male", "Female"] * 1000, "Annual_Premium": [30564.5] * 2000})
+        s3 = SimpleStorageService(S3TransferConfig(multipart_chunksize=1024, ranged_get_chunksize=2048,
+                                                   stream_chunk_rows=600, max_concurrency=2))
+        upload_parts = []
+        s3.s3_client.meta.events.register("before-call.s3.UploadPart", lambda **kwargs: upload_parts.append(1))
+
+        with mock.patch("moto.s3.models.S3_UPLOAD_PART_MIN_SIZE", 256):
+            s3.upload_df_streaming(df, "data/train.csv.gz", bucket_name="artifacts")
+        self.assertGreater(len(upload_parts), 1)
+
+        chunks = list(s3.iter_df_chunks("data/train.csv.gz", bucket_name="artifacts"))
+        self.assertEqual([len(chunk) for chunk in chunks], [600, 600, 600, 200])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+        pd.testing.assert_frame_equal(s3.read_csv("data/train.csv.gz", bucket_name="artifacts"), df)
+
+        with self.assertRaises(RuntimeError):
+            with s3.open_writer("artifacts", "data/partial.csv") as writer:
+                writer.write(b"x" * 4096)
+                raise RuntimeError("serialization failed")
+        client = boto3.client("s3", region_name="us-east-1")
+        self.assertIsNone(s3.get_object_metadata("artifacts", "data/partial.csv"))
+        self.assertNotIn("Uploads", client.list_multipart_uploads(Bucket="artifacts"))
+
+    def test_model_registry_promotion_rollback_and_gc(self):
+        """
+        Test that versions are content addressed, promotions survive a concurrent manifest write, cached versions skip S3 and old versions are collected.
+        """
+        import json
+        import boto3
+        from src.entity.config_entity import ModelRegistryConfig
+        from src.entity.model_registry import ModelRegistry
+        cache_dir = os.path.join(self.tmp_dir.name, "model_cache")
+        registry = ModelRegistry("artifacts", "registry", cache_dir=cache_dir,
+                                 model_registry_config=ModelRegistryConfig(keep_versions=2, cache_max_versions=2))
+        versions = []
+        for content in (b"model-1", b"model-2", b"model-3", b"model-1"):
+            model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+            with open(model_path, "wb") as model_file:
+                model_file.write(content)
+            versions.append(registry.register(model_path))
+            registry.promote(versions[-1])
+        self.assertEqual(versions[0], versions[3])
+        self.assertEqual(len(registry.get_manifest()[0]["versions"]), 3)
+
+        # another writer updates the manifest between the read and the conditional write of a rollback
+        client = boto3.client("s3", region_name="us-east-1")
+        manifest_writes = []
+        def concurrent_write(params, **kwargs):
+            if params["Key"] == registry.manifest_key and not manifest_writes:
+                manifest_writes.append(1)
+                manifest = registry.get_manifest(use_cache=False)[0]
+                manifest["candidate"] = versions[1]
+                client.put_object(Bucket="artifacts", Key=registry.manifest_key, Body=json.dumps(manifest).encode())
+        registry.storage.s3.s3_client.meta.events.register("provide-client-params.s3.PutObject", concurrent_write)
+        self.assertEqual(registry.rollback(), versions[2])
+        manifest = registry.get_manifest(use_cache=False)[0]
+        self.assertEqual((manifest["production"], manifest["candidate"]), (versions[2], versions[1]))
+
+        model_gets = []
+        registry.storage.s3.s3_client.meta.events.register("provide-client-params.s3.GetObject",
+                                                   lambda params, **kwargs: model_gets.append(params["Key"]))
+        with open(registry.download_version(versions[2]), "rb") as model_file:
+            self.assertEqual(model_file.read(), b"model-3")
+        self.assertEqual([key for key in model_gets if key != registry.manifest_key], [])
+        # only two versions fit in the cache, model-2 was evicted when model-1 was registered again
+        with open(registry.download_version(versions[1]), "rb") as model_file:
+            self.assertEqual(model_file.read(), b"model-2")
+        self.assertIn(registry.version_key(versions[1]), model_gets)
+
+        self.assertEqual(registry.garbage_collect(keep_versions=1), [versions[0]])
+        remaining = [obj["Key"] for obj in client.list_objects_v2(Bucket="artifacts", Prefix="registry/versions/")["Contents"]]
+        self.assertEqual(sorted(remaining), sorted(registry.version_key(version) for version in versions[1:3]))
+
+
+    def test_compressed_artifacts_round_trip(self):
+        """
+        Test that artifacts load whatever codec they were saved with, locally and streamed from S3 with the codec in the metadata.
+        """
+        import dill
+        from src.cloud_storage.aws_storage import SimpleStorageService
+        from src.utils.compression import CODEC_METADATA_KEY, CODECS
+        from src.utils.main_utils import load_object, save_object
+        obj = {"thresholds": [float(i % 50) for i in range(10_000)], "name": "forest"}
+        sizes = {}
+        for codec in CODECS:
+            file_path = os.path.join(self.tmp_dir.name, f"model.{codec}.pkl")
+            save_object(file_path, obj, codec=codec)
+            sizes[codec] = os.path.getsize(file_path)
+            self.assertEqual(load_object(file_path), obj)
+        self.assertLess(sizes["zstd"], sizes["none"] / 2)
+        # artifacts pickled before compression existed still load
+        legacy_path = os.path.join(self.tmp_dir.name, "legacy.pkl")
+        with open(legacy_path, "wb") as legacy_file:
+            dill.dump(obj, legacy_file)
+        self.assertEqual(load_object(legacy_path), obj)
+
+        s3 = SimpleStorageService()
+        s3.save_model(obj, "models/model.pkl", bucket_name="artifacts", codec="zstd")
+        self.assertEqual(s3.get_object_metadata("artifacts", "models/model.pkl")["Metadata"], {CODEC_METADATA_KEY: "zstd"})
+        self.assertEqual(s3.load_model("model.pkl", bucket_name="artifacts", model_dir="models"), obj)
+
+
+class TestBulkLoader(unittest.TestCase):
+    def test_failed_load_resumes_from_checkpoint(self):
+        """
+        Test that a load failing mid-file resumes after its checkpoint and inserts every row exactly once.
+        """
+        import mongomock
+        import pandas as pd
+        from unittest import mock
+        from push_data import VehicleDataExtract
+        from src.configuration.mongodb_connection import MongoDBClient
+        from src.entity.config_entity import DataLoaderConfig
+        previous_client, MongoDBClient.client = MongoDBClient.client, mongomock.MongoClient()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = os.path.join(tmp_dir, "data.csv")
+                pd.DataFrame({"id": range(2500), "credit_score": [None if i % 7 == 0 else i / 10 for i in range(2500)],
+                              "income": ["poverty", "upper class"] * 1250}).to_csv(file_path, index=False)
+                loader = VehicleDataExtract(DataLoaderConfig(file_path=file_path, database_name="vehicle",
+                                                             collection_name="loaded", mode="insert",
+                                                             chunk_rows=700, batch_size=100,
+                                                             max_workers=3, checkpoint_dir=os.path.join(tmp_dir, "ckpt")))
+                insert_batch, calls = VehicleDataExtract.insert_batch, []
+                def failing_insert_batch(collection, documents):
+                    calls.append(1)
+                    if len(calls) == 12:
+                        raise ConnectionError("connection reset")
+                    return insert_batch(collection, documents)
+                with mock.patch.object(VehicleDataExtract, "insert_batch", staticmethod(failing_insert_batch)):
+                    with self.assertRaises(Exception):
+                        loader.load_csv()
+                self.assertTrue(os.path.exists(loader.checkpoint_path(file_path)))
+
+                artifact = loader.load_csv()
+                collection = MongoDBClient.client["vehicle"]["loaded"]
+                self.assertGreater(artifact.resumed_from_row, 0)
+                self.assertEqual(artifact.resumed_from_row + artifact.rows_loaded, 2500)
+                self.assertEqual(collection.count_documents({}), 2500)
+                self.assertEqual(len(collection.distinct("id")), 2500)
+                self.assertIsNone(collection.find_one({"id": 7})["credit_score"])
+                self.assertFalse(os.path.exists(loader.checkpoint_path(file_path)))
+        finally:
+            MongoDBClient.client = previous_client
+
+    def test_upsert_mode_writes_only_new_and_changed_rows(self):
+        """
+        Test that a second upsert load of the same rows writes nothing and that changed and new ids are written once.
+        """
+        import mongomock
+        import pandas as pd
+        from push_data import VehicleDataExtract
+        from src.configuration.mongodb_connection import MongoDBClient
+        from src.data_access.fetch_data import FetchData
+        from src.entity.config_entity import DataLoaderConfig
+        previous_client, MongoDBClient.client = MongoDBClient.client, mongomock.MongoClient()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = os.path.join(tmp_dir, "data.csv")
+                data = pd.DataFrame({"id": range(1000), "age": [i % 4 for i in range(1000)]})
+                data.to_csv(file_path, index=False)
+                loader = VehicleDataExtract(DataLoaderConfig(file_path=file_path, database_name="vehicle",
+                                                             collection_name="upserted", chunk_rows=300, batch_size=100,
+                                                             max_workers=2, checkpoint_dir=os.path.join(tmp_dir, "ckpt")))
+                first = loader.load_csv()
+                second = loader.load_csv()
+                data.loc[5, "age"] = 9
+                pd.concat([data, pd.DataFrame({"id": [1000], "age": [1]})]).to_csv(file_path, index=False)
+                third = loader.load_csv()
+
+                self.assertEqual((first.documents_inserted, first.documents_updated), (1000, 0))
+                self.assertEqual((second.documents_inserted, second.documents_updated, second.documents_already_loaded),
+                                 (0, 0, 1000))
+                self.assertEqual((third.documents_inserted, third.documents_updated), (1, 1))
+                exported = FetchData().export_collection_as_dataframe("upserted", database_name="vehicle")
+                self.assertEqual(len(exported), 1001)
+                self.assertNotIn("_row_hash", exported.columns)
+                self.assertEqual(int(exported.loc[exported["id"] == 5, "age"].iloc[0]), 9)
+        finally:
+            MongoDBClient.client = previous_client
+
+
+class TestMongoDBClient(unittest.TestCase):
+    def test_client_options_and_stats(self):
+        """
+        Test that the configured pool, compressors and read preference reach pymongo and that the listener aggregates events.
+        """
+        from importlib.util import find_spec
+        from types import SimpleNamespace
+        import pymongo
+        from src.configuration.mongodb_connection import MongoDBStats, get_client_options
+        from src.entity.config_entity import MongoDBConfig
+        options = get_client_options(MongoDBConfig(max_pool_size=8, compressors="zstd,snappy,zlib",
+                                                   read_preference="secondaryPreferred"))
+        expected_compressors = [name for name, module in (("zstd", "zstandard"), ("snappy", "snappy"), ("zlib", "zlib"))
+                                if find_spec(module) is not None]
+        self.assertEqual(options["compressors"].split(","), expected_compressors)
+        with self.assertRaises(ValueError):
+            get_client_options(MongoDBConfig(read_preference="fastest"))
+
+        stats = MongoDBStats(latency_samples=4)
+        client = pymongo.MongoClient("mongodb://localhost:27017", connect=False, event_listeners=[stats], **options)
+        try:
+            self.assertEqual(client.options.pool_options.max_pool_size, 8)
+            self.assertEqual(client.read_preference, pymongo.ReadPreference.SECONDARY_PREFERRED)
+            self.assertEqual(client.options.retry_reads, True)
+        finally:
+            client.close()
+
+        for duration_micros in (1000, 3000, 2000, 50_000, 4000):
+            stats.succeeded(SimpleNamespace(command_name="find", duration_micros=duration_micros))
+        stats.failed(SimpleNamespace(command_name="insert", duration_micros=500))
+        stats.connection_created(None)
+        stats.connection_checked_out(SimpleNamespace(duration=0.02))
+        stats.connection_checked_out(SimpleNamespace(duration=0.0))
+        stats.connection_checked_in(None)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["commands"]["find"]["count"], 5)
+        self.assertEqual(snapshot["commands"]["find"]["max_ms"], 50.0)
+        self.assertEqual(snapshot["commands"]["insert"]["failures"], 1)
+        self.assertEqual((snapshot["connections_open"], snapshot["connections_checked_out"]), (1, 1))
+        self.assertAlmostEqual(snapshot["max_checkout_wait_ms"], 20.0)
+        # only the 4 most recent latencies: 2, 50, 4 and 0.5 ms
+        self.assertAlmostEqual(snapshot["p50_command_ms"], 3.0)
+
+
+class TestStorageBackends(unittest.TestCase):
+    def test_local_and_in_memory_backends(self):
+        """
+        Test that both backends write atomically, honour conditional writes, list, stream and delete.
+        """
+        from src.cloud_storage.storage_backend import (InMemoryStorageBackend, LocalStorageBackend,
+                                                       PreconditionFailed)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for storage in (LocalStorageBackend("models", root_dir=tmp_dir), InMemoryStorageBackend("test-models")):
+                etag = storage.write_bytes("registry/manifest.json", b"{}", if_none_match=True)
+                with self.assertRaises(PreconditionFailed):
+                    storage.write_bytes("registry/manifest.json", b"{}", if_none_match=True)
+                new_etag = storage.write_bytes("registry/manifest.json", b'{"a": 1}', if_match=etag)
+                with self.assertRaises(PreconditionFailed):
+                    storage.write_bytes("registry/manifest.json", b"{}", if_match=etag)
+                with self.assertRaises(PreconditionFailed):
+                    storage.read_bytes("registry/manifest.json", if_match=etag)
+                self.assertEqual(storage.read_bytes("registry/manifest.json", if_match=new_etag), b'{"a": 1}')
+
+                with self.assertRaises(ValueError):
+                    with storage.open_write("registry/versions/v1.pkl") as file_obj:
+                        file_obj.write(b"partial")
+                        raise ValueError("failed upload")
+                self.assertFalse(storage.exists("registry/versions/v1.pkl"))
+                with storage.open_write("registry/versions/v1.pkl", metadata={"artifact-codec": "none"}) as file_obj:
+                    file_obj.write(b"x" * 2500)
+                self.assertEqual(storage.head("registry/versions/v1.pkl")["Metadata"], {"artifact-codec": "none"})
+                self.assertEqual([len(chunk) for chunk in storage.iter_chunks("registry/versions/v1.pkl", 1000)],
+                                 [1000, 1000, 500])
+                read = storage.open_read("registry/versions/v1.pkl")
+                read.seek(2499)
+                self.assertEqual(read.read(), b"x")
+                read.close()
+
+                self.assertEqual([obj["Key"] for obj in storage.list("registry/")],
+                                 ["registry/manifest.json", "registry/versions/v1.pkl"])
+                storage.delete(["registry/versions/v1.pkl", "registry/missing.pkl"])
+                self.assertEqual([obj["Key"] for obj in storage.list("registry/versions/")], [])
+            with self.assertRaises(ValueError):
+                LocalStorageBackend("models", root_dir=tmp_dir).write_bytes("../escape", b"")
+
+    def test_model_registry_on_local_backend(self):
+        """
+        Test that the registry runs offline on the local backend and serves versions in place, without a cached copy.
+        """
+        from src.cloud_storage.storage_backend import get_storage_backend
+        from src.entity.config_entity import StorageBackendConfig
+        from src.entity.model_registry import ModelRegistry
+        from src.utils.main_utils import save_object
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage = get_storage_backend("models", StorageBackendConfig(backend="local",
+                                                                         local_root_dir=os.path.join(tmp_dir, "ssd")))
+            registry = ModelRegistry("models", "registry", cache_dir=os.path.join(tmp_dir, "cache"), storage=storage)
+            model_path = os.path.join(tmp_dir, "model.pkl")
+            save_object(model_path, {"trees": list(range(100))}, codec="zstd")
+            version = registry.register(model_path)
+            registry.promote(version)
+
+            self.assertEqual(registry.get_version(), version)
+            self.assertEqual(registry.download_version(version), storage.local_path(registry.version_key(version)))
+            self.assertEqual(registry.load_version(version), {"trees": list(range(100))})
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "cache")))
+
+    def test_legacy_model_is_adopted_as_production(self):
+        """
+        Test that the model object of the releases before the registry becomes production when there is no manifest.
+        """
+        from src.cloud_storage.storage_backend import InMemoryStorageBackend
+        from src.entity.model_registry import ModelRegistry, file_digest
+        from src.utils.main_utils import save_object
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage = InMemoryStorageBackend("legacy-models")
+            registry = ModelRegistry("legacy-models", "registry", cache_dir=os.path.join(tmp_dir, "cache"),
+                                     storage=storage)
+            self.assertIsNone(registry.get_version())
+            model_path = os.path.join(tmp_dir, "model.pkl")
+            save_object(model_path, {"trees": [1, 2]})
+            storage.upload_file(model_path, "model.pkl")
+            # a registry that already has a manifest keeps it, even with no production version
+            other_registry = ModelRegistry("legacy-models", "other-registry", cache_dir=os.path.join(tmp_dir, "cache"),
+                                           storage=storage)
+            other_registry.register(model_path)
+            self.assertIsNone(other_registry.get_version())
+
+            version = registry.get_version()
+            self.assertEqual(version, file_digest(model_path))
+            self.assertEqual(registry.get_manifest()[0]["history"], [version])
+            self.assertEqual(registry.load_version(version), {"trees": [1, 2]})
+            storage.delete(["model.pkl"])
+            self.assertEqual(registry.get_version(), version)
+
+
+class TestAsyncModelRefresh(unittest.TestCase):
+    def setUp(self):
+        """
+        Start a local S3 server, async clients cannot be patched in process, and point the shared client at it.
+        """
+        from moto.server import ThreadedMotoServer
+        from src.configuration.aws_connection import S3Client
+        from src.entity.config_entity import S3TransferConfig
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        self.server = ThreadedMotoServer(port=0, verbose=False)
+        self.server.start()
+        self.transfer_config = S3TransferConfig(endpoint_url=f"http://127.0.0.1:{self.server.get_host_and_port()[1]}")
+        S3Client.s3_client = S3Client.s3_resource = None
+        S3Client(s3_transfer_config=self.transfer_config).s3_client.create_bucket(Bucket="serving-models")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        from src.configuration.aws_connection import S3Client
+        from src.pipeline.prediction_pipeline import VehicleDataClassifier
+        S3Client.s3_client = S3Client.s3_resource = None
+        VehicleDataClassifier._model = VehicleDataClassifier._model_version = None
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    def test_refresh_follows_promotions_with_conditional_gets(self):
+        """
+        Test that the refresher loads a promoted version, skips unchanged manifests with a 304 and reports health.
+        """
+        import asyncio
+        from src.cloud_storage.async_storage import AsyncSimpleStorageService
+        from src.entity.config_entity import VehiclePredictorConfig
+        from src.entity.model_registry import ModelRegistry
+        from src.pipeline.prediction_pipeline import ModelRefresher, VehicleDataClassifier
+        from src.utils.main_utils import save_object
+        registry = ModelRegistry("serving-models", "registry", cache_dir=os.path.join(self.tmp_dir.name, "train_cache"))
+        versions = []
+        for name in ("v1", "v2"):
+            model_path = os.path.join(self.tmp_dir.name, f"{name}.pkl")
+            save_object(model_path, {"model": name}, codec="zstd")
+            versions.append(registry.register(model_path))
+        registry.promote(versions[0])
+        config = VehiclePredictorConfig(model_bucket_name="serving-models", model_registry_key="registry",
+                                        model_cache_dir=os.path.join(self.tmp_dir.name, "serving_cache"))
+
+        async def refresh_twice_around_a_promotion():
+            async with AsyncSimpleStorageService(self.transfer_config) as storage:
+                refresher = ModelRefresher(storage, config)
+                results = [await refresher.refresh(), await refresher.refresh()]
+                models = [VehicleDataClassifier._model]
+                registry.promote(versions[1])
+                results.append(await refresher.refresh())
+                models.append(VehicleDataClassifier._model)
+                return results, models, await refresher.health()
+
+        results, models, health = asyncio.run(refresh_twice_around_a_promotion())
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(models, [{"model": "v1"}, {"model": "v2"}])
+        self.assertTrue(health["healthy"])
+        self.assertEqual(health["model_version"], versions[1])
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp_dir.name, "serving_cache", "serving-models", "registry",
+                                                    f"{versions[1]}.pkl")))
+
+class TestServingBudgets(unittest.TestCase):
+    def test_candidate_over_budget_is_reported(self):
+        """
+        Test that budgets and the latency ratio against production are checked, and the footprint sees the trees.
+        """
+        import pickle
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from src.components.model_evaluation import ModelEvaluation
+        from src.entity.config_entity import ModelEvaluationConfig
+        from src.utils.model_profiler import estimate_memory_bytes
+        model_evaluation = ModelEvaluation(
+            model_eval_config=ModelEvaluationConfig(max_single_row_p99_ms=10.0, max_batch_ms=None,
+                                                    max_model_size_mb=5.0, max_memory_mb=None,
+                                                    max_latency_ratio=1.5),
+            data_transformation_artifact=None, model_trainer_artifact=None,
+        )
+        profile = {"single_row_p50_ms": 6.0, "single_row_p99_ms": 8.0, "batch_ms": 900.0, "model_size_mb": 6.0,
+                   "memory_mb": 900.0}
+
+        violations = model_evaluation.get_budget_violations(profile, {**profile, "single_row_p50_ms": 3.0})
+        self.assertEqual(len(violations), 2)
+        self.assertTrue(violations[0].startswith("model_size_mb"))
+        self.assertEqual(model_evaluation.get_budget_violations({**profile, "model_size_mb": 1.0}), [])
+
+        rng = np.random.default_rng(0)
+        x = rng.random((2000, 4), dtype=np.float32)
+        # random labels grow deep trees, so the node arrays dominate the pickle
+        forest = RandomForestClassifier(n_estimators=10, random_state=1).fit(x, rng.integers(0, 2, 2000))
+        self.assertGreater(estimate_memory_bytes(forest), 0.8 * len(pickle.dumps(forest)))
+
+
+class TestResourceGovernor(unittest.TestCase):
+    def test_concurrent_stages_share_the_cores(self):
+        """
+        Test that stages ready together get fair shares whichever starts first, and that both are reported.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ResourceGovernor.configure(ResourceGovernorConfig(total_cores=9, reserved_cores=2,
+                                                              report_file_path=os.path.join(tmp_dir, "report.json")))
+            ResourceGovernor.plan(["data_resampling", "model_tuner"])
+            with ResourceGovernor.stage("model_tuner") as tuner_cores:
+                self.assertEqual(ResourceGovernor.n_jobs(-1), 3)
+                self.assertEqual(ResourceGovernor.n_jobs(8), 3)
+                with ResourceGovernor.stage("data_resampling") as resampling_cores:
+                    self.assertEqual(ResourceGovernor.n_jobs(-2), 3)
+            report = ResourceGovernor.save_report()
+            ResourceGovernor.configure(ResourceGovernorConfig())
+
+        self.assertEqual((tuner_cores, resampling_cores), (3, 4))
+        self.assertEqual(set(report["stages"]), {"model_tuner", "data_resampling"})
+        self.assertIn("cpu_utilization", report["stages"]["model_tuner"])
+
+    def test_stage_waits_while_no_core_is_free(self):
+        """
+        Test that a stage starting while every core is held waits for them instead of oversubscribing.
+        """
+        import threading
+        ResourceGovernor.configure(ResourceGovernorConfig(total_cores=4, reserved_cores=0))
+        cores = {}
+
+        def run_stage():
+            with ResourceGovernor.stage("model_evaluation") as allotted:
+                cores["model_evaluation"] = allotted
+
+        try:
+            with ResourceGovernor.stage("model_trainer") as allotted:
+                cores["model_trainer"] = allotted
+                thread = threading.Thread(target=run_stage)
+                thread.start()
+                thread.join(timeout=0.5)
+                self.assertNotIn("model_evaluation", cores)
+            thread.join(timeout=5)
+        finally:
+            ResourceGovernor.configure(ResourceGovernorConfig())
+        self.assertEqual(cores, {"model_trainer": 4, "model_evaluation": 4})
+
+
 if __name__ == "__main__":
     unittest.main()